@@ -0,0 +1,188 @@
+"""
+Admission control for LLM-bound work (test generation, scoring, analysis)
+
+Gemini calls are slow and the keys' quota is small: past a few concurrent calls,
+a new one mostly waits, then fails with a 429 after occupying a worker for the
+whole wait. The controller admits at most max_concurrent requests at a time,
+queues up to max_queue more, and turns anything beyond that away at once with
+Overloaded (429 when the queue is full, 503 when the estimated wait is longer
+than max_wait), carrying a Retry-After estimated from recent call durations.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from dotenv import load_dotenv
+import math
+import os
+import threading
+import time
+
+load_dotenv()
+
+# Requests running Gemini calls at once (per process)
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+# Requests waiting for a slot; more are rejected with 429
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+# Longest wait accepted for a slot; a longer estimated wait is rejected with 503
+LLM_MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "60"))
+# Duration of an admitted request before any has been measured
+LLM_ESTIMATED_SECONDS = float(os.getenv("LLM_ESTIMATED_SECONDS", "15"))
+
+# Weight of the latest duration in the moving average
+DURATION_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """Request turned away by admission control (mapped to 429/503 + Retry-After)"""
+
+    def __init__(self, status_code: int, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class AdmissionController:
+    """Concurrency limit + bounded FIFO wait queue for LLM-bound requests"""
+
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_wait: float = LLM_MAX_WAIT_SECONDS,
+        estimated_seconds: float = LLM_ESTIMATED_SECONDS,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.service_seconds = estimated_seconds  # Moving average per request
+        self._cond = threading.Condition()
+        self._tickets = 0  # Queue positions handed out
+        self._serving = 0  # Queue positions admitted so far (FIFO order)
+        self._skipped = set()  # Positions whose waiter gave up
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_wait = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seen = 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the request at this queue position (1 = next) gets a slot"""
+        if position <= 0:
+            return 0.0
+        return math.ceil(position / self.max_concurrent) * self.service_seconds
+
+    def _acquire(self) -> float:
+        """Wait for a slot, returns the seconds waited (raises Overloaded)"""
+        with self._cond:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                return 0.0
+            position = self.waiting + 1
+            estimate = self.estimated_wait(position)
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise Overloaded(
+                    429, estimate, "Too many requests in progress, retry later"
+                )
+            if estimate > self.max_wait:
+                self.rejected_wait += 1
+                raise Overloaded(
+                    503, estimate, "Service overloaded, estimated wait too long"
+                )
+
+            ticket = self._tickets
+            self._tickets += 1
+            self.waiting += 1
+            start = time.monotonic()
+            deadline = start + self.max_wait
+            try:
+                while ticket != self._serving or self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise Overloaded(
+                            503,
+                            self.estimated_wait(self.waiting),
+                            "Service overloaded, timed out waiting for a slot",
+                        )
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._leave_queue(ticket)
+                raise
+            self.waiting -= 1
+            self._serving += 1
+            self._skip_abandoned()
+            self.active += 1
+            self._cond.notify_all()
+            return time.monotonic() - start
+
+    def _leave_queue(self, ticket: int):
+        """A waiter gives up: later tickets move up one position"""
+        self.waiting -= 1
+        if ticket == self._serving:
+            self._serving += 1
+        else:
+            self._skipped.add(ticket)
+        self._skip_abandoned()
+        self._cond.notify_all()
+
+    def _skip_abandoned(self):
+        while self._serving in self._skipped:
+            self._skipped.discard(self._serving)
+            self._serving += 1
+
+    def _release(self, duration: float):
+        with self._cond:
+            self.active -= 1
+            self.service_seconds += DURATION_SMOOTHING * (
+                duration - self.service_seconds
+            )
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold a slot for the duration of the block (raises Overloaded)"""
+        waited = self._acquire()
+        with self._cond:
+            self.admitted += 1
+            self.wait_seconds_total += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "estimated_wait_seconds": round(
+                    (
+                        self.estimated_wait(self.waiting + 1)
+                        if self.waiting or self.active >= self.max_concurrent
+                        else 0.0
+                    ),
+                    2,
+                ),
+                "service_seconds": round(self.service_seconds, 2),
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_wait": self.rejected_wait,
+                "timed_out": self.timed_out,
+                "mean_wait_seconds": round(
+                    self.wait_seconds_total / self.admitted if self.admitted else 0, 3
+                ),
+                "max_wait_seconds": round(self.max_wait_seen, 3),
+            }
+
+
+# Process-wide controller in front of the LLM-bound routes
+llm_admission = AdmissionController()
@@ -0,0 +1,119 @@
+"""
+Per-session event channels: state transitions, progress and partial results
+
+Routes and storage listeners publish() from any thread; SSE / WebSocket
+streams subscribe() from the event loop. The in-process bus fans out to the
+subscribers of this process only: with several workers/nodes, replace it with
+a broker-backed implementation (Redis pub/sub, NATS, ...) of the same
+publish() / subscribe() / has_subscribers() interface.
+"""
+
+from typing import Dict, Optional, Set
+import asyncio
+import itertools
+import os
+import threading
+
+# Events buffered per subscriber; a slow client loses the oldest ones first
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SESSION_EVENTS_QUEUE", "100"))
+
+# Published to every subscriber when the bus closes (streams end on it)
+CLOSED = {"event": "closed"}
+
+
+class Subscription:
+    """One stream's view of a session channel (use from the event loop)"""
+
+    def __init__(self, bus: "EventBus", session_id: int, queue_size: int):
+        self.bus = bus
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def _offer(self, message: Dict):
+        """Runs on the subscriber's loop"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next event, None after timeout seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class EventBus:
+    """In-process publish/subscribe, one channel per session"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def has_subscribers(self, session_id: int) -> bool:
+        return session_id in self._channels
+
+    def subscribe(self, session_id: int) -> Subscription:
+        subscription = Subscription(self, session_id, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            channel = self._channels.get(subscription.session_id)
+            if channel is not None:
+                channel.discard(subscription)
+                if not channel:
+                    del self._channels[subscription.session_id]
+
+    def publish(self, session_id: int, event: str, data: Optional[Dict] = None):
+        """Send an event to the session's subscribers (non-blocking, any thread)"""
+        subscribers = self._channels.get(session_id)
+        if not subscribers:
+            return
+        message = {
+            "id": next(self._ids),
+            "event": event,
+            "session_id": session_id,
+            "data": data or {},
+        }
+        with self._lock:
+            subscribers = list(self._channels.get(session_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, message)
+            except RuntimeError:  # Loop already closed: stream is gone
+                self._unsubscribe(subscription)
+        self.published += 1
+
+    def close(self):
+        """End every open stream (on shutdown)"""
+        with self._lock:
+            subscribers = [s for channel in self._channels.values() for s in channel]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, CLOSED)
+            except RuntimeError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(len(c) for c in self._channels.values()),
+                "published": self.published,
+            }
+
+
+# Process-wide bus used by the session routes
+event_bus = EventBus()
@@ -0,0 +1,146 @@
+"""
+Dedicated thread pool for the blocking LLM-bound routes
+
+Sync routes share AnyIO's default thread pool (40 threads): a burst of slow
+Gemini calls can hold every thread and starve cheap reads (/health, /status,
+GET /sessions/{id}). Routes decorated with @llm_bound run on this separately
+sized pool instead, so LLM saturation only queues LLM work. The pool is sized
+for the requests admission control can hold (running + waiting for a slot);
+its own backlog is bounded too, beyond which requests get a 429 at once.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+
+from app.admission import LLM_MAX_CONCURRENT, LLM_MAX_QUEUE, Overloaded
+
+# Threads running LLM-bound route handlers (default: every request admission
+# control may hold, running or waiting, has a thread)
+LLM_EXECUTOR_THREADS = int(
+    os.getenv("LLM_EXECUTOR_THREADS", str(LLM_MAX_CONCURRENT + LLM_MAX_QUEUE))
+)
+# Requests waiting for a thread; more are rejected with 429
+LLM_EXECUTOR_QUEUE = int(os.getenv("LLM_EXECUTOR_QUEUE", "64"))
+
+# Retry-After of a request rejected because the pool's backlog is full
+RETRY_AFTER_SECONDS = 5
+
+
+class LLMExecutor:
+    """Bounded thread pool with queue metrics (use run() from the event loop)"""
+
+    def __init__(
+        self,
+        max_workers: int = LLM_EXECUTOR_THREADS,
+        max_queue: int = LLM_EXECUTOR_QUEUE,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="llm-route"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.max_queue_seconds = 0.0
+        self.run_seconds_total = 0.0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool (raises Overloaded if its backlog is full)"""
+        with self._lock:
+            if self.queued >= self.max_queue and self.running >= self.max_workers:
+                self.rejected += 1
+                raise Overloaded(
+                    429,
+                    RETRY_AFTER_SECONDS,
+                    "Too many requests in progress, retry later",
+                )
+            self.queued += 1
+        enqueued = time.monotonic()
+        context = contextvars.copy_context()
+
+        def call():
+            start = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                waited = start - enqueued
+                self.queue_seconds_total += waited
+                self.max_queue_seconds = max(self.max_queue_seconds, waited)
+            failed = True
+            try:
+                result = context.run(func, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_seconds_total += time.monotonic() - start
+                    if failed:
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+
+        future = self._executor.submit(call)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            if future.cancelled():  # Client went away before a thread picked it up
+                with self._lock:
+                    self.queued -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self.completed + self.failed + self.running
+            return {
+                "threads": self.max_workers,
+                "running": self.running,
+                "queue_depth": self.queued,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "mean_queue_seconds": round(
+                    self.queue_seconds_total / started if started else 0, 3
+                ),
+                "max_queue_seconds": round(self.max_queue_seconds, 3),
+                "mean_run_seconds": round(
+                    (
+                        self.run_seconds_total / (self.completed + self.failed)
+                        if self.completed + self.failed
+                        else 0
+                    ),
+                    3,
+                ),
+            }
+
+
+# Process-wide pool for the LLM-bound routes
+llm_executor = LLMExecutor()
+
+
+def llm_bound(endpoint: Callable) -> Callable:
+    """Route decorator: run a sync endpoint on the LLM pool instead of AnyIO's
+
+    The wrapper keeps the endpoint's signature (FastAPI reads it through
+    __wrapped__), so parameters and dependencies are resolved as before.
+    """
+
+    @functools.wraps(endpoint)
+    async def run_on_llm_pool(*args, **kwargs):
+        return await llm_executor.run(endpoint, *args, **kwargs)
+
+    return run_on_llm_pool
@@ -1,8 +1,17 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.routes.test_session import router
+from app.admission import Overloaded, llm_admission
+from app.events import event_bus
+from app.llm_executor import llm_executor
+from app.services.llm_scheduler import llm_scheduler
+from app.responses import FAST_RESPONSES, CompressionMiddleware
+from app.routes.test_session import router, scoring_service, test_generator
+from app.routes.cohort import router as cohort_router
+from app.storage import storage, VersionConflictError
+import anyio.to_thread
 import logging
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -61,8 +70,62 @@ else:
         expose_headers=["*"],
     )
 
+# Fast response path: negotiated br/gzip compression for large JSON bodies
+if FAST_RESPONSES:
+    logger.info("FAST_RESPONSES: orjson session responses + br/gzip compression")
+    app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(router, prefix="/api", tags=["test-session"])
+app.include_router(cohort_router, prefix="/api", tags=["cohort"])
+
+
+@app.exception_handler(VersionConflictError)
+async def version_conflict_handler(request: Request, exc: VersionConflictError):
+    """Compare-and-set update lost to a concurrent write (If-Match on a stale version)"""
+    return JSONResponse(
+        status_code=412,
+        content={"detail": "Session has been modified, reload it and retry"},
+        headers={"ETag": f'"{exc.session_id}-{exc.actual_version}"'},
+    )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """LLM-bound request turned away by admission control: retry after the estimated wait"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+# Build the LLM services in the background at startup instead of on first use
+PRELOAD_LLM_SERVICES = os.getenv("PRELOAD_LLM_SERVICES", "false").lower() == "true"
+
+
+@app.on_event("startup")
+def start_llm_services():
+    """The LLM services are built on first use: check their config now, preload if asked"""
+    if not os.getenv("GEMINI_API_KEY") and not os.getenv("GEMINI_API_KEY_BACKUP"):
+        logger.warning(
+            "GEMINI_API_KEY or GEMINI_API_KEY_BACKUP not set: test generation and scoring will fail"
+        )
+    elif PRELOAD_LLM_SERVICES:
+
+        def preload():
+            test_generator.gemini.model  # Also imports the Gemini SDK
+            scoring_service.get()
+
+        threading.Thread(target=preload, name="llm-preload", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def close_storage():
+    """End open event streams and the LLM route pool, flush session storage (e.g. the in-memory WAL)"""
+    event_bus.close()
+    llm_executor.shutdown()
+    storage.close()
 
 
 # Add explicit OPTIONS handler for all routes (fallback - must be after routers)
@@ -99,3 +162,20 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "ok", "version": "2.0.0"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """LLM-bound routes (admission control, their thread pool, Gemini call scheduling)
+    vs the shared thread pool"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "admission": llm_admission.stats(),
+        "llm_executor": llm_executor.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "threadpool": {
+            "threads": limiter.total_tokens,
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+    }
@@ -1,4 +1,4 @@
-from .test_session import TestSession
+from .test_session import TestSession, TestContent
 
-__all__ = ["TestSession"]
+__all__ = ["TestSession", "TestContent"]
 
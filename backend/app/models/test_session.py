@@ -33,26 +33,50 @@ class TestSession(Base):
     __tablename__ = "test_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
-    level = Column(Enum(Level), nullable=False)
-    selected_phase = Column(Enum(Phase), nullable=True)
-    status = Column(Enum(SessionStatus), default=SessionStatus.INITIALIZED)
+    level = Column(Enum(Level), nullable=False, index=True)
+    selected_phase = Column(Enum(Phase), nullable=True, index=True)
+    status = Column(Enum(SessionStatus), default=SessionStatus.INITIALIZED, index=True)
 
     # Phase 1 data
     phase1_content = Column(JSON, nullable=True)  # Generated questions/content
+    # TestContent.hash of shared content (phase*_content is then left empty)
+    phase1_content_hash = Column(String(64), nullable=True, index=True)
     phase1_answers = Column(JSON, nullable=True)  # User answers
+    phase1_answers_seq = Column(Integer, nullable=True)  # Last autosaved delta
     phase1_scores = Column(JSON, nullable=True)  # Scoring results
 
     # Phase 2 data
     phase2_content = Column(JSON, nullable=True)
+    phase2_content_hash = Column(String(64), nullable=True, index=True)
     phase2_answers = Column(JSON, nullable=True)
+    phase2_answers_seq = Column(Integer, nullable=True)
     phase2_scores = Column(JSON, nullable=True)
 
     # Final results
     final_results = Column(JSON, nullable=True)  # Aggregated IELTS scores
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     phase1_started_at = Column(DateTime(timezone=True), nullable=True)
     phase1_completed_at = Column(DateTime(timezone=True), nullable=True)
     phase2_started_at = Column(DateTime(timezone=True), nullable=True)
     phase2_completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Cohort (classroom) the session belongs to: ID of the cohort's template session
+    cohort_id = Column(Integer, nullable=True, index=True)
+
+    # Optimistic concurrency: incremented by the ORM on every UPDATE
+    version = Column(Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+class TestContent(Base):
+    """Generated test content shared by every session that uses it (stored once)"""
+
+    __tablename__ = "test_contents"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of the serialized content
+    content = Column(JSON, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # Sessions referencing it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,349 @@
+"""
+Fast response path for session payloads (opt-in: FAST_RESPONSES=true)
+
+- FastJSONResponse: session dicts rendered straight to JSON bytes (orjson when
+  installed), without building + re-validating a Pydantic model per response
+- CompressionMiddleware: negotiated br/gzip for JSON bodies above a size
+  threshold; bodies with a strong ETag are immutable, so their compressed
+  bytes are cached and reused
+- SessionResponseCache: encoded session bodies (+ compressed variants) per
+  session version, so a repeat read is a dict lookup
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+import enum
+import gzip
+import json
+import os
+import threading
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # Optional: faster JSON encoding
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:  # Optional: brotli content-encoding (smaller than gzip for JSON text)
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("RESPONSE_COMPRESSION_CACHE", "512"))
+RESPONSE_CACHE_BYTES = int(float(os.getenv("RESPONSE_CACHE_MB", "64")) * 1024 * 1024)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Larger bodies are compressed in a worker thread instead of the event loop
+THREAD_MIN_BYTES = 128 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(value: Any) -> bytes:
+    """JSON bytes of plain data (datetimes as ISO strings, enums as their values)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered without Pydantic (the content is trusted session data)"""
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def mark_encoded(headers: MutableHeaders, encoding: str, length: int):
+    """Headers of a body sent with a content-encoding"""
+    headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(length)
+    headers.add_vary_header("Accept-Encoding")
+    etag = headers.get("etag")
+    if etag and etag.startswith('"'):
+        # The encoded bytes differ from the identity representation
+        headers["ETag"] = f"W/{etag}"
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """br if the client accepts it (and brotli is installed), else gzip, else None"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        try:
+            quality = float(params.strip().removeprefix("q=") or 1)
+        except ValueError:
+            quality = 1
+        if name.strip() and quality > 0:
+            accepted.add(name.strip())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by request + strong ETag + encoding
+
+    A strong ETag names one immutable representation of a session version, so
+    an entry never goes stale; old versions simply fall out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: Tuple, body: bytes):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": sum(len(body) for body in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CompressionMiddleware:
+    """Negotiated br/gzip for complete (non-streaming) JSON/text responses"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        cache: Optional[CompressedBodyCache] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressedBodyCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if message.get("more_body", False) or not self._compressible(
+                start, headers, body
+            ):
+                # Streaming (e.g. server-sent events) or not worth it: send as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            etag = headers.get("etag", "")
+            key = None
+            if etag.startswith('"'):
+                key = (
+                    scope["method"],
+                    scope["path"],
+                    scope.get("query_string", b""),
+                    etag,
+                    encoding,
+                )
+            compressed = self.cache.get(key) if key else None
+            if compressed is None:
+                if len(body) >= THREAD_MIN_BYTES:
+                    compressed = await anyio.to_thread.run_sync(
+                        compress, body, encoding
+                    )
+                else:
+                    compressed = compress(body, encoding)
+                if key:
+                    self.cache.put(key, compressed)
+
+            mark_encoded(headers, encoding, len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start: Message, headers: MutableHeaders, body: bytes):
+        media_type = headers.get("content-type", "").partition(";")[0].strip()
+        return (
+            start["status"] == 200
+            and len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and media_type in COMPRESSIBLE_TYPES
+        )
+
+
+class _CachedVersion:
+    """Bodies of one session version: {variant: {encoding or "identity": bytes}}"""
+
+    __slots__ = ("version", "bodies", "nbytes")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.bodies: Dict[str, Dict[str, bytes]] = {}
+        self.nbytes = 0
+
+
+class SessionResponseCache:
+    """Encoded response bodies keyed by (session id, version, variant)
+
+    variant names the representation (view / field set, as in the ETag). A
+    session version never changes, so a lookup only needs the current version
+    (a version-only read) and entries cannot go stale; invalidate() is a
+    storage listener that frees older versions as soon as a session changes.
+    Whole sessions are evicted in LRU order beyond max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[int, _CachedVersion]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(
+        self,
+        session_id: int,
+        version: int,
+        variant: str,
+        encoding: Optional[str] = None,
+    ) -> Optional[Tuple[bytes, Optional[str]]]:
+        """(body, content-encoding) if cached; compressed variants are made on first use"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry.version != version or variant not in entry.bodies:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            bodies = entry.bodies[variant]
+            if encoding is None or len(bodies["identity"]) < COMPRESSION_MIN_BYTES:
+                return bodies["identity"], None
+            if encoding in bodies:
+                return bodies[encoding], encoding
+
+        body = compress(bodies["identity"], encoding)
+        with self._lock:
+            if self._sessions.get(session_id) is entry and encoding not in bodies:
+                bodies[encoding] = body
+                self._grow(entry, len(body))
+        return body, encoding
+
+    def put(
+        self,
+        session_id: int,
+        version: int,
+        variant: str,
+        body: bytes,
+        encoding: Optional[str] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        """Cache an identity body, returns it encoded as get() would"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.version > version:
+                entry = None  # A newer version is cached already: keep it
+            else:
+                if entry is None or entry.version < version:
+                    self._drop(session_id)
+                    entry = self._sessions[session_id] = _CachedVersion(version)
+                self._sessions.move_to_end(session_id)
+                if variant not in entry.bodies:
+                    entry.bodies[variant] = {"identity": body}
+                    self._grow(entry, len(body))
+        if entry is None or encoding is None:
+            return body, None
+        return self.get(session_id, version, variant, encoding) or (body, None)
+
+    def invalidate(self, session_id: int, session: Optional[Dict] = None):
+        """Storage listener: drop bodies of versions older than the session's"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and (
+                session is None or entry.version < session["version"]
+            ):
+                self._drop(session_id)
+
+    def _grow(self, entry: _CachedVersion, size: int):
+        entry.nbytes += size
+        self.nbytes += size
+        while self.nbytes > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+
+    def _drop(self, session_id: int):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Process-wide cache for the session routes (invalidated by a storage listener)
+response_cache = SessionResponseCache()
@@ -1,4 +1,3 @@
 from .test_session import router
 
 __all__ = ["router"]
-
@@ -0,0 +1,195 @@
+"""
+Classroom cohorts: one generated test shared by every student session
+
+A cohort is a template session whose cohort_id is its own id: it holds the
+tests of both phase types, generated (or copied) once. Student sessions are
+created with cohort_id pointing at it and the template's phase 1 test, and
+take its phase 2 test at generate-phase2, so a class costs two generations
+instead of two per student. Storage shares identical content between sessions
+(content store / content table), so N students do not hold N copies.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List, Optional
+
+from app.admission import Overloaded, llm_admission
+from app.llm_executor import llm_bound
+from app.models.test_session import Phase, SessionStatus
+from app.routes.test_session import test_generator
+from app.schemas.cohort import (
+    CohortCreate,
+    CohortSessionsCreate,
+    CohortResponse,
+    CohortSessionsResponse,
+    CohortResultsResponse,
+)
+from app.schemas.test_session import SessionResultsView
+from app.storage import storage
+from app.storage.base import MAX_PAGE_SIZE
+
+router = APIRouter()
+
+COHORT_FIELDS = (
+    "level",
+    "selected_phase",
+    "cohort_id",
+    "created_at",
+    "phase1_content",
+)
+RESULTS_FIELDS = tuple(SessionResultsView.model_fields)
+
+
+def _other_phase(phase: Phase) -> Phase:
+    if phase == Phase.LISTENING_SPEAKING:
+        return Phase.READING_WRITING
+    return Phase.LISTENING_SPEAKING
+
+
+def _get_cohort(cohort_id: int, fields=COHORT_FIELDS) -> Dict[str, Any]:
+    cohort = storage.get_session(cohort_id, fields=fields)
+    if not cohort or cohort["cohort_id"] != cohort_id:
+        raise HTTPException(status_code=404, detail=f"Cohort {cohort_id} not found")
+    return cohort
+
+
+def _source_contents(session_id: int) -> Dict[Phase, Dict[str, Any]]:
+    """Tests of an existing session by phase type"""
+    source = storage.get_session(
+        session_id, fields=("selected_phase", "phase1_content", "phase2_content")
+    )
+    if not source:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    if not source["phase1_content"]:
+        raise HTTPException(
+            status_code=400, detail=f"Session {session_id} has no generated test"
+        )
+    contents = {source["selected_phase"]: source["phase1_content"]}
+    if source["phase2_content"]:
+        contents[_other_phase(source["selected_phase"])] = source["phase2_content"]
+    return contents
+
+
+def _create_students(cohort: Dict[str, Any], count: int) -> List[int]:
+    """Student sessions ready to start phase 1 on the cohort's test"""
+    # Created with the cohort fields in one write: no half-initialized session
+    return [
+        storage.create_session(
+            cohort["level"],
+            cohort_id=cohort["id"],
+            selected_phase=cohort["selected_phase"],
+            phase1_content=cohort["phase1_content"],
+            status=SessionStatus.PHASE1_GENERATED,
+        )["id"]
+        for _ in range(count)
+    ]
+
+
+def _member_ids(cohort_id: int) -> List[int]:
+    session_ids, cursor = [], None
+    while True:
+        page, cursor = storage.list_sessions(
+            cohort_id=cohort_id, cursor=cursor, limit=MAX_PAGE_SIZE
+        )
+        session_ids.extend(s["id"] for s in page if s["id"] != cohort_id)
+        if cursor is None:
+            return session_ids
+
+
+@router.post("/cohorts", response_model=CohortResponse)
+@llm_bound
+def create_cohort(data: CohortCreate):
+    """Tạo lớp (cohort): tạo đề 1 lần cho cả lớp và tạo sẵn session cho học viên"""
+    contents = {}
+    if data.source_session_id is not None:
+        contents = _source_contents(data.source_session_id)
+
+    # Both phase types at once (phase 2 is generated now, not once per student)
+    missing = [phase for phase in Phase if phase not in contents]
+    try:
+        if missing:
+            print(
+                f"Generating cohort tests ({', '.join(phase.value for phase in missing)}) for {data.level.value}"
+            )
+            with llm_admission.admit(), ThreadPoolExecutor(
+                max_workers=len(missing)
+            ) as pool:
+                futures = {
+                    phase: pool.submit(test_generator.generate, phase, data.level)
+                    for phase in missing
+                }
+                contents.update(
+                    {phase: future.result() for phase, future in futures.items()}
+                )
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"Cohort generation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
+
+    cohort = storage.create_session(
+        data.level,
+        selected_phase=data.phase,
+        phase1_content=contents[data.phase],
+        phase2_content=contents[_other_phase(data.phase)],
+        status=SessionStatus.PHASE1_GENERATED,
+    )
+    # Its own ID is only known once created: the self-reference is a second write
+    cohort = storage.update_session(cohort["id"], cohort_id=cohort["id"])
+    session_ids = _create_students(cohort, data.students)
+    print(f"Cohort {cohort['id']} created with {len(session_ids)} sessions")
+    return CohortResponse(**cohort, session_ids=session_ids)
+
+
+@router.get("/cohorts/{cohort_id}", response_model=CohortResponse)
+def get_cohort(cohort_id: int):
+    """Thông tin lớp và danh sách session của học viên"""
+    cohort = _get_cohort(
+        cohort_id, fields=("level", "selected_phase", "cohort_id", "created_at")
+    )
+    return CohortResponse(**cohort, session_ids=_member_ids(cohort_id))
+
+
+@router.post("/cohorts/{cohort_id}/sessions", response_model=CohortSessionsResponse)
+def create_cohort_sessions(cohort_id: int, data: CohortSessionsCreate):
+    """Tạo hàng loạt session cho học viên (dùng chung đề của lớp)"""
+    cohort = _get_cohort(cohort_id)
+    return CohortSessionsResponse(
+        cohort_id=cohort_id, session_ids=_create_students(cohort, data.count)
+    )
+
+
+@router.post("/cohorts/{cohort_id}/join", response_model=CohortSessionsResponse)
+def join_cohort(cohort_id: int):
+    """Học viên tham gia lớp: tạo 1 session, làm phase 1 ngay"""
+    cohort = _get_cohort(cohort_id)
+    return CohortSessionsResponse(
+        cohort_id=cohort_id, session_ids=_create_students(cohort, 1)
+    )
+
+
+@router.get("/cohorts/{cohort_id}/results", response_model=CohortResultsResponse)
+def get_cohort_results(
+    cohort_id: int,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Kết quả của cả lớp (mới nhất trước); trang tiếp theo: ?cursor=<next_cursor>"""
+    _get_cohort(cohort_id, fields=("cohort_id",))
+    # One row more than the page: the template (the cohort's oldest session) is
+    # dropped and the page still holds `limit` students
+    page, next_cursor = storage.list_sessions(
+        cohort_id=cohort_id, cursor=cursor, limit=limit + 1
+    )
+    members = [summary for summary in page if summary["id"] != cohort_id]
+    if len(members) > limit:
+        members = members[:limit]
+        next_cursor = members[-1]["id"]
+    sessions = []
+    for summary in members:
+        session = storage.get_session(summary["id"], fields=RESULTS_FIELDS)
+        if session:
+            sessions.append(session)
+    return CohortResultsResponse(
+        cohort_id=cohort_id, sessions=sessions, next_cursor=next_cursor
+    )
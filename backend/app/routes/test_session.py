@@ -1,81 +1,394 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import (
+    APIRouter,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
-from typing import Dict, Any
-
-from app.storage import storage
+from typing import AsyncIterator, Dict, Any, Optional, Union
+import os
+import zlib
+
+from app.admission import Overloaded, llm_admission
+from app.events import CLOSED, Subscription, event_bus
+from app.llm_executor import llm_bound
+
+from app.responses import (
+    FAST_RESPONSES,
+    FastJSONResponse,
+    mark_encoded,
+    negotiate_encoding,
+    render_json,
+    response_cache,
+)
+from app.storage import storage, VersionConflictError
+from app.storage.base import (
+    ANSWERS_FIELDS,
+    MAX_PAGE_SIZE,
+    PRESENCE_FLAGS,
+    apply_answers_delta,
+)
 from app.models.test_session import Level, Phase, SessionStatus
 from app.schemas.test_session import (
     SessionCreate,
     SessionResponse,
     PhaseSelection,
     AnswersSubmit,
+    AnswersPatch,
+    AnswersPatchResponse,
+    AnswersState,
     SessionStatusResponse,
+    SessionListResponse,
+    SessionView,
+    SessionCandidateView,
+    SessionResultsView,
 )
 from app.services.test_generator import TestGeneratorService
 from app.services.scoring_service import ScoringService
+from app.services.part_scoring import PartScorer
+from app.services.lazy import LazyService
 
 router = APIRouter()
 
-test_generator = TestGeneratorService()
-scoring_service = ScoringService()
+# Built on first use, so startup and the routes that never score or generate
+# do not wait for the Gemini stack
+test_generator = LazyService(TestGeneratorService)
+scoring_service = LazyService(ScoringService)
+part_scorer = PartScorer(scoring_service)
+
+# Seconds between keep-alive messages on an idle event stream
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("SESSION_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Projection for the status endpoint: presence flags instead of the content itself
+STATUS_FIELDS = (
+    "status",
+    "level",
+    "selected_phase",
+    "has_phase1_content",
+    "has_phase2_content",
+    "has_phase1_scores",
+    "has_phase2_scores",
+)
+
+# Slim views: the model and the fields read for it (a storage projection, nothing else
+# is decoded or copied)
+VIEW_MODELS = {
+    SessionView.FULL: SessionResponse,
+    SessionView.CANDIDATE: SessionCandidateView,
+    SessionView.RESULTS: SessionResultsView,
+}
+VIEW_FIELDS = {view: tuple(model.model_fields) for view, model in VIEW_MODELS.items()}
+
+# Answer keys in generated content, removed from the candidate view. Listening
+# sections keep their audio_transcript: the test page reads it aloud with the
+# browser's text-to-speech (there is no audio file), so the candidate needs it
+ANSWER_KEYS = frozenset({"correct_answer"})
+
+# Revalidate on every poll: browsers then send If-None-Match and get a 304 when unchanged
+REVALIDATE = "no-cache"
+
+
+def _etag(session: Dict[str, Any], variant: str = "") -> str:
+    """Strong ETag of a session version (variant: which view / field set it is)"""
+    return f'"{session["id"]}-{session["version"]}{variant}"'
+
+
+def _etag_matches(header: Optional[str], etag: str, any_variant: bool = False) -> bool:
+    """any_variant: compare versions only (If-Match from any view's ETag)"""
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    if any_variant:
+        tags = [
+            tag if tag == "*" else tag.split(".")[0].rstrip('"') + '"' for tag in tags
+        ]
+    return "*" in tags or etag in tags
+
+
+def _expected_version(session: Dict[str, Any], if_match: Optional[str]):
+    """If-Match -> version for a compare-and-set update (412 when it is stale)"""
+    if if_match is None:
+        return None
+    etag = _etag(session)
+    if not _etag_matches(if_match, etag, any_variant=True):
+        raise HTTPException(
+            status_code=412,
+            detail="Session has been modified (If-Match does not match)",
+            headers={"ETag": etag},
+        )
+    return session["version"]
+
+
+def _strip_answer_keys(value: Any) -> Any:
+    """Remove answer keys in place (storage hands out a fresh copy of the content)"""
+    if isinstance(value, dict):
+        for key in ANSWER_KEYS.intersection(value):
+            del value[key]
+        for child in value.values():
+            _strip_answer_keys(child)
+    elif isinstance(value, list):
+        for child in value:
+            _strip_answer_keys(child)
+    return value
+
+
+def _view_fields(session: Dict[str, Any], view: SessionView, fields=None) -> dict:
+    """Only the fields of a view (read one by one, not a copy of the whole session)"""
+    projected = {name: session[name] for name in fields or VIEW_FIELDS[view]}
+    if view == SessionView.CANDIDATE:
+        for name in ("phase1_content", "phase2_content"):
+            if projected.get(name):
+                _strip_answer_keys(projected[name])
+    return projected
+
+
+def _variant(view: SessionView, fields: Optional[tuple] = None) -> str:
+    """Which representation of a session version (ETag suffix, response cache key)"""
+    variant = "" if view == SessionView.FULL else f".{view.value}"
+    if fields:
+        variant += f".{zlib.crc32(','.join(sorted(fields)).encode()):08x}"
+    return variant
+
+
+def _encoded_response(encoded: tuple, response: Response) -> Response:
+    """Response for a pre-encoded (body, content-encoding) pair"""
+    body, encoding = encoded
+    sent = Response(body, media_type="application/json", headers=response.headers)
+    if encoding:
+        mark_encoded(sent.headers, encoding, len(body))
+    return sent
+
+
+def _cached_view(
+    session_id: int,
+    version: int,
+    variant: str,
+    response: Response,
+    encoding: Optional[str] = None,
+) -> Optional[Response]:
+    """Cached body of this session version + representation, if any"""
+    if not response_cache.enabled:
+        return None
+    encoded = response_cache.get(session_id, version, variant, encoding)
+    if not encoded:
+        return None
+    response.headers["ETag"] = _etag({"id": session_id, "version": version}, variant)
+    return _encoded_response(encoded, response)
+
+
+def _view(
+    session: Dict[str, Any],
+    view: SessionView,
+    response: Response,
+    fields=None,
+    variant: Optional[str] = None,
+    encoding: Optional[str] = None,
+):
+    """Response for a view, tagged with the ETag of that representation (other
+    headers already set on the injected response are kept)
+
+    - response cache on: the encoded body of this version, rendered at most once
+    - FAST_RESPONSES: pre-rendered JSON, else the Pydantic model
+    """
+    if variant is None:
+        variant = _variant(view, fields)
+    response.headers["ETag"] = _etag(session, variant)
+    if response_cache.enabled:
+        key = (session["id"], session["version"], variant)
+        encoded = response_cache.get(*key, encoding)
+        if encoded is None:
+            body = render_json(_view_fields(session, view, fields))
+            encoded = response_cache.put(*key, body, encoding)
+        return _encoded_response(encoded, response)
+
+    payload = _view_fields(session, view, fields)
+    if FAST_RESPONSES:
+        return FastJSONResponse(payload, headers=response.headers)
+    if fields is not None:
+        return JSONResponse(jsonable_encoder(payload), headers=response.headers)
+    return VIEW_MODELS[view](**payload)
+
+
+def _parse_fields(fields: Optional[str], view: SessionView) -> Optional[tuple]:
+    """fields=a,b -> projection (400 for a field the view does not have)"""
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(filter(None, map(str.strip, fields.split(",")))))
+    allowed = set(VIEW_FIELDS[view]) | set(PRESENCE_FLAGS)
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields for the {view.value} view: {', '.join(unknown)}",
+        )
+    return names
+
+
+def _status_response(session: Dict[str, Any]) -> SessionStatusResponse:
+    """Status of a STATUS_FIELDS projection"""
+    return SessionStatusResponse(
+        id=session["id"],
+        status=session["status"],
+        level=session["level"],
+        selected_phase=session["selected_phase"],
+        phase1_available=session["has_phase1_content"],
+        phase2_available=session["has_phase2_content"],
+        phase1_completed=session["has_phase1_scores"],
+        phase2_completed=session["has_phase2_scores"],
+    )
+
+
+def _status_event(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **_status_response(session).model_dump(mode="json"),
+        "version": session["version"],
+    }
+
+
+def _publish_session_change(session_id: int, session: Optional[Dict[str, Any]]):
+    """Storage listener: the session's new state to its event subscribers"""
+    if not event_bus.has_subscribers(session_id):
+        return
+    if session is None:
+        event_bus.publish(session_id, "deleted")
+        return
+    current = storage.get_session(session_id, fields=STATUS_FIELDS)
+    if current:
+        event_bus.publish(session_id, "session", _status_event(current))
+
+
+def _publish(session_id: int, event: str, **data):
+    """Progress / partial result for the session's event stream (no-op without subscribers)"""
+    event_bus.publish(session_id, event, data)
+
+
+def _score_skill(session_id: int, phase: int, skill: str, score, *args):
+    """Score one skill, streaming progress and the skill's result as partial results"""
+    _publish(session_id, "progress", stage="scoring", phase=phase, skill=skill)
+    result = score(*args)
+    _publish(session_id, "partial_result", phase=phase, skill=skill, scores=result)
+    return result
+
+
+def _phase_type(selected_phase: Phase, phase: int) -> Phase:
+    """Skills of phase 1 (the selected ones) or phase 2 (the other ones)"""
+    if phase == 1:
+        return selected_phase
+    if selected_phase == Phase.LISTENING_SPEAKING:
+        return Phase.READING_WRITING
+    return Phase.LISTENING_SPEAKING
+
+
+def _subjective_scorer(session_id: int, phase: int, skill: str):
+    """Speaking/writing scorer: combines the part scores when parts were scored in
+    the background during the phase, else scores the whole skill in one call"""
+    if part_scorer.started(session_id, phase, skill):
+        return lambda content, answers: part_scorer.collect(
+            session_id, phase, skill, content, answers
+        )
+    return getattr(scoring_service, f"score_{skill}")
+
+
+def _final_answers(
+    session: Dict[str, Any], phase: int, submitted: Optional[AnswersSubmit]
+) -> Dict[str, Any]:
+    """Answers to score: the autosaved ones, with answers sent at submit on top"""
+    answers = dict(session[ANSWERS_FIELDS[phase][0]] or {})
+    if submitted is not None and submitted.answers:
+        apply_answers_delta(answers, submitted.answers)
+    return answers
+
+
+# Cached response bodies of older versions are freed as soon as a session changes;
+# subscribers of the event stream hear about every change
+storage.add_listener(response_cache.invalidate)
+storage.add_listener(_publish_session_change)
+storage.add_listener(part_scorer.discard)
 
 
 @router.post("/sessions", response_model=SessionResponse)
-def create_session(session_data: SessionCreate):
+def create_session(session_data: SessionCreate, response: Response):
     """1. Khởi tạo: Tạo test_session với level"""
     session = storage.create_session(session_data.level)
-    return SessionResponse(**session)
+    return _view(session, SessionView.FULL, response)
 
 
 @router.post("/sessions/{session_id}/select-phase", response_model=SessionResponse)
-def select_phase(session_id: int, phase_data: PhaseSelection):
+def select_phase(
+    session_id: int,
+    phase_data: PhaseSelection,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
     """2. Chọn phần làm trước: User chọn phase (Listening & Speaking hoặc Reading & Writing)"""
-    session = storage.get_session(session_id)
+    session = storage.get_session(session_id, fields=("status",))
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
+    expected_version = _expected_version(session, if_match)
     if session["status"] != SessionStatus.INITIALIZED:
         raise HTTPException(status_code=400, detail="Phase already selected")
 
     session = storage.update_session(
         session_id,
+        expected_version=expected_version,
         selected_phase=phase_data.phase,
         status=SessionStatus.PHASE1_SELECTED,
     )
-    return SessionResponse(**session)
+    return _view(session, SessionView.FULL, response)
 
 
-@router.post("/sessions/{session_id}/generate", response_model=SessionResponse)
-def generate_phase_content(session_id: int):
+@router.post("/sessions/{session_id}/generate", response_model=SessionCandidateView)
+@llm_bound
+def generate_phase_content(
+    session_id: int, response: Response, if_match: Optional[str] = Header(None)
+):
     """3. Generate đề: Tạo đề cho phase đã chọn (chỉ gọi AI 1 lần)"""
-    session = storage.get_session(session_id)
+    session = storage.get_session(
+        session_id, fields=("selected_phase", "level", "has_phase1_content")
+    )
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    expected_version = _expected_version(session, if_match)
 
     if not session["selected_phase"]:
         raise HTTPException(status_code=400, detail="Please select a phase first")
 
     # Check if phase 1 already generated
-    if session["phase1_content"]:
-        return SessionResponse(**session)
+    if session["has_phase1_content"]:
+        cached = _cached_view(
+            session_id, session["version"], _variant(SessionView.CANDIDATE), response
+        )
+        if cached:
+            return cached
+        session = storage.get_session(
+            session_id, fields=VIEW_FIELDS[SessionView.CANDIDATE]
+        )
+        return _view(session, SessionView.CANDIDATE, response)
 
     # Generate content for selected phase
+    _publish(session_id, "progress", stage="generating", phase=1)
     try:
         print(
             f"Generating content for session {session_id}, phase: {session['selected_phase']}, level: {session['level']}"
         )
-        if session["selected_phase"] == Phase.LISTENING_SPEAKING:
-            content = test_generator.generate_listening_speaking(session["level"])
-        elif session["selected_phase"] == Phase.READING_WRITING:
-            content = test_generator.generate_reading_writing(session["level"])
-        else:
-            raise HTTPException(status_code=400, detail="Invalid phase")
+        with llm_admission.admit():
+            if session["selected_phase"] == Phase.LISTENING_SPEAKING:
+                content = test_generator.generate_listening_speaking(session["level"])
+            elif session["selected_phase"] == Phase.READING_WRITING:
+                content = test_generator.generate_reading_writing(session["level"])
+            else:
+                raise HTTPException(status_code=400, detail="Invalid phase")
 
         print(f"Content generated successfully for session {session_id}")
         print(
@@ -90,7 +403,10 @@ def generate_phase_content(session_id: int):
             )
 
         session = storage.update_session(
-            session_id, phase1_content=content, status=SessionStatus.PHASE1_GENERATED
+            session_id,
+            expected_version=expected_version,
+            phase1_content=content,
+            status=SessionStatus.PHASE1_GENERATED,
         )
         if not session:
             raise HTTPException(
@@ -98,14 +414,14 @@ def generate_phase_content(session_id: int):
             )
 
         try:
-            return SessionResponse(**session)
+            return _view(session, SessionView.CANDIDATE, response)
         except Exception as e:
-            print(f"Error creating SessionResponse: {e}")
+            print(f"Error creating SessionCandidateView: {e}")
             print(f"Session keys: {list(session.keys())}")
             raise HTTPException(
                 status_code=500, detail=f"Error creating response: {str(e)}"
             )
-    except HTTPException:
+    except (HTTPException, VersionConflictError, Overloaded):
         raise
     except Exception as e:
         import traceback
@@ -115,124 +431,359 @@ def generate_phase_content(session_id: int):
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
 
-@router.get("/sessions/{session_id}", response_model=SessionResponse)
-def get_session(session_id: int):
-    """Lấy thông tin session"""
-    session = storage.get_session(session_id)
+@router.get(
+    "/sessions/{session_id}",
+    response_model=Union[SessionResponse, SessionCandidateView, SessionResultsView],
+)
+def get_session(
+    session_id: int,
+    response: Response,
+    view: SessionView = SessionView.FULL,
+    fields: Optional[str] = Query(None, description="Comma-separated field names"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """Lấy thông tin session
+    - view: full (mặc định) | candidate (đề không kèm đáp án) | results (điểm và kết quả)
+    - fields=a,b: chỉ trả về các trường này (của view đã chọn)
+    - 304 nếu If-None-Match trùng ETag hiện tại
+    """
+    projection = _parse_fields(fields, view)
+    variant = _variant(view, projection)
+    encoding = negotiate_encoding(accept_encoding or "") if FAST_RESPONSES else None
+    if if_none_match is not None or response_cache.enabled:
+        # Version-only read: enough for a 304 or a response cache hit
+        current = storage.get_session(session_id, fields=())
+        if current:
+            etag = _etag(current, variant)
+            if _etag_matches(if_none_match, etag):
+                return Response(
+                    status_code=304,
+                    headers={"ETag": etag, "Cache-Control": REVALIDATE},
+                )
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = REVALIDATE
+            cached = _cached_view(
+                session_id, current["version"], variant, response, encoding
+            )
+            if cached:
+                return cached
+
+    if projection:
+        session = storage.get_session(session_id, fields=projection)
+    elif view == SessionView.FULL:
+        session = storage.get_session(session_id)
+    else:
+        session = storage.get_session(session_id, fields=VIEW_FIELDS[view])
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
-    return SessionResponse(**session)
+    response.headers["ETag"] = _etag(session, variant)
+    response.headers["Cache-Control"] = REVALIDATE
+    return _view(
+        session,
+        view,
+        response,
+        session.keys() if projection else None,
+        variant=variant,
+        encoding=encoding,
+    )
 
 
 @router.post("/sessions/{session_id}/start-phase1")
-def start_phase1(session_id: int):
+def start_phase1(
+    session_id: int, response: Response, if_match: Optional[str] = Header(None)
+):
     """Bắt đầu làm phase 1"""
-    session = storage.get_session(session_id)
+    session = storage.get_session(session_id, fields=("has_phase1_content",))
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
-    if not session["phase1_content"]:
+    expected_version = _expected_version(session, if_match)
+    if not session["has_phase1_content"]:
         raise HTTPException(status_code=400, detail="Phase 1 content not generated")
 
-    storage.update_session(
+    session = storage.update_session(
         session_id,
+        expected_version=expected_version,
         status=SessionStatus.PHASE1_IN_PROGRESS,
         phase1_started_at=datetime.now(),
     )
+    response.headers["ETag"] = _etag(session)
     return {"message": "Phase 1 started", "session_id": session_id}
 
 
-@router.post("/sessions/{session_id}/submit-phase1", response_model=SessionResponse)
-def submit_phase1(session_id: int, answers: AnswersSubmit):
+@router.post("/sessions/{session_id}/submit-phase1", response_model=SessionResultsView)
+@llm_bound
+def submit_phase1(
+    session_id: int,
+    response: Response,
+    answers: Optional[AnswersSubmit] = None,
+    if_match: Optional[str] = Header(None),
+):
     """5. Nộp bài phase 1: AI chấm điểm và lưu kết quả"""
     session = storage.get_session(session_id)
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
+    expected_version = _expected_version(session, if_match)
     if not session["phase1_content"]:
         raise HTTPException(status_code=400, detail="Phase 1 content not generated")
+    phase1_answers = _final_answers(session, 1, answers)
 
-    # Score phase 1
-    try:
-        scores = {}
-        print(
-            f"Starting scoring for phase 1, selected_phase: {session['selected_phase']}"
-        )
-
-        if session["selected_phase"] == Phase.LISTENING_SPEAKING:
-            print("Scoring Listening & Speaking...")
-            scores["listening"] = scoring_service.score_listening(
-                session["phase1_content"], answers.answers
-            )
-            print("Listening scored, starting Speaking...")
-            scores["speaking"] = scoring_service.score_speaking(
-                session["phase1_content"], answers.answers
-            )
-            print("Speaking scored")
-        elif session["selected_phase"] == Phase.READING_WRITING:
-            print("Scoring Reading & Writing...")
-            scores["reading"] = scoring_service.score_reading(
-                session["phase1_content"], answers.answers
+    # Score phase 1 (holds an LLM admission slot)
+    with llm_admission.admit():
+        try:
+            scores = {}
+            print(
+                f"Starting scoring for phase 1, selected_phase: {session['selected_phase']}"
             )
-            print("Reading scored, starting Writing...")
-            scores["writing"] = scoring_service.score_writing(
-                session["phase1_content"], answers.answers
+
+            if session["selected_phase"] == Phase.LISTENING_SPEAKING:
+                print("Scoring Listening & Speaking...")
+                scores["listening"] = _score_skill(
+                    session_id,
+                    1,
+                    "listening",
+                    scoring_service.score_listening,
+                    session["phase1_content"],
+                    phase1_answers,
+                )
+                print("Listening scored, starting Speaking...")
+                scores["speaking"] = _score_skill(
+                    session_id,
+                    1,
+                    "speaking",
+                    _subjective_scorer(session_id, 1, "speaking"),
+                    session["phase1_content"],
+                    phase1_answers,
+                )
+                print("Speaking scored")
+            elif session["selected_phase"] == Phase.READING_WRITING:
+                print("Scoring Reading & Writing...")
+                scores["reading"] = _score_skill(
+                    session_id,
+                    1,
+                    "reading",
+                    scoring_service.score_reading,
+                    session["phase1_content"],
+                    phase1_answers,
+                )
+                print("Reading scored, starting Writing...")
+                scores["writing"] = _score_skill(
+                    session_id,
+                    1,
+                    "writing",
+                    _subjective_scorer(session_id, 1, "writing"),
+                    session["phase1_content"],
+                    phase1_answers,
+                )
+                print("Writing scored")
+
+            session = storage.update_session(
+                session_id,
+                expected_version=expected_version,
+                phase1_answers=phase1_answers,
+                phase1_completed_at=datetime.now(),
+                phase1_scores=scores,
+                status=SessionStatus.PHASE1_COMPLETED,
             )
-            print("Writing scored")
+            part_scorer.forget(session_id, 1)
+            print(f"Phase 1 scoring completed successfully")
+            return _view(session, SessionView.RESULTS, response)
+        except VersionConflictError:
+            raise
+        except Exception as e:
+            import traceback
 
-        session = storage.update_session(
-            session_id,
-            phase1_answers=answers.answers,
-            phase1_completed_at=datetime.now(),
-            phase1_scores=scores,
-            status=SessionStatus.PHASE1_COMPLETED,
+            error_details = traceback.format_exc()
+            print(f"Scoring error: {error_details}")
+            raise HTTPException(status_code=500, detail=f"Scoring error: {str(e)}")
+
+
+@router.post("/sessions/{session_id}/provisional-scores")
+def provisional_scores(session_id: int, answers: Optional[AnswersSubmit] = None):
+    """Điểm tạm tính tức thì (heuristic, không gọi AI) cho phase đang làm"""
+    session = storage.get_session(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
         )
-        print(f"Phase 1 scoring completed successfully")
-        return SessionResponse(**session)
-    except Exception as e:
-        import traceback
 
-        error_details = traceback.format_exc()
-        print(f"Scoring error: {error_details}")
-        raise HTTPException(status_code=500, detail=f"Scoring error: {str(e)}")
+    if not session["selected_phase"]:
+        raise HTTPException(status_code=400, detail="Please select a phase first")
 
+    # Phase 2 once phase 1 has been scored, otherwise phase 1
+    if session["phase1_scores"] is not None:
+        phase = 2
+        content = session["phase2_content"]
+        phase_type = (
+            Phase.READING_WRITING
+            if session["selected_phase"] == Phase.LISTENING_SPEAKING
+            else Phase.LISTENING_SPEAKING
+        )
+    else:
+        phase = 1
+        content = session["phase1_content"]
+        phase_type = session["selected_phase"]
 
-@router.post("/sessions/{session_id}/generate-phase2", response_model=SessionResponse)
-def generate_phase2(session_id: int):
-    """6. Generate phase 2: Tạo đề cho phase còn lại"""
-    session = storage.get_session(session_id)
+    if not content:
+        raise HTTPException(
+            status_code=400, detail=f"Phase {phase} content not generated"
+        )
+
+    return {
+        "session_id": session_id,
+        "phase": phase,
+        "provisional": True,
+        "scores": scoring_service.provisional_scores(
+            phase_type, content, _final_answers(session, phase, answers)
+        ),
+    }
+
+
+@router.patch("/sessions/{session_id}/answers", response_model=AnswersPatchResponse)
+def patch_answers(session_id: int, patch: AnswersPatch, response: Response):
+    """Lưu nháp câu trả lời: chỉ gửi các câu đã thay đổi (delta) kèm số thứ tự seq
+
+    Delta có seq không lớn hơn seq đã lưu bị bỏ qua (applied=false), nên client
+    có thể gửi lại an toàn khi mất kết nối.
+    """
+    session = storage.get_session(
+        session_id,
+        fields=(
+            "selected_phase",
+            f"has_phase{patch.phase}_content",
+            f"phase{patch.phase}_completed_at",
+        ),
+    )
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
         )
+    if not session[f"has_phase{patch.phase}_content"]:
+        raise HTTPException(
+            status_code=400, detail=f"Phase {patch.phase} content not generated"
+        )
+    if session[f"phase{patch.phase}_completed_at"] is not None:
+        raise HTTPException(
+            status_code=409, detail=f"Phase {patch.phase} has already been submitted"
+        )
+
+    skill = (
+        "speaking"
+        if _phase_type(session["selected_phase"], patch.phase)
+        == Phase.LISTENING_SPEAKING
+        else "writing"
+    )
+    unknown = set(patch.completed_parts) - set(scoring_service.SKILL_PARTS[skill])
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown parts for phase {patch.phase}: {', '.join(sorted(unknown))}",
+        )
+
+    merge = storage.merge_answers(session_id, patch.phase, patch.answers, patch.seq)
+    if merge is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    scoring_parts = []
+    if patch.completed_parts:
+        # Score the finished parts with the answers stored now (after this delta)
+        answers_field = ANSWERS_FIELDS[patch.phase][0]
+        current = storage.get_session(
+            session_id, fields=(f"phase{patch.phase}_content", answers_field)
+        )
+        if current:
+            scoring_parts = part_scorer.schedule(
+                session_id,
+                patch.phase,
+                current[f"phase{patch.phase}_content"],
+                current[answers_field] or {},
+                patch.completed_parts,
+            )
+
+    response.headers["ETag"] = _etag(merge)
+    return AnswersPatchResponse(
+        session_id=session_id,
+        phase=patch.phase,
+        seq=merge["seq"],
+        applied=merge["applied"],
+        version=merge["version"],
+        scoring_parts=scoring_parts,
+    )
+
+
+@router.get("/sessions/{session_id}/answers", response_model=AnswersState)
+def get_answers(session_id: int, phase: int = Query(..., ge=1, le=2)):
+    """Câu trả lời đã lưu nháp của một phase (khôi phục sau khi tải lại trang)"""
+    answers_field, seq_field = ANSWERS_FIELDS[phase]
+    session = storage.get_session(session_id, fields=(answers_field, seq_field))
+    if not session:
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
+    return AnswersState(
+        session_id=session_id,
+        phase=phase,
+        seq=session[seq_field] or 0,
+        answers=session[answers_field] or {},
+    )
+
 
+@router.post(
+    "/sessions/{session_id}/generate-phase2", response_model=SessionCandidateView
+)
+@llm_bound
+def generate_phase2(
+    session_id: int, response: Response, if_match: Optional[str] = Header(None)
+):
+    """6. Generate phase 2: Tạo đề cho phase còn lại"""
+    session = storage.get_session(
+        session_id,
+        fields=(
+            "status",
+            "selected_phase",
+            "level",
+            "cohort_id",
+            "has_phase2_content",
+        ),
+    )
+    if not session:
+        print(f"Session {session_id} not found")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
+        )
+
+    expected_version = _expected_version(session, if_match)
     if session["status"] != SessionStatus.PHASE1_COMPLETED:
         raise HTTPException(status_code=400, detail="Please complete phase 1 first")
 
-    if session["phase2_content"]:
-        return SessionResponse(**session)
+    if session["has_phase2_content"]:
+        cached = _cached_view(
+            session_id, session["version"], _variant(SessionView.CANDIDATE), response
+        )
+        if cached:
+            return cached
+        session = storage.get_session(
+            session_id, fields=VIEW_FIELDS[SessionView.CANDIDATE]
+        )
+        return _view(session, SessionView.CANDIDATE, response)
 
     # Determine phase 2 type
     phase2_type = (
@@ -241,115 +792,178 @@ def generate_phase2(session_id: int):
         else Phase.LISTENING_SPEAKING
     )
 
-    # Generate phase 2 content
+    # Cohort students share the phase 2 test generated with the cohort: without
+    # it they would each get a different test (and one generation call each)
+    content = None
+    if session["cohort_id"] is not None and session["cohort_id"] != session_id:
+        cohort = storage.get_session(session["cohort_id"], fields=("phase2_content",))
+        content = cohort["phase2_content"] if cohort else None
+        if content is None:
+            raise HTTPException(
+                status_code=410,
+                detail=f"Cohort {session['cohort_id']} test is no longer available",
+            )
+
     try:
-        if phase2_type == Phase.LISTENING_SPEAKING:
-            content = test_generator.generate_listening_speaking(session["level"])
-        else:
-            content = test_generator.generate_reading_writing(session["level"])
+        # Generate phase 2 content
+        if content is None:
+            with llm_admission.admit():
+                _publish(session_id, "progress", stage="generating", phase=2)
+                content = test_generator.generate(phase2_type, session["level"])
 
         session = storage.update_session(
-            session_id, phase2_content=content, status=SessionStatus.PHASE2_GENERATED
+            session_id,
+            expected_version=expected_version,
+            phase2_content=content,
+            status=SessionStatus.PHASE2_GENERATED,
         )
-        return SessionResponse(**session)
+        return _view(session, SessionView.CANDIDATE, response)
+    except (VersionConflictError, Overloaded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
 
 @router.post("/sessions/{session_id}/start-phase2")
-def start_phase2(session_id: int):
+def start_phase2(
+    session_id: int, response: Response, if_match: Optional[str] = Header(None)
+):
     """Bắt đầu làm phase 2"""
-    session = storage.get_session(session_id)
+    session = storage.get_session(session_id, fields=("has_phase2_content",))
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
-    if not session["phase2_content"]:
+    expected_version = _expected_version(session, if_match)
+    if not session["has_phase2_content"]:
         raise HTTPException(status_code=400, detail="Phase 2 content not generated")
 
-    storage.update_session(
+    session = storage.update_session(
         session_id,
+        expected_version=expected_version,
         status=SessionStatus.PHASE2_IN_PROGRESS,
         phase2_started_at=datetime.now(),
     )
+    response.headers["ETag"] = _etag(session)
     return {"message": "Phase 2 started", "session_id": session_id}
 
 
-@router.post("/sessions/{session_id}/submit-phase2", response_model=SessionResponse)
-def submit_phase2(session_id: int, answers: AnswersSubmit):
+@router.post("/sessions/{session_id}/submit-phase2", response_model=SessionResultsView)
+@llm_bound
+def submit_phase2(
+    session_id: int,
+    response: Response,
+    answers: Optional[AnswersSubmit] = None,
+    if_match: Optional[str] = Header(None),
+):
     """7. Nộp bài phase 2: AI chấm điểm phase 2"""
     session = storage.get_session(session_id)
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
+    expected_version = _expected_version(session, if_match)
     if not session["phase2_content"]:
         raise HTTPException(status_code=400, detail="Phase 2 content not generated")
+    phase2_answers = _final_answers(session, 2, answers)
 
-    # Score phase 2
-    try:
-        scores = {}
-        phase2_type = (
-            Phase.READING_WRITING
-            if session["selected_phase"] == Phase.LISTENING_SPEAKING
-            else Phase.LISTENING_SPEAKING
-        )
-
-        if phase2_type == Phase.LISTENING_SPEAKING:
-            scores["listening"] = scoring_service.score_listening(
-                session["phase2_content"], answers.answers
-            )
-            scores["speaking"] = scoring_service.score_speaking(
-                session["phase2_content"], answers.answers
-            )
-        else:
-            scores["reading"] = scoring_service.score_reading(
-                session["phase2_content"], answers.answers
-            )
-            scores["writing"] = scoring_service.score_writing(
-                session["phase2_content"], answers.answers
+    # Score phase 2 (holds an LLM admission slot)
+    with llm_admission.admit():
+        try:
+            scores = {}
+            phase2_type = (
+                Phase.READING_WRITING
+                if session["selected_phase"] == Phase.LISTENING_SPEAKING
+                else Phase.LISTENING_SPEAKING
             )
 
-        session = storage.update_session(
-            session_id,
-            phase2_answers=answers.answers,
-            phase2_completed_at=datetime.now(),
-            phase2_scores=scores,
-            status=SessionStatus.PHASE2_COMPLETED,
-        )
-        return SessionResponse(**session)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Scoring error: {str(e)}")
+            if phase2_type == Phase.LISTENING_SPEAKING:
+                scores["listening"] = _score_skill(
+                    session_id,
+                    2,
+                    "listening",
+                    scoring_service.score_listening,
+                    session["phase2_content"],
+                    phase2_answers,
+                )
+                scores["speaking"] = _score_skill(
+                    session_id,
+                    2,
+                    "speaking",
+                    _subjective_scorer(session_id, 2, "speaking"),
+                    session["phase2_content"],
+                    phase2_answers,
+                )
+            else:
+                scores["reading"] = _score_skill(
+                    session_id,
+                    2,
+                    "reading",
+                    scoring_service.score_reading,
+                    session["phase2_content"],
+                    phase2_answers,
+                )
+                scores["writing"] = _score_skill(
+                    session_id,
+                    2,
+                    "writing",
+                    _subjective_scorer(session_id, 2, "writing"),
+                    session["phase2_content"],
+                    phase2_answers,
+                )
+
+            session = storage.update_session(
+                session_id,
+                expected_version=expected_version,
+                phase2_answers=phase2_answers,
+                phase2_completed_at=datetime.now(),
+                phase2_scores=scores,
+                status=SessionStatus.PHASE2_COMPLETED,
+            )
+            part_scorer.forget(session_id, 2)
+            return _view(session, SessionView.RESULTS, response)
+        except VersionConflictError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Scoring error: {str(e)}")
 
 
-@router.post("/sessions/{session_id}/aggregate", response_model=SessionResponse)
-def aggregate_results(session_id: int):
+@router.post("/sessions/{session_id}/aggregate", response_model=SessionResultsView)
+def aggregate_results(
+    session_id: int, response: Response, if_match: Optional[str] = Header(None)
+):
     """8. Tổng hợp kết quả: Tính IELTS equivalent và phân tích"""
-    session = storage.get_session(session_id)
+    session = storage.get_session(session_id, fields=("status", "has_final_results"))
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
-        )
+        print(f"Session {session_id} not found")
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
+    expected_version = _expected_version(session, if_match)
+
+    # Already aggregated (status is then COMPLETED): repeat calls return the results
+    if session["has_final_results"]:
+        cached = _cached_view(
+            session_id, session["version"], _variant(SessionView.RESULTS), response
+        )
+        if cached:
+            return cached
+        session = storage.get_session(
+            session_id, fields=VIEW_FIELDS[SessionView.RESULTS]
+        )
+        return _view(session, SessionView.RESULTS, response)
+
     if session["status"] != SessionStatus.PHASE2_COMPLETED:
         raise HTTPException(status_code=400, detail="Please complete both phases first")
-
-    if session["final_results"]:
-        return SessionResponse(**session)
+    session = storage.get_session(session_id, fields=VIEW_FIELDS[SessionView.RESULTS])
 
     # Aggregate results
     phase2_type = (
@@ -365,111 +979,393 @@ def aggregate_results(session_id: int):
         phase2_type,
     )
 
-    # Generate detailed analysis (optimized to reduce token usage)
-    try:
-        print("Generating detailed analysis...")
-        detailed_analysis = scoring_service.generate_detailed_analysis(
-            session["phase1_scores"] or {},
-            session["phase2_scores"] or {},
-            session["selected_phase"],
-            phase2_type,
-            session["phase1_content"] or {},
-            session["phase2_content"] or {},
-            session["phase1_answers"] or {},
-            session["phase2_answers"] or {},
-            final_results,
-        )
-        final_results["detailed_analysis"] = detailed_analysis
-        print("Detailed analysis generated successfully")
-    except Exception as e:
-        print(f"Error generating detailed analysis (non-critical): {e}")
-        # Continue without analysis - it's optional
-        final_results["detailed_analysis"] = {"ielts_analysis": {}, "beyond_ielts": {}}
+    # Detailed analysis is generated lazily, per skill, when the results page asks for it
+    final_results["detailed_analysis"] = {"ielts_analysis": {}, "beyond_ielts": {}}
 
     session = storage.update_session(
-        session_id, final_results=final_results, status=SessionStatus.COMPLETED
+        session_id,
+        expected_version=expected_version,
+        final_results=final_results,
+        status=SessionStatus.COMPLETED,
     )
-    return SessionResponse(**session)
+    return _view(session, SessionView.RESULTS, response)
 
 
-@router.post("/sessions/{session_id}/generate-analysis", response_model=SessionResponse)
-def generate_detailed_analysis_endpoint(session_id: int):
+@router.post(
+    "/sessions/{session_id}/generate-analysis", response_model=SessionResultsView
+)
+@llm_bound
+def generate_detailed_analysis_endpoint(session_id: int, response: Response):
     """Generate detailed analysis (call this after displaying basic results)"""
+    session = storage.get_session(session_id, fields=("final_results",))
+    if not session:
+        print(f"Session {session_id} not found")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
+        )
+
+    if not session["final_results"]:
+        raise HTTPException(status_code=400, detail="Please aggregate results first")
+
+    missing = _missing_analysis_parts(session["final_results"])
+    if not missing:
+        cached = _cached_view(
+            session_id, session["version"], _variant(SessionView.RESULTS), response
+        )
+        if cached:
+            return cached
+        session = storage.get_session(
+            session_id, fields=VIEW_FIELDS[SessionView.RESULTS]
+        )
+        return _view(session, SessionView.RESULTS, response)
+
+    # Analysis prompts use the content and answers too
     session = storage.get_session(session_id)
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    _publish(session_id, "progress", stage="analysis", parts=len(missing))
+    try:
+        with llm_admission.admit():
+            total_parts = sum(
+                len(skills) for skills in scoring_service.ANALYSIS_SKILLS.values()
+            )
+            if len(missing) == total_parts:
+                # Nothing generated yet: 2 combined calls are cheaper than one per skill
+                generated = scoring_service.generate_detailed_analysis(
+                    *_analysis_args(session)
+                )
+                parts = {
+                    (kind, skill): generated.get(result_key, {}).get(skill)
+                    for kind, result_key in scoring_service.ANALYSIS_RESULT_KEYS.items()
+                    for skill in scoring_service.ANALYSIS_SKILLS[kind]
+                }
+            else:
+                # Only the parts still missing: one combined call per kind, not per skill
+                parts = scoring_service.generate_analysis_parts(
+                    missing, *_analysis_args(session)
+                )
+
+        session = _store_analysis_parts(session_id, parts) or session
+        return _view(session, SessionView.RESULTS, response)
+    except Overloaded:
+        raise
+    except Exception as e:
+        # Log error but don't fail - analysis is optional
+        print(f"Error generating detailed analysis: {e}")
+        # Return session without analysis
+        return _view(session, SessionView.RESULTS, response)
+
+
+@router.get("/sessions/{session_id}/analysis/{kind}")
+@llm_bound
+def get_kind_analysis(
+    session_id: int,
+    kind: str,
+    skills: Optional[str] = Query(
+        None, description="Comma-separated skills (default: all of the kind)"
+    ),
+):
+    """Phân tích chi tiết cho nhiều kỹ năng của 1 loại (kind: ielts | beyond)
+    - skills=a,b: chỉ các kỹ năng này; các kỹ năng chưa có được tạo trong 1 lần gọi
+    """
+    session = storage.get_session(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
+        )
+
+    if kind not in scoring_service.ANALYSIS_SKILLS:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis kind: {kind}")
+    requested = (
+        list(
+            dict.fromkeys(skill.strip() for skill in skills.split(",") if skill.strip())
+        )
+        if skills
+        else list(scoring_service.ANALYSIS_SKILLS[kind])
+    )
+    unknown = [
+        skill
+        for skill in requested
+        if skill not in scoring_service.ANALYSIS_SKILLS[kind]
+    ]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown analysis skill: {','.join(unknown)}"
         )
+
+    if not session["final_results"]:
+        raise HTTPException(status_code=400, detail="Please aggregate results first")
+
+    result_key = scoring_service.ANALYSIS_RESULT_KEYS[kind]
+    existing = (session["final_results"].get("detailed_analysis") or {}).get(
+        result_key
+    ) or {}
+    analyses = {skill: existing[skill] for skill in requested if existing.get(skill)}
+    missing = [skill for skill in requested if skill not in analyses]
+    if not missing:
+        return {"kind": kind, "analyses": analyses, "generated": []}
+
+    try:
+        with llm_admission.admit():
+            generated = scoring_service.generate_kind_analysis(
+                kind, missing, *_analysis_args(session)
+            )
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"Error generating {kind}/{','.join(missing)} analysis: {e}")
+        raise HTTPException(status_code=502, detail=f"Analysis error: {str(e)}")
+
+    _store_analysis_parts(
+        session_id, {(kind, skill): analysis for skill, analysis in generated.items()}
+    )
+    analyses.update(generated)
+    return {"kind": kind, "analyses": analyses, "generated": missing}
+
+
+@router.get("/sessions/{session_id}/analysis/{kind}/{skill}")
+@llm_bound
+def get_skill_analysis(session_id: int, kind: str, skill: str):
+    """Phân tích chi tiết cho 1 kỹ năng (kind: ielts | beyond), tạo khi được yêu cầu lần đầu"""
+    session = storage.get_session(session_id)
+    if not session:
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
+    if kind not in scoring_service.ANALYSIS_SKILLS:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis kind: {kind}")
+    if skill not in scoring_service.ANALYSIS_SKILLS[kind]:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis skill: {skill}")
+
     if not session["final_results"]:
         raise HTTPException(status_code=400, detail="Please aggregate results first")
 
-    # Check if analysis already exists
-    if session["final_results"].get("detailed_analysis"):
-        return SessionResponse(**session)
+    result_key = scoring_service.ANALYSIS_RESULT_KEYS[kind]
+    existing = (
+        (session["final_results"].get("detailed_analysis") or {})
+        .get(result_key, {})
+        .get(skill)
+    )
+    if existing:
+        return {"kind": kind, "skill": skill, "analysis": existing, "cached": True}
 
+    try:
+        with llm_admission.admit():
+            analysis = scoring_service.generate_skill_analysis(
+                kind, skill, *_analysis_args(session)
+            )
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"Error generating {kind}/{skill} analysis: {e}")
+        raise HTTPException(status_code=502, detail=f"Analysis error: {str(e)}")
+
+    _store_analysis_parts(session_id, {(kind, skill): analysis})
+    return {"kind": kind, "skill": skill, "analysis": analysis, "cached": False}
+
+
+def _analysis_args(session: Dict[str, Any]) -> tuple:
+    """Positional arguments shared by the ScoringService analysis methods"""
     phase2_type = (
         Phase.READING_WRITING
         if session["selected_phase"] == Phase.LISTENING_SPEAKING
         else Phase.LISTENING_SPEAKING
     )
+    return (
+        session["phase1_scores"] or {},
+        session["phase2_scores"] or {},
+        session["selected_phase"],
+        phase2_type,
+        session["phase1_content"] or {},
+        session["phase2_content"] or {},
+        session["phase1_answers"] or {},
+        session["phase2_answers"] or {},
+        session["final_results"],
+    )
+
+
+def _missing_analysis_parts(final_results: Dict[str, Any]) -> list:
+    """(kind, skill) pairs of the detailed analysis not generated yet"""
+    detailed = final_results.get("detailed_analysis") or {}
+    return [
+        (kind, skill)
+        for kind, result_key in scoring_service.ANALYSIS_RESULT_KEYS.items()
+        for skill in scoring_service.ANALYSIS_SKILLS[kind]
+        if not (detailed.get(result_key) or {}).get(skill)
+    ]
+
+
+def _store_analysis_parts(session_id: int, parts: Dict[tuple, Any]):
+    """Merge generated analysis parts into final_results (re-read to keep other parts)"""
+    parts = {key: value for key, value in parts.items() if value}
+    # Parts for other skills may be stored concurrently: compare-and-set, retry on conflict
+    while True:
+        session = storage.get_session(session_id)
+        if not session or not parts:
+            return session
 
-    # Generate detailed analysis
-    try:
-        detailed_analysis = scoring_service.generate_detailed_analysis(
-            session["phase1_scores"] or {},
-            session["phase2_scores"] or {},
-            session["selected_phase"],
-            phase2_type,
-            session["phase1_content"] or {},
-            session["phase2_content"] or {},
-            session["phase1_answers"] or {},
-            session["phase2_answers"] or {},
-            session["final_results"],
-        )
-
-        # Add detailed analysis to final results
         final_results = session["final_results"].copy()
-        final_results["detailed_analysis"] = detailed_analysis
-        session = storage.update_session(session_id, final_results=final_results)
-        return SessionResponse(**session)
-    except Exception as e:
-        # Log error but don't fail - analysis is optional
-        print(f"Error generating detailed analysis: {e}")
-        # Return session without analysis
-        return SessionResponse(**session)
+        detailed = dict(final_results.get("detailed_analysis") or {})
+        for (kind, skill), analysis in parts.items():
+            result_key = scoring_service.ANALYSIS_RESULT_KEYS[kind]
+            detailed[result_key] = {**(detailed.get(result_key) or {}), skill: analysis}
+        final_results["detailed_analysis"] = detailed
+        try:
+            return storage.update_session(
+                session_id,
+                expected_version=session["version"],
+                final_results=final_results,
+            )
+        except VersionConflictError:
+            continue
 
 
 @router.get("/sessions/{session_id}/status", response_model=SessionStatusResponse)
-def get_session_status(session_id: int):
-    """Lấy trạng thái session"""
-    session = storage.get_session(session_id)
+def get_session_status(
+    session_id: int, response: Response, if_none_match: Optional[str] = Header(None)
+):
+    """Lấy trạng thái session (không tải nội dung đề, 304 nếu không đổi)"""
+    session = storage.get_session(session_id, fields=STATUS_FIELDS)
     if not session:
-        print(
-            f"Session {session_id} not found. Available sessions: {list(storage.sessions.keys())}"
+        print(f"Session {session_id} not found")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session {session_id} not found. Please create a new session.",
+        )
+
+    etag = _etag(session)
+    if _etag_matches(if_none_match, etag):
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE}
         )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+
+    return _status_response(session)
+
+
+async def _session_events(
+    session: Dict[str, Any], subscription: Subscription
+) -> AsyncIterator[Dict[str, Any]]:
+    """Events of one stream: the current status first, then what is published
+
+    Session changes become "status" (the status changed) or "update" events,
+    with the version as id; the stream ends when the session is deleted.
+    """
+    state = _status_event(session)
+    yield {"event": "status", "id": state["version"], "data": state}
+    while True:
+        message = await subscription.get(EVENTS_HEARTBEAT_SECONDS)
+        if message is None:
+            yield {"event": "ping", "data": {}}
+        elif message is CLOSED:
+            return
+        elif message["event"] == "session":
+            data = message["data"]
+            if data["version"] <= state["version"]:
+                continue  # Already covered by the initial status
+            event = "status" if data["status"] != state["status"] else "update"
+            state = data
+            yield {"event": event, "id": data["version"], "data": data}
+        else:
+            yield {"event": message["event"], "data": message["data"]}
+            if message["event"] == "deleted":
+                return
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    if event["event"] == "ping":
+        return b": ping\n\n"  # Comment line: keeps proxies from closing the connection
+    head = f"id: {event['id']}\n" if "id" in event else ""
+    head += f"event: {event['event']}\ndata: "
+    return head.encode() + render_json(event["data"]) + b"\n\n"
+
+
+async def _subscribe(session_id: int):
+    """(subscription, current status projection); subscribed first so nothing is missed"""
+    subscription = event_bus.subscribe(session_id)
+    session = await run_in_threadpool(storage.get_session, session_id, STATUS_FIELDS)
+    if not session:
+        subscription.close()
+    return subscription, session
+
+
+@router.get("/sessions/{session_id}/events")
+async def session_events(session_id: int):
+    """Luồng sự kiện (Server-Sent Events) thay cho polling /status
+
+    - status / update: trạng thái mới (id = version)
+    - progress: đang tạo đề / đang chấm kỹ năng nào
+    - partial_result: điểm của từng kỹ năng ngay khi chấm xong
+    - deleted: session đã bị xoá (kết thúc luồng)
+    """
+    subscription, session = await _subscribe(session_id)
+    if not session:
         raise HTTPException(
             status_code=404,
             detail=f"Session {session_id} not found. Please create a new session.",
         )
 
-    return SessionStatusResponse(
-        id=session["id"],
-        status=session["status"],
-        level=session["level"],
-        selected_phase=session["selected_phase"],
-        phase1_available=session["phase1_content"] is not None,
-        phase2_available=session["phase2_content"] is not None,
-        phase1_completed=session["phase1_scores"] is not None,
-        phase2_completed=session["phase2_scores"] is not None,
+    async def stream():
+        try:
+            async for event in _session_events(session, subscription):
+                yield _sse(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@router.get("/sessions", response_model=list)
-def list_sessions():
-    """List all sessions (for debugging)"""
-    return storage.get_all_sessions()
+@router.websocket("/sessions/{session_id}/ws")
+async def session_events_ws(websocket: WebSocket, session_id: int):
+    """Cùng luồng sự kiện qua WebSocket (mỗi sự kiện là 1 JSON message)"""
+    subscription, session = await _subscribe(session_id)
+    await websocket.accept()
+    if not session:
+        await websocket.close(code=4404, reason="Session not found")
+        return
+    try:
+        async for event in _session_events(session, subscription):
+            await websocket.send_text(render_json(event).decode("utf-8"))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+
+
+@router.get("/sessions", response_model=SessionListResponse)
+def list_sessions(
+    status: Optional[SessionStatus] = None,
+    level: Optional[Level] = None,
+    selected_phase: Optional[Phase] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cohort_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Danh sách session (mới nhất trước, chỉ thông tin tóm tắt)
+
+    Lọc theo status / level / selected_phase / created_at / cohort_id; trang tiếp theo: ?cursor=<next_cursor>
+    """
+    sessions, next_cursor = storage.list_sessions(
+        status=status,
+        level=level,
+        selected_phase=selected_phase,
+        created_after=created_after,
+        created_before=created_before,
+        cohort_id=cohort_id,
+        cursor=cursor,
+        limit=limit,
+    )
+    return SessionListResponse(sessions=sessions, next_cursor=next_cursor)
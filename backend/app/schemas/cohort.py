@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+from app.models.test_session import Level, Phase
+from app.schemas.test_session import SessionResultsView
+
+# Largest number of student sessions created by one bulk request
+MAX_COHORT_BATCH = 200
+
+
+class CohortCreate(BaseModel):
+    level: Level
+    phase: Phase  # Phase the students take first (phase 2 is the other one)
+    # Reuse the tests of an existing session (or cohort) instead of generating new ones
+    source_session_id: Optional[int] = None
+    students: int = Field(0, ge=0, le=MAX_COHORT_BATCH)  # Sessions created at once
+
+
+class CohortSessionsCreate(BaseModel):
+    count: int = Field(ge=1, le=MAX_COHORT_BATCH)
+
+
+class CohortResponse(BaseModel):
+    id: int  # ID of the cohort's template session (the students' cohort_id)
+    level: Level
+    selected_phase: Phase
+    created_at: datetime
+    session_ids: List[int]  # POST: sessions created with the cohort; GET: all of them
+
+
+class CohortSessionsResponse(BaseModel):
+    cohort_id: int
+    session_ids: List[int]
+
+
+class CohortResultsResponse(BaseModel):
+    cohort_id: int
+    sessions: List[SessionResultsView]
+    next_cursor: Optional[int]  # Pass as ?cursor= for the next page (None = last page)
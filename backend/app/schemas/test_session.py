@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+import enum
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from app.models.test_session import Level, Phase, SessionStatus
 
@@ -13,6 +14,35 @@ class PhaseSelection(BaseModel):
 
 
 class AnswersSubmit(BaseModel):
+    # None / omitted: score the autosaved answers (PATCH .../answers);
+    # given: merged over the autosaved ones
+    answers: Optional[Dict[str, Any]] = None
+
+
+class AnswersPatch(BaseModel):
+    """Autosave delta: only the questions changed since the previous patch"""
+    phase: int = Field(ge=1, le=2)
+    seq: int = Field(ge=1)  # Increases with every patch of the phase
+    answers: Dict[str, Any]  # question id -> answer (None removes the answer)
+    # Sub-parts the candidate has finished (speaking_part1..3, writing_task1/2):
+    # scored in the background so submit only combines their scores
+    completed_parts: List[str] = []
+
+
+class AnswersPatchResponse(BaseModel):
+    session_id: int
+    phase: int
+    seq: int  # Last applied seq of the phase
+    applied: bool  # False: seq was already applied (retry / late duplicate)
+    version: int
+    scoring_parts: List[str] = []  # Parts whose background scoring started
+
+
+class AnswersState(BaseModel):
+    """Autosaved answers of a phase (to resume after a reload / disconnect)"""
+    session_id: int
+    phase: int
+    seq: int
     answers: Dict[str, Any]
 
 
@@ -28,11 +58,45 @@ class SessionResponse(BaseModel):
     final_results: Optional[Dict[str, Any]]
     created_at: datetime
     updated_at: Optional[datetime]
+    cohort_id: Optional[int] = None
     
     class Config:
         from_attributes = True
 
 
+class SessionView(str, enum.Enum):
+    FULL = "full"  # SessionResponse (everything, incl. answer keys)
+    CANDIDATE = "candidate"  # Test content without answer keys, no scores
+    RESULTS = "results"  # Scores and final results, no test content
+
+
+class SessionCandidateView(BaseModel):
+    """What the candidate needs while taking the test (correct answers removed)"""
+    id: int
+    level: Level
+    selected_phase: Optional[Phase]
+    status: SessionStatus
+    phase1_content: Optional[Dict[str, Any]]
+    phase2_content: Optional[Dict[str, Any]]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+class SessionResultsView(BaseModel):
+    """Scores and results only (no test content)"""
+    id: int
+    level: Level
+    selected_phase: Optional[Phase]
+    status: SessionStatus
+    phase1_scores: Optional[Dict[str, Any]]
+    phase2_scores: Optional[Dict[str, Any]]
+    final_results: Optional[Dict[str, Any]]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    phase1_completed_at: Optional[datetime]
+    phase2_completed_at: Optional[datetime]
+
+
 class SessionStatusResponse(BaseModel):
     id: int
     status: SessionStatus
@@ -43,3 +107,21 @@ class SessionStatusResponse(BaseModel):
     phase1_completed: bool
     phase2_completed: bool
 
+
+class SessionSummary(BaseModel):
+    """Session without content / answers / scores (for listings)"""
+    id: int
+    level: Level
+    selected_phase: Optional[Phase]
+    status: SessionStatus
+    created_at: datetime
+    updated_at: Optional[datetime]
+    phase1_completed_at: Optional[datetime]
+    phase2_completed_at: Optional[datetime]
+    version: int
+    cohort_id: Optional[int] = None
+
+
+class SessionListResponse(BaseModel):
+    sessions: List[SessionSummary]
+    next_cursor: Optional[int]  # Pass as ?cursor= for the next page (None = last page)
@@ -1,6 +1,6 @@
 from .gemini_service import GeminiService
 from .test_generator import TestGeneratorService
 from .scoring_service import ScoringService
+from .heuristic_scorer import HeuristicScorer
 
-__all__ = ["GeminiService", "TestGeneratorService", "ScoringService"]
-
+__all__ = ["GeminiService", "TestGeneratorService", "ScoringService", "HeuristicScorer"]
@@ -1,16 +1,37 @@
 import os
+import threading
 import time
 import warnings
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
-# Suppress deprecation warning for google.generativeai
-# TODO: Migrate to google.genai when stable
-warnings.filterwarnings("ignore", category=FutureWarning, module="google.generativeai")
-import google.generativeai as genai
+from app.services.llm_scheduler import Priority, llm_scheduler
 
 load_dotenv()
 
+# The SDK takes longer to import than the rest of the app: it is imported on the
+# first Gemini call, not at startup (see _load_sdk)
+_sdk = None
+_sdk_lock = threading.Lock()
+
+
+def _load_sdk():
+    """Import google.generativeai once, on first use: (genai, genai_client)"""
+    global _sdk
+    if _sdk is None:
+        with _sdk_lock:
+            if _sdk is None:
+                # Suppress deprecation warning for google.generativeai
+                # TODO: Migrate to google.genai when stable
+                warnings.filterwarnings(
+                    "ignore", category=FutureWarning, module="google.generativeai"
+                )
+                import google.generativeai as genai
+                from google.generativeai import client as genai_client
+
+                _sdk = (genai, genai_client)
+    return _sdk
+
 
 class GeminiService:
     """Service for interacting with Google Gemini API (free tier) with smart key rotation"""
@@ -24,8 +45,16 @@ class GeminiService:
     _key1_invalid = False  # Track if key1 is invalid/expired
     _key2_invalid = False  # Track if key2 is invalid/expired
     _cooldown_seconds = 300  # 5 minutes = 300 seconds
+    # genai.configure() is process-global: serialize configure + client binding
+    _configure_lock = threading.Lock()
+    MODEL_NAME = "gemini-2.5-flash"
 
     def __init__(self):
+        # One model per key, each bound to its own API client, so calls forced
+        # to different keys can run concurrently without re-configuring each other
+        self._models: Dict[int, Any] = {}
+        self._key_lock = threading.RLock()
+
         # Load API keys from .env
         self._key1 = os.getenv("GEMINI_API_KEY")
         self._key2 = os.getenv("GEMINI_API_KEY_BACKUP")
@@ -43,24 +72,42 @@ class GeminiService:
         if not self._key2:
             print("Warning: GEMINI_API_KEY_BACKUP not found, using GEMINI_API_KEY only")
 
-        # Initialize with key1
+        # Initialize with key1 (its model is created on the first call)
         self._switch_key(1)
-        # Use gemini-1.5-flash for free tier (optimized for speed and cost)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+
+    @property
+    def model(self):
+        """Model bound to the current key"""
+        if self._current_key_index == 1:
+            return self._model_for_key(1, self._key1)
+        return self._model_for_key(2, self._key2)
+
+    def _model_for_key(self, key_index: int, api_key: str):
+        """Get (or create) the model bound to a specific API key"""
+        model = self._models.get(key_index)
+        if model is None:
+            genai, genai_client = _load_sdk()
+            with self._configure_lock:
+                genai.configure(api_key=api_key)
+                # Use gemini-2.5-flash for free tier (optimized for speed and cost)
+                model = genai.GenerativeModel(self.MODEL_NAME)
+                # GenerativeModel binds its client lazily on the first call, using
+                # whatever key is configured *then*; bind it now, under the lock
+                model._client = genai_client.get_default_generative_client()
+            self._models[key_index] = model
+        return model
 
     def _switch_key(self, key_index: int):
         """Switch to a specific API key"""
         if key_index == 1:
             if not self._key1:
                 raise ValueError("GEMINI_API_KEY not available")
-            genai.configure(api_key=self._key1)
             self._current_key_index = 1
             self._key1_last_used = time.time()
             print(f"Switched to GEMINI_API_KEY (Key 1)")
         elif key_index == 2:
             if not self._key2:
                 raise ValueError("GEMINI_API_KEY_BACKUP not available")
-            genai.configure(api_key=self._key2)
             self._current_key_index = 2
             self._key2_last_used = time.time()
             print(f"Switched to GEMINI_API_KEY_BACKUP (Key 2)")
@@ -164,6 +211,8 @@ class GeminiService:
         temperature: float = 0.7,
         max_output_tokens: int = 8192,
         force_key: Optional[int] = None,
+        priority: Optional[Priority] = None,
+        timeout: Optional[float] = None,
     ) -> str:
         """Generate content using Gemini API with smart key rotation
 
@@ -173,31 +222,73 @@ class GeminiService:
             temperature: Generation temperature
             max_output_tokens: Maximum output tokens
             force_key: Force use specific key (1 or 2), None for auto selection
+            priority: Scheduling class of the call (see llm_scheduler), None for GENERATION
+            timeout: Seconds for the whole call (slot wait and retry included), None
+                for no limit; the API request is aborted at the deadline, freeing
+                the calling thread and the slot
         """
-        # Ensure we're using an available key (or force specific key)
-        self._ensure_available_key(force_key=force_key)
+        deadline = None
+        if timeout is not None:
+            if timeout <= 0:
+                raise TimeoutError("Gemini call deadline passed")
+            deadline = time.monotonic() + timeout
+        # Wait for a slot: more urgent classes (scoring) go first when calls queue up
+        with llm_scheduler.slot(priority, deadline):
+            return self._generate_content(
+                prompt,
+                system_instruction,
+                temperature,
+                max_output_tokens,
+                force_key,
+                deadline,
+            )
+
+    def _generate_content(
+        self,
+        prompt: str,
+        system_instruction: Optional[str],
+        temperature: float,
+        max_output_tokens: int,
+        force_key: Optional[int],
+        deadline: Optional[float] = None,
+    ) -> str:
+        """One Gemini call (retried once on the other key), run in a scheduler slot"""
+        # Ensure we're using an available key (or force specific key), and keep
+        # a reference to that key's model: another thread may switch keys meanwhile
+        with self._key_lock:
+            self._ensure_available_key(force_key=force_key)
+            model = self.model
+            key_index = self._current_key_index
 
         try:
+            genai, _ = _load_sdk()
             generation_config = genai.types.GenerationConfig(
                 temperature=temperature,
                 max_output_tokens=max_output_tokens,
             )
 
-            start_time = time.time()
-            if system_instruction:
-                response = self.model.generate_content(
-                    f"{system_instruction}\n\n{prompt}",
-                    generation_config=generation_config,
-                )
-            else:
-                response = self.model.generate_content(
-                    prompt, generation_config=generation_config
+            def call(model):
+                options = {}
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Gemini call deadline passed")
+                    options["request_options"] = {"timeout": remaining}
+                if system_instruction:
+                    return model.generate_content(
+                        f"{system_instruction}\n\n{prompt}",
+                        generation_config=generation_config,
+                        **options,
+                    )
+                return model.generate_content(
+                    prompt, generation_config=generation_config, **options
                 )
 
+            start_time = time.time()
+            response = call(model)
+
             elapsed = time.time() - start_time
-            print(
-                f"Gemini API call took {elapsed:.2f} seconds (using Key {self._current_key_index})"
-            )
+            print(f"Gemini API call took {elapsed:.2f} seconds (using Key {key_index})")
             return response.text
         except Exception as e:
             error_str = str(e)
@@ -215,7 +306,7 @@ class GeminiService:
 
             # Mark current key as invalid if detected
             if is_key_invalid:
-                if self._current_key_index == 1:
+                if key_index == 1:
                     self._key1_invalid = True
                     print(
                         f"ERROR: GEMINI_API_KEY (Key 1) is invalid/expired. Marking as invalid."
@@ -228,7 +319,7 @@ class GeminiService:
 
             # If key is invalid and we have backup key, try switching
             if is_key_invalid and self._key1 and self._key2:
-                other_key = 2 if self._current_key_index == 1 else 1
+                other_key = 2 if key_index == 1 else 1
                 # Check if other key is also invalid
                 if (other_key == 1 and self._key1_invalid) or (
                     other_key == 2 and self._key2_invalid
@@ -238,24 +329,16 @@ class GeminiService:
                         f"Key 1 invalid: {self._key1_invalid}, Key 2 invalid: {self._key2_invalid}"
                     )
 
-                print(
-                    f"Key {self._current_key_index} is invalid, switching to Key {other_key}..."
-                )
-                self._switch_key(other_key)
+                print(f"Key {key_index} is invalid, switching to Key {other_key}...")
+                with self._key_lock:
+                    self._switch_key(other_key)
+                    model = self.model
                 # Retry once with new key
                 try:
-                    if system_instruction:
-                        response = self.model.generate_content(
-                            f"{system_instruction}\n\n{prompt}",
-                            generation_config=generation_config,
-                        )
-                    else:
-                        response = self.model.generate_content(
-                            prompt, generation_config=generation_config
-                        )
+                    response = call(model)
                     elapsed = time.time() - start_time
                     print(
-                        f"Gemini API call succeeded after key switch, took {elapsed:.2f} seconds (using Key {self._current_key_index})"
+                        f"Gemini API call succeeded after key switch, took {elapsed:.2f} seconds (using Key {other_key})"
                     )
                     return response.text
                 except Exception as retry_error:
@@ -268,7 +351,7 @@ class GeminiService:
                 and self._key1
                 and self._key2
             ):
-                other_key = 2 if self._current_key_index == 1 else 1
+                other_key = 2 if key_index == 1 else 1
                 # Skip if other key is invalid
                 if (other_key == 1 and self._key1_invalid) or (
                     other_key == 2 and self._key2_invalid
@@ -279,23 +362,17 @@ class GeminiService:
                     raise e
 
                 print(
-                    f"Rate limit detected with Key {self._current_key_index}, switching to Key {other_key}..."
+                    f"Rate limit detected with Key {key_index}, switching to Key {other_key}..."
                 )
-                self._switch_key(other_key)
+                with self._key_lock:
+                    self._switch_key(other_key)
+                    model = self.model
                 # Retry once with new key
                 try:
-                    if system_instruction:
-                        response = self.model.generate_content(
-                            f"{system_instruction}\n\n{prompt}",
-                            generation_config=generation_config,
-                        )
-                    else:
-                        response = self.model.generate_content(
-                            prompt, generation_config=generation_config
-                        )
+                    response = call(model)
                     elapsed = time.time() - start_time
                     print(
-                        f"Gemini API call succeeded after key switch, took {elapsed:.2f} seconds (using Key {self._current_key_index})"
+                        f"Gemini API call succeeded after key switch, took {elapsed:.2f} seconds (using Key {other_key})"
                     )
                     return response.text
                 except Exception as retry_error:
@@ -311,6 +388,8 @@ class GeminiService:
         prompt: str,
         system_instruction: Optional[str] = None,
         force_key: Optional[int] = None,
+        priority: Optional[Priority] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """Generate JSON response from Gemini
 
@@ -318,6 +397,8 @@ class GeminiService:
             prompt: The prompt to send to Gemini
             system_instruction: Optional system instruction
             force_key: Force use specific key (1 or 2), None for auto selection
+            priority: Scheduling class of the call, None for GENERATION
+            timeout: Seconds for the whole call, None for no limit
         """
         import json
         import re
@@ -326,7 +407,11 @@ class GeminiService:
         full_prompt = f"{instruction}\n\n{prompt}\n\nIMPORTANT: Return ONLY valid JSON, no markdown, no code blocks, no extra text."
 
         response_text = self.generate_content(
-            full_prompt, temperature=0.3, force_key=force_key
+            full_prompt,
+            temperature=0.3,
+            force_key=force_key,
+            priority=priority,
+            timeout=timeout,
         )
 
         # Extract JSON from response
@@ -0,0 +1,352 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import math
+import re
+
+
+class HeuristicScorer:
+    """Fast in-process band estimator for Writing and Speaking (no LLM call)
+
+    Used for:
+    - Provisional bands shown immediately while the Gemini call runs
+    - Fallback scores when Gemini fails (instead of a flat 5.0)
+    - Gate that skips Gemini for empty or trivially short answers
+    """
+
+    # Answers shorter than this (in words) are scored locally, never sent to Gemini
+    MIN_WRITING_WORDS = 20
+    MIN_SPEAKING_WORDS = 15
+
+    # Provisional bands are capped: text features cannot justify a high band
+    MIN_BAND = 1.0
+    MAX_BAND = 7.5
+
+    # Expected answer length (words) per speaking part
+    SPEAKING_TARGET_WORDS = {"part1": 30, "part2": 120, "part3": 50}
+
+    COHESIVE_DEVICES = (
+        "however",
+        "moreover",
+        "furthermore",
+        "in addition",
+        "additionally",
+        "therefore",
+        "thus",
+        "consequently",
+        "as a result",
+        "on the other hand",
+        "in contrast",
+        "although",
+        "whereas",
+        "while",
+        "because",
+        "since",
+        "so",
+        "but",
+        "also",
+        "firstly",
+        "secondly",
+        "finally",
+        "for example",
+        "for instance",
+        "such as",
+        "in conclusion",
+        "to sum up",
+        "overall",
+        "in my opinion",
+        "i think",
+        "nevertheless",
+        "meanwhile",
+        "similarly",
+        "likewise",
+    )
+
+    _WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+    _SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+    _COHESIVE_RE = re.compile(
+        r"\b(?:"
+        + "|".join(
+            re.escape(d) for d in sorted(COHESIVE_DEVICES, key=len, reverse=True)
+        )
+        + r")\b",
+        re.IGNORECASE,
+    )
+    _LOWERCASE_I_RE = re.compile(r"(?:^|\s)i(?:\s|'m|'ve|'ll|'d|$)")
+    _REPEATED_WORD_RE = re.compile(r"\b(\w+)\s+\1\b", re.IGNORECASE)
+
+    def word_count(self, text: str) -> int:
+        """Count words in an answer"""
+        if not text:
+            return 0
+        return len(self._WORD_RE.findall(text))
+
+    def text_features(
+        self, text: str, word_limit: Optional[int] = None
+    ) -> Dict[str, float]:
+        """Extract cheap lexical/grammatical features from an answer"""
+        text = (text or "").strip()
+        words = [w.lower() for w in self._WORD_RE.findall(text)]
+        word_count = len(words)
+
+        sentences = [s for s in self._SENTENCE_SPLIT_RE.split(text) if s.strip()]
+        sentence_lengths = [
+            len(self._WORD_RE.findall(s)) for s in sentences if self._WORD_RE.search(s)
+        ]
+        sentence_count = len(sentence_lengths)
+        mean_sentence = (
+            sum(sentence_lengths) / sentence_count if sentence_count else 0.0
+        )
+        sentence_variance = (
+            sum((n - mean_sentence) ** 2 for n in sentence_lengths) / sentence_count
+            if sentence_count
+            else 0.0
+        )
+
+        unique_words = len(set(words))
+        type_token_ratio = unique_words / word_count if word_count else 0.0
+        # Guiraud's index: TTR corrected for answer length (raw TTR drops as texts grow)
+        guiraud = unique_words / math.sqrt(word_count) if word_count else 0.0
+        long_word_ratio = (
+            sum(1 for w in words if len(w) >= 7) / word_count if word_count else 0.0
+        )
+
+        cohesive_count = len(self._COHESIVE_RE.findall(text))
+
+        # Simple error heuristics (per sentence)
+        errors = 0
+        errors += len(self._LOWERCASE_I_RE.findall(text))
+        errors += len(self._REPEATED_WORD_RE.findall(text))
+        for sentence in sentences:
+            stripped = sentence.strip()
+            if stripped and stripped[0].isalpha() and stripped[0].islower():
+                errors += 1
+            if len(self._WORD_RE.findall(stripped)) > 40:
+                errors += 1  # Likely run-on sentence
+        if text and text[-1] not in ".!?":
+            errors += 1
+        error_rate = errors / sentence_count if sentence_count else 0.0
+
+        return {
+            "word_count": word_count,
+            "length_ratio": (word_count / word_limit) if word_limit else 1.0,
+            "sentence_count": sentence_count,
+            "mean_sentence_length": round(mean_sentence, 2),
+            "sentence_length_variance": round(sentence_variance, 2),
+            "type_token_ratio": round(type_token_ratio, 3),
+            "guiraud_index": round(guiraud, 3),
+            "long_word_ratio": round(long_word_ratio, 3),
+            "cohesive_devices": cohesive_count,
+            "cohesive_density": (
+                cohesive_count * 100.0 / word_count if word_count else 0.0
+            ),
+            "error_count": errors,
+            "error_rate": round(error_rate, 3),
+        }
+
+    def _interpolate(
+        self, value: float, points: Sequence[Tuple[float, float]]
+    ) -> float:
+        """Piecewise-linear mapping of a feature value to a band"""
+        if value <= points[0][0]:
+            return points[0][1]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if value <= x1:
+                return y0 + (y1 - y0) * (value - x0) / (x1 - x0)
+        return points[-1][1]
+
+    def _band(self, value: float) -> float:
+        """Clamp and round to the nearest IELTS half band"""
+        value = max(self.MIN_BAND, min(self.MAX_BAND, value))
+        return round(value * 2) / 2
+
+    def _overall(self, bands: List[float]) -> float:
+        return round(sum(bands) / len(bands) * 2) / 2 if bands else 0.0
+
+    def _length_band(self, length_ratio: float) -> float:
+        return self._interpolate(
+            length_ratio, [(0.0, 1.0), (0.25, 3.0), (0.5, 4.5), (0.8, 5.5), (1.0, 6.5)]
+        )
+
+    def _coherence_band(self, features: Dict[str, float]) -> float:
+        density = self._interpolate(
+            features["cohesive_density"],
+            [(0.0, 3.5), (2.0, 5.0), (4.0, 6.5), (8.0, 7.0), (14.0, 5.5)],
+        )
+        # Single-sentence answers cannot show progression
+        structure = self._interpolate(
+            features["sentence_count"], [(1, 3.5), (3, 5.5), (5, 6.5), (8, 7.0)]
+        )
+        return (density + structure) / 2
+
+    def _lexical_band(self, features: Dict[str, float]) -> float:
+        diversity = self._interpolate(
+            features["guiraud_index"], [(2.0, 3.0), (4.0, 4.5), (6.0, 6.0), (8.0, 7.5)]
+        )
+        sophistication = self._interpolate(
+            features["long_word_ratio"],
+            [(0.0, 3.5), (0.1, 5.0), (0.2, 6.5), (0.3, 7.5)],
+        )
+        return 0.7 * diversity + 0.3 * sophistication
+
+    def _grammar_band(self, features: Dict[str, float]) -> float:
+        # Sentence-length variety is a proxy for range of structures
+        variety = self._interpolate(
+            math.sqrt(features["sentence_length_variance"]),
+            [(0.0, 4.0), (3.0, 5.5), (6.0, 6.5), (9.0, 7.0)],
+        )
+        complexity = self._interpolate(
+            features["mean_sentence_length"],
+            [(3.0, 3.5), (8.0, 5.0), (14.0, 6.5), (20.0, 7.0), (35.0, 5.0)],
+        )
+        penalty = min(2.5, features["error_rate"] * 1.5)
+        return (variety + complexity) / 2 - penalty
+
+    def estimate_writing_task(
+        self, text: str, word_limit: Optional[int], task: str = "task2"
+    ) -> Dict[str, float]:
+        """Provisional criteria bands for a single writing task"""
+        features = self.text_features(text, word_limit)
+        if features["word_count"] == 0:
+            response_key = "task_achievement" if task == "task1" else "task_response"
+            return {
+                response_key: 0.0,
+                "coherence_cohesion": 0.0,
+                "lexical_resource": 0.0,
+                "grammatical_range": 0.0,
+                "overall_band": 0.0,
+            }
+
+        task_band = self._band(self._length_band(features["length_ratio"]))
+        coherence = self._band(self._coherence_band(features))
+        lexical = self._band(self._lexical_band(features))
+        grammar = self._band(self._grammar_band(features))
+
+        # Very short answers cannot demonstrate any criterion above the length band
+        if features["length_ratio"] < 0.5:
+            coherence = min(coherence, task_band + 0.5)
+            lexical = min(lexical, task_band + 0.5)
+            grammar = min(grammar, task_band + 0.5)
+
+        response_key = "task_achievement" if task == "task1" else "task_response"
+        return {
+            response_key: task_band,
+            "coherence_cohesion": coherence,
+            "lexical_resource": lexical,
+            "grammatical_range": grammar,
+            "overall_band": self._overall([task_band, coherence, lexical, grammar]),
+        }
+
+    def estimate_writing(
+        self, content: Dict[str, Any], answers: Dict[str, Any], feedback: str = ""
+    ) -> Dict[str, Any]:
+        """Provisional Writing result in the same shape as ScoringService.score_writing"""
+        writing = content.get("writing", {})
+        has_task1 = bool(writing.get("task1"))
+
+        task2 = self.estimate_writing_task(
+            answers.get("writing_task2", ""),
+            writing.get("task2", {}).get("word_limit", 120),
+            "task2",
+        )
+        result = {
+            "task2": task2,
+            "overall_band": task2["overall_band"],
+            "feedback": feedback,
+            "source": "heuristic",
+        }
+        if has_task1:
+            task1 = self.estimate_writing_task(
+                answers.get("writing_task1", ""),
+                writing.get("task1", {}).get("word_limit", 80),
+                "task1",
+            )
+            result["task1"] = task1
+            result["overall_band"] = round(
+                (task1["overall_band"] + task2["overall_band"]) / 2.0, 1
+            )
+        return result
+
+    def _speaking_answers(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> List[Tuple[str, str]]:
+        """Collect (part, answer) pairs from the speaking answer keys"""
+        speaking = content.get("speaking", {})
+        collected = []
+        for q in speaking.get("part1", []):
+            collected.append(
+                ("part1", answers.get(f"speaking_part1_{q.get('id')}", ""))
+            )
+        if speaking.get("part2"):
+            collected.append(("part2", answers.get("speaking_part2", "")))
+        for q in speaking.get("part3", []):
+            collected.append(
+                ("part3", answers.get(f"speaking_part3_{q.get('id')}", ""))
+            )
+        return collected
+
+    def estimate_speaking(
+        self, content: Dict[str, Any], answers: Dict[str, Any], feedback: str = ""
+    ) -> Dict[str, Any]:
+        """Provisional Speaking result in the same shape as ScoringService.score_speaking
+
+        Pronunciation cannot be judged from a transcript; it is reported as the
+        mean of the other three criteria so it does not skew the overall band.
+        """
+        collected = self._speaking_answers(content, answers)
+        answered = [(part, text) for part, text in collected if (text or "").strip()]
+        if not answered:
+            return {
+                "fluency_coherence": 0.0,
+                "lexical_resource": 0.0,
+                "grammatical_range": 0.0,
+                "pronunciation": 0.0,
+                "overall_band": 0.0,
+                "feedback": feedback,
+                "source": "heuristic",
+            }
+
+        # Fluency: how fully each question was answered (unanswered questions count as 0)
+        coverage = [
+            min(1.0, self.word_count(text) / self.SPEAKING_TARGET_WORDS[part])
+            for part, text in collected
+        ]
+        combined = " ".join(text.strip() for _, text in answered)
+        features = self.text_features(combined)
+
+        fluency = self._band(
+            0.6 * self._length_band(sum(coverage) / len(coverage))
+            + 0.4 * self._coherence_band(features)
+        )
+        lexical = self._band(self._lexical_band(features))
+        grammar = self._band(self._grammar_band(features))
+        pronunciation = self._band((fluency + lexical + grammar) / 3)
+
+        return {
+            "fluency_coherence": fluency,
+            "lexical_resource": lexical,
+            "grammatical_range": grammar,
+            "pronunciation": pronunciation,
+            "overall_band": self._overall([fluency, lexical, grammar, pronunciation]),
+            "feedback": feedback,
+            "source": "heuristic",
+        }
+
+    def is_trivial_writing(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> bool:
+        """True when no writing task has enough text to be worth an LLM call"""
+        has_task1 = bool(content.get("writing", {}).get("task1"))
+        keys = ["writing_task2"] + (["writing_task1"] if has_task1 else [])
+        return all(
+            self.word_count(answers.get(key, "")) < self.MIN_WRITING_WORDS
+            for key in keys
+        )
+
+    def is_trivial_speaking(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> bool:
+        """True when all speaking answers together are too short for an LLM call"""
+        total = sum(
+            self.word_count(text)
+            for _, text in self._speaking_answers(content, answers)
+        )
+        return total < self.MIN_SPEAKING_WORDS
@@ -0,0 +1,61 @@
+"""
+Lazy construction of the LLM services
+
+The routes hold their services as module globals. Built at import time, they
+made every cold start (worker boot, autoscaled replica, reload) pay for the
+Gemini stack before serving anything, including routes that never call it.
+LazyService stands in for such a global and builds the service on first use,
+once, from whichever thread gets there first.
+"""
+
+from typing import Any, Callable, Generic, Optional, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """Proxy building its service on first attribute access (thread-safe)
+
+    Class-level constants (UPPER_CASE attributes, e.g. ScoringService.SKILL_PARTS)
+    are read from the class when the factory is one, without building the service.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._service: Optional[T] = None
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def built(self) -> bool:
+        return self._service is not None
+
+    def get(self) -> T:
+        """The service, built on the first call"""
+        service = self._service
+        if service is None:
+            with self._lock:
+                service = self._service
+                if service is None:
+                    start = time.monotonic()
+                    service = self._factory()
+                    self.build_seconds = time.monotonic() - start
+                    name = getattr(self._factory, "__name__", "service")
+                    print(f"{name} ready in {self.build_seconds:.2f}s (first use)")
+                    self._service = service
+        return service
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the proxy itself
+        if name.isupper() and self._service is None and isinstance(self._factory, type):
+            try:
+                return getattr(self._factory, name)
+            except AttributeError:
+                pass
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        state = "built" if self.built else "not built"
+        return f"<LazyService {getattr(self._factory, '__name__', self._factory)} ({state})>"
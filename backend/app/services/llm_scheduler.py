@@ -0,0 +1,275 @@
+"""
+Priority scheduling of Gemini calls
+
+Every GeminiService call takes a slot from the scheduler first. When calls
+queue up, the slot goes to the most urgent class, FIFO within a class:
+
+    SCORING     a candidate waiting for their submit
+    GENERATION  a candidate waiting for their test
+    ANALYSIS    optional detailed analysis
+    BACKGROUND  work nobody waits for yet (parts scored during the test)
+
+Each class has its own concurrency cap, so optional work can never hold all
+the slots. When the queue is full, the newest queued call of a lower class
+than the incoming one is preempted: it fails with LLMJobPreempted (a 503 with
+Retry-After for a request) and its place in the queue goes to the new call
+(with no lower class queued, the new call is rejected the same way).
+
+Background work runs under an LLMTicket: its calls are demoted to BACKGROUND
+until promote() raises them (e.g. when a submit starts waiting for them).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+import enum
+import itertools
+import math
+import os
+import threading
+import time
+
+from app.admission import Overloaded
+
+
+class Priority(enum.IntEnum):
+    """LLM job classes, most urgent first"""
+
+    SCORING = 0
+    GENERATION = 1
+    ANALYSIS = 2
+    BACKGROUND = 3
+
+
+# Gemini calls in flight at once (per process)
+LLM_SLOTS = int(os.getenv("LLM_SLOTS", "6"))
+# Per-class caps, e.g. "generation=4,analysis=2,background=2" (default: all slots)
+LLM_CLASS_LIMITS = os.getenv("LLM_CLASS_LIMITS", "generation=4,analysis=2,background=2")
+# Calls waiting for a slot; beyond it lower classes are preempted
+LLM_SCHEDULER_QUEUE = int(os.getenv("LLM_SCHEDULER_QUEUE", "64"))
+
+# Duration of a call before any has been measured, and weight of the latest one
+ESTIMATED_CALL_SECONDS = 10.0
+DURATION_SMOOTHING = 0.2
+
+
+def parse_class_limits(spec: str, slots: int) -> Dict[Priority, int]:
+    """Cap per class from "analysis=2,background=1" (classes not listed: all slots)"""
+    limits = {priority: slots for priority in Priority}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        try:
+            limits[Priority[name.strip().upper()]] = max(1, int(value))
+        except (KeyError, ValueError):
+            print(f"Ignoring invalid LLM_CLASS_LIMITS entry: {item}")
+    return limits
+
+
+class LLMJobPreempted(Overloaded):
+    """A queued call gave its place to a more urgent one"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            503, retry_after, "Request preempted by more urgent work, retry later"
+        )
+
+
+class LLMTicket:
+    """Priority floor of the calls made under it (background work)"""
+
+    __slots__ = ("priority", "preempted")
+
+    def __init__(self, priority: Priority = Priority.BACKGROUND):
+        self.priority = priority
+        self.preempted = False
+
+
+_current_ticket: ContextVar[Optional[LLMTicket]] = ContextVar(
+    "llm_ticket", default=None
+)
+
+
+class _Job:
+    __slots__ = ("priority", "ticket", "seq", "enqueued", "preempted")
+
+    def __init__(self, priority: Priority, ticket: Optional[LLMTicket], seq: int):
+        self.priority = priority
+        self.ticket = ticket
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.preempted = False
+
+    @property
+    def effective(self) -> Priority:
+        if self.ticket is None:
+            return self.priority
+        return max(self.priority, self.ticket.priority)
+
+
+class LLMScheduler:
+    """Slots for Gemini calls, handed out by priority class (use from threads)"""
+
+    def __init__(
+        self,
+        slots: int = LLM_SLOTS,
+        class_limits: Optional[Dict[Priority, int]] = None,
+        max_queue: int = LLM_SCHEDULER_QUEUE,
+    ):
+        self.slots = max(1, slots)
+        self.class_limits = class_limits or parse_class_limits(
+            LLM_CLASS_LIMITS, self.slots
+        )
+        self.max_queue = max(0, max_queue)
+        self.call_seconds = ESTIMATED_CALL_SECONDS
+        self._cond = threading.Condition()
+        self._queue: List[_Job] = []
+        self._seq = itertools.count()
+        self._running = {priority: 0 for priority in Priority}
+        self._counters = {
+            priority: {
+                "completed": 0,
+                "preempted": 0,
+                "rejected": 0,
+                "timed_out": 0,
+                "wait_seconds": 0.0,
+            }
+            for priority in Priority
+        }
+
+    @contextmanager
+    def ticket(self, ticket: LLMTicket) -> Iterator[LLMTicket]:
+        """Run a block's calls under a ticket (its priority is a floor for them)"""
+        token = _current_ticket.set(ticket)
+        try:
+            yield ticket
+        finally:
+            _current_ticket.reset(token)
+
+    def promote(self, ticket: LLMTicket, priority: Priority):
+        """Raise the priority of a ticket's calls (queued ones included)"""
+        with self._cond:
+            if priority < ticket.priority:
+                ticket.priority = priority
+                self._cond.notify_all()
+
+    def _retry_after(self) -> float:
+        return math.ceil((len(self._queue) + 1) / self.slots) * self.call_seconds
+
+    def _next(self) -> Optional[_Job]:
+        """Job to start now: most urgent class with a free slot, FIFO within it"""
+        if sum(self._running.values()) >= self.slots:
+            return None
+        runnable = [
+            job
+            for job in self._queue
+            if self._running[job.effective] < self.class_limits[job.effective]
+        ]
+        return min(runnable, key=lambda job: (job.effective, job.seq), default=None)
+
+    def _preempt_for(self, job: _Job) -> bool:
+        """Drop the newest queued job of the least urgent class below job's"""
+        victims = [queued for queued in self._queue if queued.effective > job.effective]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda queued: (queued.effective, queued.seq))
+        self._queue.remove(victim)
+        victim.preempted = True
+        if victim.ticket is not None:
+            victim.ticket.preempted = True
+        self._counters[victim.effective]["preempted"] += 1
+        self._cond.notify_all()
+        return True
+
+    def _acquire(self, job: _Job, deadline: Optional[float] = None):
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not self._preempt_for(job):
+                self._counters[job.effective]["rejected"] += 1
+                raise LLMJobPreempted(self._retry_after())
+            self._queue.append(job)
+            while self._next() is not job:
+                if job.preempted:
+                    raise LLMJobPreempted(self._retry_after())
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(job)
+                    self._counters[job.effective]["timed_out"] += 1
+                    self._cond.notify_all()
+                    raise TimeoutError("Gemini call deadline passed waiting for a slot")
+                self._cond.wait(remaining)
+            self._queue.remove(job)
+            job.priority = job.effective  # The class it runs (and is counted) in
+            job.ticket = None
+            self._running[job.priority] += 1
+            self._counters[job.priority]["wait_seconds"] += (
+                time.monotonic() - job.enqueued
+            )
+            self._cond.notify_all()
+
+    def _release(self, job: _Job, duration: float):
+        with self._cond:
+            self._running[job.priority] -= 1
+            self._counters[job.priority]["completed"] += 1
+            self.call_seconds += DURATION_SMOOTHING * (duration - self.call_seconds)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(
+        self, priority: Optional[Priority] = None, deadline: Optional[float] = None
+    ) -> Iterator[Priority]:
+        """Hold a slot for one call (raises LLMJobPreempted if it loses its place)
+
+        priority defaults to GENERATION; under a ticket, the call runs in the
+        less urgent of its own class and the ticket's. deadline (time.monotonic()):
+        give up waiting then, with TimeoutError.
+        """
+        job = _Job(
+            Priority.GENERATION if priority is None else priority,
+            _current_ticket.get(),
+            next(self._seq),
+        )
+        self._acquire(job, deadline)
+        start = time.monotonic()
+        try:
+            yield job.priority
+        finally:
+            self._release(job, time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            queued = {priority: 0 for priority in Priority}
+            for job in self._queue:
+                queued[job.effective] += 1
+            classes = {}
+            for priority in Priority:
+                counters = self._counters[priority]
+                classes[priority.name.lower()] = {
+                    "limit": self.class_limits[priority],
+                    "running": self._running[priority],
+                    "queued": queued[priority],
+                    "completed": counters["completed"],
+                    "preempted": counters["preempted"],
+                    "rejected": counters["rejected"],
+                    "timed_out": counters["timed_out"],
+                    "mean_wait_seconds": round(
+                        (
+                            counters["wait_seconds"] / counters["completed"]
+                            if counters["completed"]
+                            else 0
+                        ),
+                        3,
+                    ),
+                }
+            return {
+                "slots": self.slots,
+                "running": sum(self._running.values()),
+                "queue_depth": len(self._queue),
+                "call_seconds": round(self.call_seconds, 2),
+                "classes": classes,
+            }
+
+
+# Process-wide scheduler shared by every GeminiService
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,209 @@
+"""
+Background scoring of finished sub-parts (speaking parts, writing tasks)
+
+A candidate finishes speaking part 1 long before submitting the phase: once
+the autosave reports a part as done, it is scored in the background, and at
+submit only the parts that are not scored yet (or whose answers changed since)
+are left to score. Part results also go to the scoring cache, so a part scored
+on another worker is a cache hit here.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+
+from app.services.llm_scheduler import (
+    LLMJobPreempted,
+    LLMTicket,
+    Priority,
+    llm_scheduler,
+)
+
+# Worker threads for background part scoring (each runs one Gemini call at a time)
+PART_SCORING_WORKERS = int(os.getenv("PART_SCORING_WORKERS", "2"))
+# Sessions with background jobs kept; the least recently used are dropped
+PART_SCORING_MAX_SESSIONS = int(os.getenv("PART_SCORING_MAX_SESSIONS", "1024"))
+
+
+def part_answers(part: str, answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Answers of one part ("<part>" or "<part>_<question id>" keys)"""
+    prefix = f"{part}_"
+    return {
+        key: value
+        for key, value in answers.items()
+        if key == part or key.startswith(prefix)
+    }
+
+
+class PartScorer:
+    """Scores sub-parts in the background and combines them at submit"""
+
+    def __init__(
+        self,
+        scoring_service,
+        max_workers: int = PART_SCORING_WORKERS,
+        max_sessions: int = PART_SCORING_MAX_SESSIONS,
+    ):
+        self.scoring = scoring_service
+        self.max_sessions = max_sessions
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="part-scoring"
+        )
+        # (session id, phase) -> part -> (answers it is scored with, future result,
+        # scheduler ticket of its Gemini call)
+        self._jobs: (
+            "OrderedDict[Tuple[int, int], Dict[str, Tuple[Dict, Future, LLMTicket]]]"
+        ) = OrderedDict()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.reused = 0
+
+    def parts(self, skill: str, content: Dict[str, Any]) -> List[str]:
+        """Parts of a skill present in the content"""
+        return [
+            part
+            for part in self.scoring.SKILL_PARTS.get(skill, ())
+            if self.scoring.part_content(part, content)
+        ]
+
+    def schedule(
+        self,
+        session_id: int,
+        phase: int,
+        content: Dict[str, Any],
+        answers: Dict[str, Any],
+        parts: Iterable[str],
+    ) -> List[str]:
+        """Start scoring the given parts, returns those started
+
+        A part already scored (or being scored) with the same answers is not
+        scored again.
+        """
+        started = []
+        with self._lock:
+            jobs = self._jobs.setdefault((session_id, phase), {})
+            self._jobs.move_to_end((session_id, phase))
+            for part in parts:
+                answers_of_part = part_answers(part, answers)
+                job = jobs.get(part)
+                if job is not None and job[0] == answers_of_part:
+                    continue
+                ticket = LLMTicket(Priority.BACKGROUND)
+                jobs[part] = (
+                    answers_of_part,
+                    self._executor.submit(
+                        self._score_in_background,
+                        ticket,
+                        part,
+                        content,
+                        answers_of_part,
+                    ),
+                    ticket,
+                )
+                started.append(part)
+            while len(self._jobs) > self.max_sessions:
+                self._jobs.popitem(last=False)
+            self.scheduled += len(started)
+        return started
+
+    def started(self, session_id: int, phase: int, skill: str) -> bool:
+        """True if a part of the skill has been scheduled for this session phase"""
+        with self._lock:
+            jobs = self._jobs.get((session_id, phase), {})
+            return any(part in jobs for part in self.scoring.SKILL_PARTS[skill])
+
+    def collect(
+        self,
+        session_id: int,
+        phase: int,
+        skill: str,
+        content: Dict[str, Any],
+        answers: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Skill result from the part scores (scores parts not done yet, concurrently)
+
+        Background jobs still queued are promoted to scoring priority; the parts
+        left to score run on their own threads, not behind other sessions'
+        background jobs. Heuristic background results are scored again. The jobs
+        are kept (a retried submit reuses them) until forget()
+        """
+        with self._lock:
+            jobs = self._jobs.setdefault((session_id, phase), {})
+            reused, missing = {}, {}
+            for part in self.parts(skill, content):
+                answers_of_part = part_answers(part, answers)
+                job = jobs.get(part)
+                if job is not None and job[0] == answers_of_part:
+                    self.reused += 1
+                    llm_scheduler.promote(job[2], Priority.SCORING)
+                    reused[part] = job[1]
+                else:
+                    missing[part] = answers_of_part
+
+        parts = self.parts(skill, content)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(parts))) as pool:
+            fresh = {
+                part: pool.submit(
+                    self.scoring.score_part, part, content, answers_of_part
+                )
+                for part, answers_of_part in missing.items()
+            }
+            # A background result is only final if Gemini scored it: a heuristic one
+            # (API error during the test) is scored again now, like a fresh submit
+            # (trivial answers stay heuristic, without a Gemini call)
+            for part, future in reused.items():
+                try:
+                    result = future.result()
+                except LLMJobPreempted:  # Lost its place before the promotion
+                    result = None
+                if result is None or result.get("source") == "heuristic":
+                    missing[part] = part_answers(part, answers)
+                    fresh[part] = pool.submit(
+                        self.scoring.score_part, part, content, missing[part]
+                    )
+                else:
+                    results[part] = result
+            results.update({part: future.result() for part, future in fresh.items()})
+        if fresh:
+            with self._lock:
+                jobs = self._jobs.setdefault((session_id, phase), {})
+                for part, future in fresh.items():
+                    jobs[part] = (missing[part], future, LLMTicket(Priority.SCORING))
+        return self.scoring.combine_parts(
+            skill, {part: results[part] for part in parts}
+        )
+
+    def _score_in_background(
+        self, ticket: LLMTicket, part: str, content: Dict, answers: Dict
+    ) -> Dict[str, Any]:
+        """score_part at background priority (raises LLMJobPreempted if preempted:
+        its result would be a heuristic fallback)"""
+        with llm_scheduler.ticket(ticket):
+            result = self.scoring.score_part(part, content, answers)
+        if ticket.preempted:
+            raise LLMJobPreempted(0)
+        return result
+
+    def forget(self, session_id: int, phase: int):
+        """Drop a phase's jobs once its scores are stored"""
+        with self._lock:
+            self._jobs.pop((session_id, phase), None)
+
+    def discard(self, session_id: int, session: Optional[Dict] = None):
+        """Storage listener: forget the jobs of a deleted session"""
+        if session is not None:
+            return
+        with self._lock:
+            for key in [key for key in self._jobs if key[0] == session_id]:
+                del self._jobs[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._jobs),
+                "scheduled": self.scheduled,
+                "reused": self.reused,
+            }
@@ -0,0 +1,149 @@
+"""
+Scoring result cache
+Same (phase content, answers, scorer version) -> same result, without calling Gemini again
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+
+class ScoringCache:
+    """Bounded LRU cache of scoring results with an optional SQLite persistent tier
+
+    Configured from env:
+    - SCORING_CACHE_SIZE: max entries kept in memory (default 2048, 0 disables the cache)
+    - SCORING_CACHE_PATH: SQLite file for the persistent tier (unset = memory only)
+    """
+
+    _WHITESPACE_RE = re.compile(r"\s+")
+
+    def __init__(
+        self, max_entries: Optional[int] = None, persist_path: Optional[str] = None
+    ):
+        if max_entries is None:
+            max_entries = int(os.getenv("SCORING_CACHE_SIZE", "2048"))
+        if persist_path is None:
+            persist_path = os.getenv("SCORING_CACHE_PATH") or None
+
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path and max_entries > 0:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scoring_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _normalize_answers(self, answers: Dict[str, Any], skill: str) -> Dict[str, str]:
+        """Keep only this skill's answers, collapse whitespace, drop empty ones"""
+        prefix = f"{skill}_"
+        normalized = {}
+        for key, value in answers.items():
+            if key != skill and not key.startswith(prefix):
+                continue
+            text = self._WHITESPACE_RE.sub(" ", str(value or "")).strip()
+            if text:
+                normalized[key] = text
+        return normalized
+
+    def make_key(
+        self,
+        skill: str,
+        content: Dict[str, Any],
+        answers: Dict[str, Any],
+        scorer_version: Any,
+    ) -> str:
+        """Stable hash of (skill content, normalized skill answers, scorer version)
+
+        skill is a skill ("speaking") or one of its parts ("speaking_part2",
+        whose content is then content["speaking_part2"])
+        """
+        payload = {
+            "skill": skill,
+            "version": scorer_version,
+            "content": content.get(skill),
+            "answers": self._normalize_answers(answers, skill),
+        }
+        encoded = json.dumps(
+            payload,
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result (a private copy) or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM scoring_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    result = json.loads(row[0])
+                    self._store(key, result)
+
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(result)
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """Store a result in memory (and on disk if the persistent tier is enabled)"""
+        if not self.enabled:
+            return
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._store(key, result)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO scoring_cache (key, result) VALUES (?, ?)",
+                    (key, json.dumps(result, ensure_ascii=False, default=str)),
+                )
+                self._db.commit()
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached results (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM scoring_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent": self._db is not None,
+        }
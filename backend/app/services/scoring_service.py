@@ -1,13 +1,96 @@
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional
+from app.admission import Overloaded
 from app.services.gemini_service import GeminiService
+from app.services.llm_scheduler import Priority
+from app.services.heuristic_scorer import HeuristicScorer
+from app.services.scoring_cache import ScoringCache
 from app.models.test_session import Phase
 import json
+import math
+import os
 import re
+import time
+
+
+def _half_band(value: float) -> float:
+    """Round to the nearest IELTS half band (.25 and .75 round up)"""
+    return math.floor(value * 2 + 0.5) / 2
 
 
 class ScoringService:
     """Service for scoring test phases using Gemini"""
 
+    # Bump whenever prompts, band tables or answer matching change,
+    # so cached results from the previous scorer are not reused
+    SCORER_VERSION = 1
+
+    ANALYSIS_SYSTEM_INSTRUCTION = (
+        """Giám khảo IELTS. Phân tích tiếng Anh. Trả về TIẾNG VIỆT. Chỉ JSON."""
+    )
+
+    # Per-skill analysis parts: kind -> skill -> (focus, JSON schema)
+    # Stored in final_results["detailed_analysis"][ANALYSIS_RESULT_KEYS[kind]][skill]
+    ANALYSIS_RESULT_KEYS = {"ielts": "ielts_analysis", "beyond": "beyond_ielts"}
+    ANALYSIS_SKILLS = {
+        "ielts": {
+            "reading": (
+                "R: mạnh/yếu, dạng câu (MC,T/F/NG,matching,fill-blank)",
+                '{"strengths":[],"weaknesses":[],"question_type_analysis":{}}',
+            ),
+            "listening": (
+                "L: mạnh/yếu, dạng câu (MC,fill-blank,matching,short)",
+                '{"strengths":[],"weaknesses":[],"question_type_analysis":{}}',
+            ),
+            "writing": (
+                "W: 4 tiêu chí (TR,CC,LR,GR) - mạnh/yếu từng tiêu chí (chỉ Task 2 nếu không có T1)",
+                '{"task_achievement":{"score":0,"strengths":[],"weaknesses":[]}, "coherence_cohesion":{"score":0,"strengths":[],"weaknesses":[]}, "lexical_resource":{"score":0,"strengths":[],"weaknesses":[]}, "grammatical_range":{"score":0,"strengths":[],"weaknesses":[]}, "overall_assessment":""}',
+            ),
+            "speaking": (
+                "S: 4 tiêu chí (FC,LR,GR,P) - mạnh/yếu từng tiêu chí",
+                '{"fluency_coherence":{"score":0,"strengths":[],"weaknesses":[]}, "lexical_resource":{"score":0,"strengths":[],"weaknesses":[]}, "grammatical_range":{"score":0,"strengths":[],"weaknesses":[]}, "pronunciation":{"score":0,"strengths":[],"weaknesses":[]}, "overall_assessment":""}',
+            ),
+        },
+        "beyond": {
+            "listening": (
+                "LISTENING: phản xạ nghe, tốc độ xử lý, khả năng nắm bắt thông tin, ảnh hưởng ngôn ngữ mẹ đẻ",
+                '{"reflex_level":"","processing_speed":"","comprehension_ability":"","mother_tongue_impact":"","assessment":""}',
+            ),
+            "reading": (
+                "READING: tốc độ đọc, khả năng hiểu, cách tiếp cận văn bản, ảnh hưởng ngôn ngữ mẹ đẻ",
+                '{"reading_speed":"","comprehension_ability":"","text_approach":"","mother_tongue_impact":"","assessment":""}',
+            ),
+            "writing": (
+                "WRITING: văn phạm, từ vựng, cấu trúc, tự nhiên/dịch máy, lỗi nghĩa",
+                '{"grammar_errors":"","vocabulary_level":"","structure_quality":"","natural_vs_translated":"","meaning_errors":"","assessment":""}',
+            ),
+            "speaking": (
+                "SPEAKING: phát âm, nhịp điệu, từ vựng, văn phạm, phản xạ, tự nhiên",
+                '{"pronunciation":"","rhythm_stress":"","vocabulary_usage":"","grammar_accuracy":"","reflex_level":"","naturalness":"","assessment":""}',
+            ),
+            "overall": (
+                "TỔNG THỂ: phản xạ, khả năng tiếp nhận, ảnh hưởng tiếng mẹ đẻ, điểm mạnh/yếu chính",
+                '{"reflex_level":"","reception_ability":"","mother_tongue_influence":"","key_strengths":"","key_weaknesses":""}',
+            ),
+        },
+    }
+
+    # Sub-parts of the subjective skills, scored on their own by score_part()
+    # (answer keys: "<part>" or "<part>_<question id>")
+    SKILL_PARTS = {
+        "speaking": ("speaking_part1", "speaking_part2", "speaking_part3"),
+        "writing": ("writing_task1", "writing_task2"),
+    }
+    SPEAKING_CRITERIA = (
+        "fluency_coherence",
+        "lexical_resource",
+        "grammatical_range",
+        "pronunciation",
+    )
+
+    # Combined deadline for the IELTS + Beyond-IELTS analysis calls (run concurrently)
+    ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "60"))
+
     # IELTS Band conversion tables (adjusted for test: 20 questions total)
     # Note: raw_score = 0 means no answers or all wrong → band = 0.0 (not 2.5)
     # Based on 20 questions (4 sections x 5 questions each)
@@ -58,6 +141,29 @@ class ScoringService:
 
     def __init__(self):
         self.gemini = GeminiService()
+        self.heuristic = HeuristicScorer()
+        self.cache = ScoringCache()
+        # Analysis calls are independent and go to different keys: run them in parallel
+        self._analysis_executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="analysis"
+        )
+
+    def _cached(
+        self, skill: str, content: Dict[str, Any], answers: Dict[str, Any], scorer
+    ):
+        """Return cached result for identical content + answers, else score and cache"""
+        key = self.cache.make_key(skill, content, answers, self.SCORER_VERSION)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"Scoring cache hit for {skill}")
+            return cached
+
+        result = scorer(content, answers)
+        # Heuristic results (fallbacks / trivial answers) are not cached:
+        # a retry should get a real Gemini score once the API recovers
+        if result.get("source") != "heuristic":
+            self.cache.set(key, result)
+        return result
 
     def normalize_answer(self, answer: str) -> str:
         """Normalize answer for comparison - handles variations in spacing, case, punctuation"""
@@ -171,6 +277,12 @@ class ScoringService:
 
     def score_listening(
         self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score Listening (cached by content + answers hash)"""
+        return self._cached("listening", content, answers, self._score_listening)
+
+    def _score_listening(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Score Listening section (objective questions)"""
         correct_count = 0
@@ -266,6 +378,12 @@ class ScoringService:
 
     def score_reading(
         self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score Reading (cached by content + answers hash)"""
+        return self._cached("reading", content, answers, self._score_reading)
+
+    def _score_reading(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Score Reading section (objective questions)"""
         correct_count = 0
@@ -469,6 +587,12 @@ class ScoringService:
 
     def score_speaking(
         self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score Speaking (cached by content + answers hash)"""
+        return self._cached("speaking", content, answers, self._score_speaking)
+
+    def _score_speaking(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Score Speaking section using Gemini (4 IELTS criteria) - Optimized for token limits"""
         # Check if user provided any answers
@@ -499,6 +623,12 @@ class ScoringService:
                 "feedback": "No answers provided",
             }
 
+        # Trivially short answers: score locally, don't spend a Gemini call
+        if self.heuristic.is_trivial_speaking(content, answers):
+            return self.heuristic.estimate_speaking(
+                content, answers, feedback="Câu trả lời quá ngắn (điểm ước tính)"
+            )
+
         system_instruction = """You are an IELTS examiner. Evaluate speaking using 4 criteria: Fluency and Coherence, Lexical Resource, Grammatical Range and Accuracy, Pronunciation. 
         
 Test format: Part 1 (3-4 intro questions), Part 2 (1 cue card with topic and bullet points), Part 3 (3-4 analytical questions).
@@ -576,7 +706,9 @@ Evaluate using IELTS criteria (0-9.0 bands). Return JSON only:
 
         try:
             print("Calling Gemini API for Speaking scoring...")
-            result = self.gemini.generate_json(prompt, system_instruction)
+            result = self.gemini.generate_json(
+                prompt, system_instruction, priority=Priority.SCORING
+            )
             print("Gemini API response received for Speaking")
             return {
                 "fluency_coherence": result.get("fluency_coherence", 5.0),
@@ -586,23 +718,26 @@ Evaluate using IELTS criteria (0-9.0 bands). Return JSON only:
                 "overall_band": result.get("overall_band", 5.0),
                 "feedback": result.get("feedback", ""),
             }
+        except Overloaded:
+            raise  # No slot for the call: a 503, not an estimated score
         except Exception as e:
             print(f"Speaking scoring error: {e}")
             import traceback
 
             print(traceback.format_exc())
-            # Fallback scores
-            return {
-                "fluency_coherence": 5.0,
-                "lexical_resource": 5.0,
-                "grammatical_range": 5.0,
-                "pronunciation": 5.0,
-                "overall_band": 5.0,
-                "feedback": "Không thể đánh giá tự động",
-            }
+            # Fallback: heuristic estimate from the answer text
+            return self.heuristic.estimate_speaking(
+                content, answers, feedback="Không thể đánh giá tự động (điểm ước tính)"
+            )
 
     def score_writing(
         self, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score Writing (cached by content + answers hash)"""
+        return self._cached("writing", content, answers, self._score_writing)
+
+    def _score_writing(
+        self, content: Dict[str, Any], answers: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Score Writing section using Gemini (4 IELTS criteria) - Optimized for token limits"""
         # Check if Task 1 exists in content (for backward compatibility)
@@ -637,6 +772,12 @@ Evaluate using IELTS criteria (0-9.0 bands). Return JSON only:
                 }
             return result
 
+        # Trivially short answers: score locally, don't spend a Gemini call
+        if self.heuristic.is_trivial_writing(content, answers):
+            return self.heuristic.estimate_writing(
+                content, answers, feedback="Bài viết quá ngắn (điểm ước tính)"
+            )
+
         system_instruction = """You are an IELTS examiner. Evaluate writing using 4 criteria: Task Achievement/Response, Coherence and Cohesion, Lexical Resource, Grammatical Range and Accuracy. 
 
 Test format: Task 1 (50-80 words: describe chart/graph), Task 2 (100-120 words: social essay).
@@ -704,7 +845,9 @@ Return JSON only:
 
         try:
             print("Calling Gemini API for Writing scoring...")
-            result = self.gemini.generate_json(prompt, system_instruction)
+            result = self.gemini.generate_json(
+                prompt, system_instruction, priority=Priority.SCORING
+            )
             print("Gemini API response received for Writing")
 
             task2_scores = result.get("task2", {})
@@ -748,33 +891,260 @@ Return JSON only:
                     )
 
             return writing_result
+        except Overloaded:
+            raise  # No slot for the call: a 503, not an estimated score
         except Exception as e:
             print(f"Writing scoring error: {e}")
             import traceback
 
             print(traceback.format_exc())
-            # Fallback scores
-            fallback_result = {
-                "task2": {
-                    "task_response": 5.0,
-                    "coherence_cohesion": 5.0,
-                    "lexical_resource": 5.0,
-                    "grammatical_range": 5.0,
-                    "overall_band": 5.0,
-                },
-                "overall_band": 5.0,
-                "feedback": "Không thể đánh giá tự động",
+            # Fallback: heuristic estimate from the answer text
+            return self.heuristic.estimate_writing(
+                content, answers, feedback="Không thể đánh giá tự động (điểm ước tính)"
+            )
+
+    # --- Sub-part scoring (speaking parts / writing tasks scored separately) ---
+
+    def part_content(self, part: str, content: Dict[str, Any]) -> Any:
+        """Content of one sub-part ("speaking_part1" -> content["speaking"]["part1"])"""
+        skill, _, name = part.partition("_")
+        return content.get(skill, {}).get(name)
+
+    def score_part(
+        self, part: str, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score one speaking part / writing task (cached by its content + answers hash)"""
+        if part in self.SKILL_PARTS["speaking"]:
+            scorer = self._score_speaking_part
+        elif part in self.SKILL_PARTS["writing"]:
+            scorer = self._score_writing_task
+        else:
+            raise ValueError(f"Unknown part: {part}")
+        return self._cached(
+            part,
+            {part: self.part_content(part, content)},
+            answers,
+            lambda part_content, part_answers: scorer(
+                part, part_content[part], part_answers
+            ),
+        )
+
+    def _score_speaking_part(
+        self, part: str, part_content: Any, answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score one speaking part using Gemini (same criteria as the whole test)"""
+        name = part.partition("_")[2]
+        if name == "part2":
+            items = [(None, part_content or {}, answers.get(part, ""))]
+        else:
+            items = [
+                (q.get("id"), q, answers.get(f"{part}_{q.get('id')}", ""))
+                for q in (part_content or [])[:4]  # Limit to first 4 questions
+            ]
+
+        # Scored alone, so the heuristic sees only this part's answers
+        part_only = {"speaking": {name: part_content}}
+        if not any((text or "").strip() for _, _, text in items):
+            return {
+                **{criterion: 0.0 for criterion in self.SPEAKING_CRITERIA},
+                "overall_band": 0.0,
+                "feedback": "No answers provided",
             }
-            # Include Task 1 only if it exists
-            if has_task1:
-                fallback_result["task1"] = {
-                    "task_achievement": 5.0,
-                    "coherence_cohesion": 5.0,
-                    "lexical_resource": 5.0,
-                    "grammatical_range": 5.0,
-                    "overall_band": 5.0,
+        if self.heuristic.is_trivial_speaking(part_only, answers):
+            return self.heuristic.estimate_speaking(
+                part_only, answers, feedback="Câu trả lời quá ngắn (điểm ước tính)"
+            )
+
+        def truncate_text(text: str, max_words: int) -> str:
+            words = (text or "").split()
+            if len(words) <= max_words:
+                return text or ""
+            return " ".join(words[:max_words]) + "..."
+
+        if name == "part2":
+            _, card, answer = items[0]
+            part_text = (
+                f"Cue card - topic: {card.get('topic', '')}\n"
+                f"{card.get('task_card', '')[:200]}\n"
+                f"Answer: {truncate_text(answer, 200)}"
+            )
+        else:
+            max_words = 50 if name == "part1" else 80
+            part_text = "\n".join(
+                f"Q{qid}: {q.get('question', '')[:100]}\nA: {truncate_text(answer, max_words)}"
+                for qid, q, answer in items
+            )
+
+        system_instruction = """You are an IELTS examiner. Evaluate speaking using 4 criteria: Fluency and Coherence, Lexical Resource, Grammatical Range and Accuracy, Pronunciation.
+Only one part of the test is given; the other parts are scored separately.
+Return JSON only."""
+        prompt = f"""Evaluate IELTS Speaking Part {name[-1]}:
+
+{part_text}
+
+Evaluate this part using IELTS criteria (0-9.0 bands). Return JSON only:
+{{"fluency_coherence":7.0,"lexical_resource":7.0,"grammatical_range":7.0,"pronunciation":7.0,"overall_band":7.0,"feedback":"Brief feedback"}}"""
+
+        try:
+            print(f"Calling Gemini API for Speaking {name} scoring...")
+            result = self.gemini.generate_json(
+                prompt, system_instruction, priority=Priority.SCORING
+            )
+            return {
+                **{c: result.get(c, 5.0) for c in self.SPEAKING_CRITERIA},
+                "overall_band": result.get("overall_band", 5.0),
+                "feedback": result.get("feedback", ""),
+            }
+        except Overloaded:
+            raise  # No slot for the call: a 503, not an estimated score
+        except Exception as e:
+            print(f"Speaking {name} scoring error: {e}")
+            return self.heuristic.estimate_speaking(
+                part_only,
+                answers,
+                feedback="Không thể đánh giá tự động (điểm ước tính)",
+            )
+
+    def _score_writing_task(
+        self, part: str, part_content: Any, answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score one writing task using Gemini"""
+        task = part.partition("_")[2]
+        part_content = part_content or {}
+        default_limit = 80 if task == "task1" else 120
+        word_limit = part_content.get("word_limit", default_limit)
+        answer = (answers.get(part) or "").strip()
+
+        if not answer:
+            return {
+                **self.heuristic.estimate_writing_task("", word_limit, task),
+                "feedback": "No answers provided",
+            }
+        if self.heuristic.word_count(answer) < self.heuristic.MIN_WRITING_WORDS:
+            return {
+                **self.heuristic.estimate_writing_task(answer, word_limit, task),
+                "feedback": "Bài viết quá ngắn (điểm ước tính)",
+                "source": "heuristic",
+            }
+
+        words = answer.split()
+        max_words = 100 if task == "task1" else 120
+        if len(words) > max_words:
+            answer = " ".join(words[:max_words]) + "..."
+
+        if task == "task1":
+            response_key = "task_achievement"
+            task_text = f"""Task 1 (Chart/Graph description - target: {word_limit} words):
+Instructions: {part_content.get("instructions", "")}"""
+        else:
+            response_key = "task_response"
+            task_text = f"""Task 2 (Essay - target: {word_limit} words):
+Question: {part_content.get("question", "")}"""
+
+        system_instruction = """You are an IELTS examiner. Evaluate writing using 4 criteria: Task Achievement/Response, Coherence and Cohesion, Lexical Resource, Grammatical Range and Accuracy.
+Only one task of the test is given; the other task is scored separately.
+Return JSON only."""
+        prompt = f"""Evaluate IELTS Writing {task_text}
+Answer: {answer}
+
+Evaluate using IELTS criteria (0-9.0 bands). Consider the word count target ({word_limit} words).
+Return JSON only:
+{{"{response_key}":7.0,"coherence_cohesion":7.0,"lexical_resource":7.0,"grammatical_range":7.0,"overall_band":7.0,"feedback":"Brief feedback"}}"""
+
+        criteria = (
+            response_key,
+            "coherence_cohesion",
+            "lexical_resource",
+            "grammatical_range",
+            "overall_band",
+        )
+        try:
+            print(f"Calling Gemini API for Writing {task} scoring...")
+            result = self.gemini.generate_json(
+                prompt, system_instruction, priority=Priority.SCORING
+            )
+            return {
+                **{c: result.get(c, 5.0) for c in criteria},
+                "feedback": result.get("feedback", ""),
+            }
+        except Overloaded:
+            raise  # No slot for the call: a 503, not an estimated score
+        except Exception as e:
+            print(f"Writing {task} scoring error: {e}")
+            return {
+                **self.heuristic.estimate_writing_task(answer, word_limit, task),
+                "feedback": "Không thể đánh giá tự động (điểm ước tính)",
+                "source": "heuristic",
+            }
+
+    def combine_parts(self, skill: str, results: Dict[str, Dict]) -> Dict[str, Any]:
+        """Skill result (same shape as score_speaking / score_writing) from part results"""
+        feedback = " ".join(
+            f"{part.partition('_')[2][:-1].capitalize()} {part[-1]}: {result['feedback']}"
+            for part, result in results.items()
+            if result.get("feedback")
+        )
+        if skill == "speaking":
+            # Unanswered parts score 0 on every criterion: they are left out of the
+            # mean, as whole-skill scoring only rates the answers given
+            answered = [
+                r
+                for r in results.values()
+                if any(r.get(criterion) for criterion in self.SPEAKING_CRITERIA)
+            ]
+            # IELTS rounds criteria and the overall band to the nearest half band
+            combined = {
+                criterion: (
+                    _half_band(
+                        sum(r.get(criterion, 0.0) for r in answered) / len(answered)
+                    )
+                    if answered
+                    else 0.0
+                )
+                for criterion in self.SPEAKING_CRITERIA
+            }
+            combined["overall_band"] = _half_band(
+                sum(combined.values()) / len(combined)
+            )
+        else:
+            combined = {
+                part.partition("_")[2]: {
+                    key: value
+                    for key, value in result.items()
+                    if key not in ("feedback", "source")
                 }
-            return fallback_result
+                for part, result in results.items()
+            }
+            task_bands = [task["overall_band"] for task in combined.values()]
+            # Same rule as score_writing: both tasks -> their mean, else Task 2
+            if len(task_bands) == 2 and all(task_bands):
+                combined["overall_band"] = round(sum(task_bands) / 2.0, 1)
+            else:
+                combined["overall_band"] = combined.get("task2", {}).get(
+                    "overall_band", 0.0
+                )
+        combined["feedback"] = feedback
+        combined["parts"] = results
+        if all(r.get("source") == "heuristic" for r in results.values()):
+            combined["source"] = "heuristic"
+        return combined
+
+    def provisional_scores(
+        self, phase_type: Phase, content: Dict[str, Any], answers: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Instant provisional scores for a phase (no Gemini call)
+
+        Objective skills use the normal scorers; Writing/Speaking use heuristic bands.
+        """
+        if phase_type == Phase.LISTENING_SPEAKING:
+            return {
+                "listening": self.score_listening(content, answers),
+                "speaking": self.heuristic.estimate_speaking(content, answers),
+            }
+        return {
+            "reading": self.score_reading(content, answers),
+            "writing": self.heuristic.estimate_writing(content, answers),
+        }
 
     def aggregate_results(
         self,
@@ -831,7 +1201,7 @@ Return JSON only:
 
         return results
 
-    def generate_detailed_analysis(
+    def _analysis_context(
         self,
         phase1_scores: Dict[str, Any],
         phase2_scores: Dict[str, Any],
@@ -842,12 +1212,8 @@ Return JSON only:
         phase1_answers: Dict[str, Any],
         phase2_answers: Dict[str, Any],
         final_results: Dict[str, Any],
-    ) -> Dict[str, Any]:
-        """Generate detailed analysis including IELTS framework and beyond-IELTS insights - Optimized for token limits"""
-        system_instruction = (
-            """Giám khảo IELTS. Phân tích tiếng Anh. Trả về TIẾNG VIỆT. Chỉ JSON."""
-        )
-
+    ) -> str:
+        """Compact Scores/Data/Samples block shared by all analysis prompts"""
         # Prepare data for analysis
         listening_score = final_results.get("listening", 0)
         reading_score = final_results.get("reading", 0)
@@ -936,16 +1302,41 @@ Return JSON only:
                     speaking_samples += f"S2:{sample_answer(phase2_answers[key], 15)}"
                     break
 
-        # Split into 2 separate API calls: Key 1 for IELTS, Key 2 for Beyond IELTS
-        ielts_analysis = {}
-        beyond_ielts = {}
+        return f"""Scores: L={listening_score:.1f} R={reading_score:.1f} W={writing_score:.1f} S={speaking_score:.1f} O={overall_score:.1f}
+Data: L:{listening_summary if listening_summary else 'N/A'} R:{reading_summary if reading_summary else 'N/A'} W:{writing_summary if writing_summary else 'N/A'} S:{speaking_summary if speaking_summary else 'N/A'}
+Samples: W:{writing_samples[:80] if writing_samples else 'N/A'} S:{speaking_samples[:80] if speaking_samples else 'N/A'}"""
 
+    def generate_detailed_analysis(
+        self,
+        phase1_scores: Dict[str, Any],
+        phase2_scores: Dict[str, Any],
+        phase1_type: Phase,
+        phase2_type: Phase,
+        phase1_content: Dict[str, Any],
+        phase2_content: Dict[str, Any],
+        phase1_answers: Dict[str, Any],
+        phase2_answers: Dict[str, Any],
+        final_results: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Generate detailed analysis including IELTS framework and beyond-IELTS insights - Optimized for token limits"""
+        system_instruction = self.ANALYSIS_SYSTEM_INSTRUCTION
+        context = self._analysis_context(
+            phase1_scores,
+            phase2_scores,
+            phase1_type,
+            phase2_type,
+            phase1_content,
+            phase2_content,
+            phase1_answers,
+            phase2_answers,
+            final_results,
+        )
+
+        # Split into 2 separate API calls: Key 1 for IELTS, Key 2 for Beyond IELTS
         # Part 1: IELTS Analysis using Key 1 (ultra-compact Vietnamese)
         ielts_prompt = f"""IELTS (TIẾNG VIỆT):
 
-Scores: L={listening_score:.1f} R={reading_score:.1f} W={writing_score:.1f} S={speaking_score:.1f} O={overall_score:.1f}
-Data: L:{listening_summary if listening_summary else 'N/A'} R:{reading_summary if reading_summary else 'N/A'} W:{writing_summary if writing_summary else 'N/A'} S:{speaking_summary if speaking_summary else 'N/A'}
-Samples: W:{writing_samples[:80] if writing_samples else 'N/A'} S:{speaking_samples[:80] if speaking_samples else 'N/A'}
+{context}
 
 Phân tích (TIẾNG VIỆT):
 - R: mạnh/yếu, dạng câu (MC,T/F/NG,matching,fill-blank)
@@ -958,9 +1349,7 @@ JSON (TIẾNG VIỆT): {{"ielts_analysis":{{"reading":{{"strengths":[],"weakness
         # Part 2: Beyond IELTS Analysis using Key 2 - Separate analysis for each skill
         beyond_prompt = f"""Beyond IELTS (TIẾNG VIỆT) - Phân tích riêng từng kỹ năng:
 
-Scores: L={listening_score:.1f} R={reading_score:.1f} W={writing_score:.1f} S={speaking_score:.1f} O={overall_score:.1f}
-Data: L:{listening_summary if listening_summary else 'N/A'} R:{reading_summary if reading_summary else 'N/A'} W:{writing_summary if writing_summary else 'N/A'} S:{speaking_summary if speaking_summary else 'N/A'}
-Samples: W:{writing_samples[:80] if writing_samples else 'N/A'} S:{speaking_samples[:80] if speaking_samples else 'N/A'}
+{context}
 
 Phân tích riêng từng kỹ năng (TIẾNG VIỆT):
 - LISTENING: phản xạ nghe, tốc độ xử lý, khả năng nắm bắt thông tin, ảnh hưởng ngôn ngữ mẹ đẻ
@@ -970,26 +1359,192 @@ Phân tích riêng từng kỹ năng (TIẾNG VIỆT):
 
 JSON (TIẾNG VIỆT): {{"beyond_ielts":{{"listening":{{"reflex_level":"","processing_speed":"","comprehension_ability":"","mother_tongue_impact":"","assessment":""}}, "reading":{{"reading_speed":"","comprehension_ability":"","text_approach":"","mother_tongue_impact":"","assessment":""}}, "writing":{{"grammar_errors":"","vocabulary_level":"","structure_quality":"","natural_vs_translated":"","meaning_errors":"","assessment":""}}, "speaking":{{"pronunciation":"","rhythm_stress":"","vocabulary_usage":"","grammar_accuracy":"","reflex_level":"","naturalness":"","assessment":""}}, "overall":{{"reflex_level":"","reception_ability":"","mother_tongue_influence":"","key_strengths":"","key_weaknesses":""}}}}}}"""
 
-        try:
-            print("Generating IELTS analysis (using Key 1)...")
-            ielts_result = self.gemini.generate_json(
-                ielts_prompt, system_instruction, force_key=1
+        # The calls are aborted at the deadline: a timed-out call does not keep
+        # its worker and scheduler slot (future.cancel() only stops queued ones)
+        deadline = time.monotonic() + self.ANALYSIS_TIMEOUT_SECONDS
+
+        def run_analysis(name: str, prompt: str, result_key: str, key: int):
+            print(f"Generating {name} analysis (using Key {key})...")
+            result = self.gemini.generate_json(
+                prompt,
+                system_instruction,
+                force_key=key,
+                priority=Priority.ANALYSIS,
+                timeout=deadline - time.monotonic(),
             )
-            ielts_analysis = ielts_result.get("ielts_analysis", {})
-            print("IELTS analysis generated successfully")
-        except Exception as e:
-            print(f"Error generating IELTS analysis: {e}")
-            ielts_analysis = {}
+            print(f"{name} analysis generated successfully")
+            return result.get(result_key, {})
+
+        futures = {
+            "ielts_analysis": self._analysis_executor.submit(
+                run_analysis, "IELTS", ielts_prompt, "ielts_analysis", 1
+            ),
+            "beyond_ielts": self._analysis_executor.submit(
+                run_analysis, "Beyond IELTS", beyond_prompt, "beyond_ielts", 2
+            ),
+        }
+        done, _ = wait(futures.values(), timeout=self.ANALYSIS_TIMEOUT_SECONDS)
 
-        try:
-            print("Generating Beyond IELTS analysis (using Key 2)...")
-            beyond_result = self.gemini.generate_json(
-                beyond_prompt, system_instruction, force_key=2
-            )
-            beyond_ielts = beyond_result.get("beyond_ielts", {})
-            print("Beyond IELTS analysis generated successfully")
-        except Exception as e:
-            print(f"Error generating Beyond IELTS analysis: {e}")
-            beyond_ielts = {}
+        # Partial results: keep whichever part finished, mark the rest as missing
+        missing = []
+        for part, future in futures.items():
+            if future not in done:
+                print(
+                    f"Timed out generating {part} after {self.ANALYSIS_TIMEOUT_SECONDS}s"
+                )
+                future.cancel()
+                missing.append(part)
+            elif future.exception() is not None:
+                print(f"Error generating {part}: {future.exception()}")
+                missing.append(part)
+
+        ielts_analysis = (
+            futures["ielts_analysis"].result()
+            if "ielts_analysis" not in missing
+            else {}
+        )
+        beyond_ielts = (
+            futures["beyond_ielts"].result() if "beyond_ielts" not in missing else {}
+        )
+
+        analysis = {"ielts_analysis": ielts_analysis, "beyond_ielts": beyond_ielts}
+        if missing:
+            analysis["missing"] = missing
+        return analysis
+
+    def generate_skill_analysis(
+        self,
+        kind: str,
+        skill: str,
+        phase1_scores: Dict[str, Any],
+        phase2_scores: Dict[str, Any],
+        phase1_type: Phase,
+        phase2_type: Phase,
+        phase1_content: Dict[str, Any],
+        phase2_content: Dict[str, Any],
+        phase1_answers: Dict[str, Any],
+        phase2_answers: Dict[str, Any],
+        final_results: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Generate one part of the detailed analysis (one skill, IELTS or beyond-IELTS)
 
-        return {"ielts_analysis": ielts_analysis, "beyond_ielts": beyond_ielts}
+        kind: "ielts" | "beyond"; skill: key of ANALYSIS_SKILLS[kind]
+        timeout: seconds for the Gemini call, None for no limit
+        """
+        return self.generate_kind_analysis(
+            kind,
+            [skill],
+            phase1_scores,
+            phase2_scores,
+            phase1_type,
+            phase2_type,
+            phase1_content,
+            phase2_content,
+            phase1_answers,
+            phase2_answers,
+            final_results,
+            timeout=timeout,
+        ).get(skill, {})
+
+    def generate_kind_analysis(
+        self,
+        kind: str,
+        skills: list,
+        phase1_scores: Dict[str, Any],
+        phase2_scores: Dict[str, Any],
+        phase1_type: Phase,
+        phase2_type: Phase,
+        phase1_content: Dict[str, Any],
+        phase2_content: Dict[str, Any],
+        phase1_answers: Dict[str, Any],
+        phase2_answers: Dict[str, Any],
+        final_results: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Generate several skills of one analysis kind in a single call: skill -> analysis
+
+        kind: "ielts" | "beyond"; skills: keys of ANALYSIS_SKILLS[kind]
+        timeout: seconds for the Gemini call, None for no limit
+        """
+        unknown = [
+            skill for skill in skills if skill not in self.ANALYSIS_SKILLS.get(kind, {})
+        ]
+        if kind not in self.ANALYSIS_SKILLS or unknown or not skills:
+            raise ValueError(f"Unknown analysis part: {kind}/{','.join(unknown)}")
+
+        context = self._analysis_context(
+            phase1_scores,
+            phase2_scores,
+            phase1_type,
+            phase2_type,
+            phase1_content,
+            phase2_content,
+            phase1_answers,
+            phase2_answers,
+            final_results,
+        )
+        title = "IELTS" if kind == "ielts" else "Beyond IELTS"
+        focus = "\n".join(
+            f"- {self.ANALYSIS_SKILLS[kind][skill][0]}" for skill in skills
+        )
+        schema = ", ".join(
+            f'"{skill}":{self.ANALYSIS_SKILLS[kind][skill][1]}' for skill in skills
+        )
+        prompt = f"""{title} - {", ".join(skill.upper() for skill in skills)} (TIẾNG VIỆT):
+
+{context}
+
+Phân tích (TIẾNG VIỆT):
+{focus}
+
+JSON (TIẾNG VIỆT): {{{schema}}}"""
+
+        # Same key split as the full analysis: Key 1 for IELTS, Key 2 for Beyond IELTS
+        print(f"Generating {title} analysis for {', '.join(skills)}...")
+        result = self.gemini.generate_json(
+            prompt,
+            self.ANALYSIS_SYSTEM_INSTRUCTION,
+            force_key=1 if kind == "ielts" else 2,
+            priority=Priority.ANALYSIS,
+            timeout=timeout,
+        )
+        return {skill: result.get(skill, {}) for skill in skills}
+
+    def generate_analysis_parts(self, parts: list, *analysis_args) -> Dict[tuple, Any]:
+        """Generate (kind, skill) parts; failed/timed-out parts are omitted
+
+        One call per kind (its missing skills in one prompt, like the full
+        analysis), the kinds concurrently.
+        """
+        skills_by_kind = {}
+        for kind, skill in parts:
+            skills_by_kind.setdefault(kind, []).append(skill)
+
+        deadline = time.monotonic() + self.ANALYSIS_TIMEOUT_SECONDS
+        futures = {
+            kind: self._analysis_executor.submit(
+                lambda kind, skills: self.generate_kind_analysis(
+                    kind, skills, *analysis_args, timeout=deadline - time.monotonic()
+                ),
+                kind,
+                skills,
+            )
+            for kind, skills in skills_by_kind.items()
+        }
+        done, _ = wait(futures.values(), timeout=self.ANALYSIS_TIMEOUT_SECONDS)
+
+        generated = {}
+        for kind, future in futures.items():
+            skills = ",".join(skills_by_kind[kind])
+            if future not in done:
+                print(f"Timed out generating {kind}/{skills} analysis")
+                future.cancel()
+            elif future.exception() is not None:
+                print(
+                    f"Error generating {kind}/{skills} analysis: {future.exception()}"
+                )
+            else:
+                for skill, analysis in future.result().items():
+                    generated[(kind, skill)] = analysis
+        return generated
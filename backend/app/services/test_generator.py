@@ -1,5 +1,6 @@
 from typing import Dict, Any
 from app.services.gemini_service import GeminiService
+from app.services.llm_scheduler import Priority
 from app.models.test_session import Level, Phase
 
 
@@ -71,7 +72,9 @@ Generate an IELTS Listening & Speaking test for {level.value} level (IELTS {band
 }}
 """
 
-        return self.gemini.generate_json(prompt, system_instruction)
+        return self.gemini.generate_json(
+            prompt, system_instruction, priority=Priority.GENERATION
+        )
 
     def generate_reading_writing(self, level: Level) -> Dict[str, Any]:
         """Generate Reading & Writing test content (30 minutes)"""
@@ -139,4 +142,12 @@ Generate an IELTS Reading & Writing test for {level.value} level (IELTS {band})
 }}
 """
 
-        return self.gemini.generate_json(prompt, system_instruction)
+        return self.gemini.generate_json(
+            prompt, system_instruction, priority=Priority.GENERATION
+        )
+
+    def generate(self, phase: Phase, level: Level) -> Dict[str, Any]:
+        """Generate the test content of a phase type"""
+        if phase == Phase.LISTENING_SPEAKING:
+            return self.generate_listening_speaking(level)
+        return self.generate_reading_writing(level)
@@ -0,0 +1,44 @@
+"""
+Session storage backends
+
+Selected from env:
+- REDIS_URL set    -> RedisStorage (redis://..., shared by every node behind a load balancer)
+- DATABASE_URL set -> SQLStorage (sqlite:///... for one node, postgresql://... for many)
+- otherwise        -> InMemoryStorage (single process, lost on restart)
+"""
+
+import os
+from dotenv import load_dotenv
+
+from .base import BaseStorage, SESSION_FIELDS, VersionConflictError
+from .memory import InMemoryStorage
+
+load_dotenv()
+
+
+def create_storage() -> BaseStorage:
+    """Build the storage backend configured for this process"""
+    if os.getenv("REDIS_URL"):
+        # Imported lazily: the redis package is only needed when Redis is configured
+        from .redis_storage import RedisStorage
+
+        return RedisStorage()
+    if os.getenv("DATABASE_URL"):
+        # Imported lazily: the engine is only created when a database is configured
+        from .sql import SQLStorage
+
+        return SQLStorage()
+    return InMemoryStorage()
+
+
+# Global storage instance
+storage = create_storage()
+
+__all__ = [
+    "BaseStorage",
+    "InMemoryStorage",
+    "SESSION_FIELDS",
+    "VersionConflictError",
+    "create_storage",
+    "storage",
+]
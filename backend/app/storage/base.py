@@ -0,0 +1,232 @@
+"""
+Storage interface for test sessions
+All backends hand sessions to the routes as plain dicts with SESSION_FIELDS keys
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from app.models.test_session import Level, Phase, SessionStatus
+
+# Keys of a session dict (mirrors the TestSession columns)
+SESSION_FIELDS = (
+    "id",
+    "level",
+    "selected_phase",
+    "status",
+    "phase1_content",
+    "phase1_answers",
+    "phase1_scores",
+    "phase2_content",
+    "phase2_answers",
+    "phase2_scores",
+    "final_results",
+    "created_at",
+    "updated_at",
+    "phase1_started_at",
+    "phase1_completed_at",
+    "phase2_started_at",
+    "phase2_completed_at",
+    "version",  # Incremented on every update (optimistic concurrency)
+    "phase1_answers_seq",  # Last applied answers delta (merge_answers)
+    "phase2_answers_seq",
+    # Cohort the session belongs to: the ID of the cohort's template session,
+    # which holds the shared content (cohort_id == id on the template itself)
+    "cohort_id",
+)
+
+# Phase -> (answers field, seq field of its last applied delta)
+ANSWERS_FIELDS = {
+    1: ("phase1_answers", "phase1_answers_seq"),
+    2: ("phase2_answers", "phase2_answers_seq"),
+}
+
+
+# Large JSON fields: only loaded/decoded when a projection asks for them
+HEAVY_FIELDS = (
+    "phase1_content",
+    "phase1_answers",
+    "phase1_scores",
+    "phase2_content",
+    "phase2_answers",
+    "phase2_scores",
+    "final_results",
+)
+
+# Presence flags usable in a projection: "has_<field>" is True when <field> is set,
+# answered without loading or decoding the field
+PRESENCE_FLAGS = {f"has_{field}": field for field in HEAVY_FIELDS}
+
+# Always part of a projection (identity + version for compare-and-set updates)
+PROJECTION_BASE_FIELDS = ("id", "version")
+
+# Fields returned by list_sessions (no content / answers / scores)
+SESSION_SUMMARY_FIELDS = (
+    "id",
+    "level",
+    "selected_phase",
+    "status",
+    "created_at",
+    "updated_at",
+    "phase1_completed_at",
+    "phase2_completed_at",
+    "version",
+    "cohort_id",
+)
+
+# Fields list_sessions can filter on (indexed by every backend)
+INDEXED_FIELDS = ("status", "level", "selected_phase", "cohort_id")
+
+# Largest page list_sessions returns
+MAX_PAGE_SIZE = 200
+
+
+def apply_answers_delta(answers: Dict, delta: Dict) -> Dict:
+    """Merge a delta into answers in place (a None value removes the question)"""
+    for question_id, answer in delta.items():
+        if answer is None:
+            answers.pop(question_id, None)
+        else:
+            answers[question_id] = answer
+    return answers
+
+
+class VersionConflictError(Exception):
+    """update_session(expected_version=...) found a newer version of the session"""
+
+    def __init__(self, session_id: int, expected_version: int, actual_version: int):
+        self.session_id = session_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super().__init__(
+            f"Session {session_id} is at version {actual_version}, expected {expected_version}"
+        )
+
+
+# listener(session_id, session): called after a session changed on this node
+# (session is the updated session, at least its id and version, None when it
+# was deleted)
+SessionListener = Callable[[int, Optional[Dict]], None]
+
+
+class BaseStorage(ABC):
+    """Interface implemented by every session storage backend"""
+
+    # Copy-on-write tuple: _notify iterates it without a lock
+    _listeners: Tuple[SessionListener, ...] = ()
+
+    @abstractmethod
+    def create_session(self, level: Level, **fields) -> Dict:
+        """Create a new test session
+
+        fields: initial values of other session fields (e.g. a cohort student's
+        test and status), written with the session (version 1)
+        """
+
+    @abstractmethod
+    def get_session(
+        self, session_id: int, fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict]:
+        """Get session by ID (None if it does not exist)
+
+        fields: projection, a dict with only these keys (+ id and version) is
+        returned; may contain SESSION_FIELDS and PRESENCE_FLAGS names.
+        """
+
+    @abstractmethod
+    def update_session(
+        self, session_id: int, expected_version: Optional[int] = None, **updates
+    ) -> Optional[Dict]:
+        """Update session fields, returns the updated session (None if not found)
+
+        With expected_version the update is a compare-and-set: it raises
+        VersionConflictError if the session was updated since that version.
+        """
+
+    @abstractmethod
+    def delete_session(self, session_id: int) -> bool:
+        """Delete a session"""
+
+    @abstractmethod
+    def get_all_sessions(self) -> List[Dict]:
+        """Get all sessions (for debugging)"""
+
+    @abstractmethod
+    def list_sessions(
+        self,
+        status: Optional[SessionStatus] = None,
+        level: Optional[Level] = None,
+        selected_phase: Optional[Phase] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        cohort_id: Optional[int] = None,
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """One page of session summaries (SESSION_SUMMARY_FIELDS), newest first
+
+        cursor is the next_cursor of the previous page (sessions with a smaller ID);
+        returns (summaries, next_cursor), next_cursor is None on the last page.
+        """
+
+    def merge_answers(
+        self, session_id: int, phase: int, answers: Dict, seq: int
+    ) -> Optional[Dict]:
+        """Merge an answers delta into phase<phase>_answers (autosave)
+
+        answers maps question IDs to answers, None removes one. The delta is
+        applied only if seq is greater than the phase's last applied seq, so
+        retried and late duplicate deltas are no-ops. Returns {"id", "version",
+        "seq", "applied"} (None if the session is not found).
+
+        Default: read + compare-and-set write of the whole answers field;
+        backends override it to write only the delta.
+        """
+        answers_field, seq_field = ANSWERS_FIELDS[phase]
+        while True:
+            session = self.get_session(session_id, fields=(answers_field, seq_field))
+            if session is None:
+                return None
+            last_seq = session[seq_field] or 0
+            if seq <= last_seq:
+                return {
+                    "id": session_id,
+                    "version": session["version"],
+                    "seq": last_seq,
+                    "applied": False,
+                }
+            merged = apply_answers_delta(dict(session[answers_field] or {}), answers)
+            try:
+                updated = self.update_session(
+                    session_id,
+                    expected_version=session["version"],
+                    **{answers_field: merged, seq_field: seq},
+                )
+            except VersionConflictError:
+                continue
+            if updated is None:
+                return None
+            return {
+                "id": session_id,
+                "version": updated["version"],
+                "seq": seq,
+                "applied": True,
+            }
+
+    def add_listener(self, listener: SessionListener):
+        """Subscribe to updates/deletes made through this storage instance
+
+        Only changes made by this process are seen (other nodes of a shared
+        backend do not notify), so listeners must not assume they see every change.
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def _notify(self, session_id: int, session: Optional[Dict]):
+        for listener in self._listeners:
+            try:
+                listener(session_id, session)
+            except Exception as e:
+                print(f"Session listener error for session {session_id}: {e}")
+
+    def close(self):
+        """Flush/release resources (called on shutdown)"""
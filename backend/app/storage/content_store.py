@@ -0,0 +1,130 @@
+"""
+Shared, reference-counted store for generated test content
+Sessions given the same test (pool, bank, classroom assignment) hold a reference
+to one compressed copy instead of their own deep copy
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import threading
+import zlib
+
+try:  # Optional: faster, more compact JSON encoding
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+ZLIB_LEVEL = 6
+
+
+def dumps_json(value: Any) -> bytes:
+    """Compact JSON bytes (key order preserved, so identical content -> identical bytes)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_blob(value: Any) -> bytes:
+    """Serialize + compress a JSON value"""
+    return zlib.compress(dumps_json(value), ZLIB_LEVEL)
+
+
+def decode_blob(blob: bytes) -> Any:
+    """Decompress + deserialize a value produced by encode_blob"""
+    raw = zlib.decompress(blob)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def content_digest(value: Any) -> Tuple[str, bytes]:
+    """(sha256 hex digest, serialized bytes) of a content value"""
+    raw = dumps_json(value)
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+class ContentRef:
+    """One stored content: its digest, compressed bytes and reference count"""
+
+    __slots__ = ("digest", "blob", "refs")
+
+    def __init__(self, digest: str, blob: bytes):
+        self.digest = digest
+        self.blob = blob
+        self.refs = 0
+
+    def load(self) -> Any:
+        """Decode a fresh copy of the content"""
+        return decode_blob(self.blob)
+
+    def __reduce__(self):
+        # Refcounts are per process: unpickled refs are re-interned by the store
+        return (_restore_ref, (self.digest, self.blob))
+
+
+class ContentStore:
+    """Content deduplicated by hash, freed when the last session releases it
+
+    Records hold the ContentRef object itself, so a reader holding an old
+    record can still decode its content after the store dropped it.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ContentRef] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+
+    def intern(self, value: Any) -> ContentRef:
+        """Shared ref for this content (compressed and added if not stored yet)"""
+        digest, raw = content_digest(value)
+        ref = self._entries.get(digest)
+        if ref is not None:
+            return ref
+        return self.adopt(ContentRef(digest, zlib.compress(raw, ZLIB_LEVEL)))
+
+    def adopt(self, ref: ContentRef) -> ContentRef:
+        """Canonical ref for a digest (e.g. after unpickling a spilled session)"""
+        with self._lock:
+            existing = self._entries.get(ref.digest)
+            if existing is not None:
+                return existing
+            self._entries[ref.digest] = ref
+            self.nbytes += len(ref.blob)
+            return ref
+
+    def retain(self, ref: ContentRef):
+        """A stored session now references this content"""
+        with self._lock:
+            if ref.digest not in self._entries:
+                # Released to zero between intern() and retain(): store it again
+                self._entries[ref.digest] = ref
+                self.nbytes += len(ref.blob)
+            ref.refs += 1
+
+    def release(self, ref: ContentRef):
+        """A stored session no longer references this content"""
+        with self._lock:
+            ref.refs -= 1
+            if ref.refs <= 0 and self._entries.get(ref.digest) is ref:
+                del self._entries[ref.digest]
+                self.nbytes -= len(ref.blob)
+
+    def get(self, digest: str) -> Optional[ContentRef]:
+        return self._entries.get(digest)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "contents": len(self._entries),
+                "content_bytes": self.nbytes,
+                "content_refs": sum(ref.refs for ref in self._entries.values()),
+            }
+
+
+# Process-wide store shared by all in-memory session records
+content_store = ContentStore()
+
+
+def _restore_ref(digest: str, blob: bytes) -> ContentRef:
+    return content_store.adopt(ContentRef(digest, blob))
@@ -0,0 +1,254 @@
+"""
+Write-ahead log + snapshots for InMemoryStorage
+Sessions survive a deploy/crash without a database on the request path
+
+Files in the journal directory:
+- wal-{N:08d}.log      appended entries, one segment per snapshot period
+- snapshot-{N:08d}.pkl every session at the moment segment N was opened
+
+Recovery loads the newest snapshot N and replays wal segments >= N. Entries
+carry the session version they produce, so replaying an update the snapshot
+already contains is a no-op.
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import atexit
+import glob
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+# Frame header: payload length + crc32 (a torn write at the tail fails the check)
+FRAME_HEADER = struct.Struct("<II")
+
+SYNC_MODES = ("batch", "always")
+
+
+class SessionJournal:
+    """Fsync-batched write-ahead log with periodic compacted snapshots
+
+    - append() only buffers; a writer thread writes + fsyncs the buffer every
+      fsync_interval seconds, so concurrent requests share one fsync
+    - sync_mode "batch": append() returns at once (a crash loses at most the
+      last fsync_interval); "always": append() waits for its fsync (group commit)
+    - after snapshot_every entries or snapshot_interval seconds the log is
+      rotated and a snapshot is written in the background; older segments and
+      snapshots are then deleted
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sync_mode: Optional[str] = None,
+        fsync_interval: Optional[float] = None,
+        snapshot_every: Optional[int] = None,
+        snapshot_interval: Optional[float] = None,
+    ):
+        if sync_mode is None:
+            sync_mode = os.getenv("SESSION_WAL_SYNC", "batch")
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f"SESSION_WAL_SYNC must be one of {SYNC_MODES}")
+        if fsync_interval is None:
+            fsync_interval = float(os.getenv("SESSION_WAL_FSYNC_MS", "50")) / 1000
+        if snapshot_every is None:
+            snapshot_every = int(os.getenv("SESSION_SNAPSHOT_EVERY", "50000"))
+        if snapshot_interval is None:
+            snapshot_interval = float(
+                os.getenv("SESSION_SNAPSHOT_INTERVAL_SECONDS", "300")
+            )
+
+        self.directory = directory
+        self.sync_mode = sync_mode
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._appended = 0
+        self._flushed = 0
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._snapshot_source: Optional[Callable[[], list]] = None
+        self._segment = 0
+        self._file = None
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+
+    # --- Files ---
+
+    def _path(self, kind: str, segment: int) -> str:
+        extension = "pkl" if kind == "snapshot" else "log"
+        return os.path.join(self.directory, f"{kind}-{segment:08d}.{extension}")
+
+    def _segments(self, kind: str) -> List[int]:
+        pattern = os.path.join(self.directory, f"{kind}-*")
+        segments = []
+        for path in glob.glob(pattern):
+            name = os.path.basename(path).split(".")[0]
+            if name.split("-")[1].isdigit() and not path.endswith(".tmp"):
+                segments.append(int(name.split("-")[1]))
+        return sorted(segments)
+
+    def _read_log(self, segment: int) -> Iterator[tuple]:
+        with open(self._path("wal", segment), "rb") as f:
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    return
+                length, checksum = FRAME_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    print(f"WAL segment {segment}: torn entry at the tail, ignored")
+                    return
+                yield pickle.loads(payload)
+
+    # --- Recovery ---
+
+    def recover(self) -> Tuple[list, Iterator[tuple]]:
+        """(sessions from the newest snapshot, log entries written after it)"""
+        sessions, base = [], 0
+        for segment in reversed(self._segments("snapshot")):
+            try:
+                with open(self._path("snapshot", segment), "rb") as f:
+                    sessions = pickle.load(f)
+                base = segment
+                break
+            except Exception as e:
+                print(f"Snapshot {segment} unreadable ({e}), trying an older one")
+
+        def entries():
+            for segment in self._segments("wal"):
+                if segment >= base:
+                    yield from self._read_log(segment)
+
+        return sessions, entries()
+
+    # --- Writing ---
+
+    def start(self, snapshot_source: Callable[[], list]):
+        """Open a new log segment and start the writer (call after recover())"""
+        self._snapshot_source = snapshot_source
+        existing = self._segments("wal") + self._segments("snapshot")
+        self._open_segment((existing[-1] if existing else 0) + 1)
+        self._writer = threading.Thread(
+            target=self._run, name="session-wal", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _open_segment(self, segment: int):
+        if self._file is not None:
+            self._file.close()
+        self._segment = segment
+        self._file = open(self._path("wal", segment), "ab")
+
+    def append(self, entry: tuple):
+        """Log one entry (after it was applied in memory)"""
+        payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._closed:
+                return
+            self._buffer.append(frame)
+            self._appended += 1
+            sequence = self._appended
+            if self.sync_mode == "always":
+                self._cond.notify_all()
+                while self._flushed < sequence and not self._closed:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait(self.fsync_interval)
+                frames, self._buffer = self._buffer, []
+                sequence = self._appended
+                closed = self._closed
+
+            if frames:
+                self._file.write(b"".join(frames))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._since_snapshot += len(frames)
+            with self._cond:
+                self._flushed = sequence
+                self._cond.notify_all()
+
+            if closed:
+                return
+            self._maybe_snapshot()
+
+    # --- Snapshots ---
+
+    def _maybe_snapshot(self):
+        due = self._since_snapshot >= self.snapshot_every or (
+            self._since_snapshot
+            and time.monotonic() - self._last_snapshot >= self.snapshot_interval
+        )
+        if not due or (self._snapshot_thread and self._snapshot_thread.is_alive()):
+            return
+        # Rotate first: every entry in older segments is already applied in memory,
+        # so the snapshot taken next covers them; later entries go to the new segment
+        segment = self._segment + 1
+        self._open_segment(segment)
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(segment,), name="session-snapshot"
+        )
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, segment: int):
+        start = time.perf_counter()
+        sessions = self._snapshot_source()
+        path = self._path("snapshot", segment)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(sessions, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # Compaction: the snapshot replaces everything before its segment
+        for kind in ("wal", "snapshot"):
+            for old in self._segments(kind):
+                if old < segment:
+                    os.remove(self._path(kind, old))
+        print(
+            f"Session snapshot {segment}: {len(sessions)} sessions "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def snapshot_now(self):
+        """Force a snapshot on the next writer cycle (e.g. before a planned restart)"""
+        with self._cond:
+            self._since_snapshot = max(self._since_snapshot, self.snapshot_every)
+            self._cond.notify_all()
+
+    def close(self):
+        """Flush and fsync pending entries, stop the writer"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._file is not None:
+            self._file.close()
+
+    def stats(self) -> Dict:
+        return {
+            "wal_segment": self._segment,
+            "wal_pending": len(self._buffer),
+            "wal_entries_since_snapshot": self._since_snapshot,
+        }
@@ -0,0 +1,636 @@
+"""
+In-memory storage for test sessions
+Replaces SQLite database for serverless/stateless deployment
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import bisect
+import glob
+import itertools
+import os
+import pickle
+import threading
+import time
+from app.models.test_session import Level, Phase, SessionStatus
+from app.storage.base import (
+    ANSWERS_FIELDS,
+    BaseStorage,
+    INDEXED_FIELDS,
+    MAX_PAGE_SIZE,
+    SESSION_SUMMARY_FIELDS,
+    VersionConflictError,
+    apply_answers_delta,
+)
+from app.storage.content_store import content_store
+from app.storage.durability import SessionJournal
+from app.storage.record import CONTENT_FIELDS, SessionRecord
+
+
+class InMemoryStorage(BaseStorage):
+    """In-memory storage for test sessions (single process only)
+
+    Thread-safe for FastAPI's threadpool:
+    - IDs come from a locked counter (no duplicate IDs)
+    - Writes to a session hold one of N striped locks (no global lock)
+    - Updates are copy-on-write: readers always see a complete session,
+      never a half-applied update
+
+    Sessions are kept as compact SessionRecord objects (read-only mappings):
+    test content and detailed analysis are stored compressed and decoded on access.
+    Test content is reference-counted in the shared content store, so sessions
+    with the same test share one copy.
+
+    Bounded memory (configured from env):
+    - SESSION_MEMORY_BUDGET_MB: evict least recently used sessions above this (0 = no limit)
+    - SESSION_COMPLETED_TTL_SECONDS: drop completed sessions idle for longer than this
+    - SESSION_ABANDONED_TTL_SECONDS: drop any session idle for longer than this
+    - SESSION_SPILL_DIR: spill evicted sessions to disk (reloaded on access) instead of dropping
+
+    Optional durability (SESSION_WAL_DIR): every create/update/delete is appended
+    to a write-ahead log with periodic snapshots (see durability.py), and the
+    sessions are recovered from them on startup.
+
+    Secondary indexes (status / level / selected_phase -> IDs, IDs in creation
+    order, per-session summaries) serve list_sessions without touching records.
+    """
+
+    # Seconds between TTL sweeps (sweeps piggyback on writes, no background thread)
+    SWEEP_INTERVAL_SECONDS = 60
+    # When over budget, evict down to this fraction of it (avoids evicting on every write)
+    EVICT_LOW_WATERMARK = 0.9
+    # IDs copied per step when list_sessions walks the creation-order index
+    ORDER_WINDOW = 256
+
+    def __init__(
+        self,
+        lock_stripes: Optional[int] = None,
+        memory_budget_bytes: Optional[int] = None,
+        completed_ttl_seconds: Optional[float] = None,
+        abandoned_ttl_seconds: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        wal_dir: Optional[str] = None,
+    ):
+        if lock_stripes is None:
+            lock_stripes = int(os.getenv("STORAGE_LOCK_STRIPES", "64"))
+        if memory_budget_bytes is None:
+            memory_budget_bytes = int(
+                float(os.getenv("SESSION_MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+            )
+        if completed_ttl_seconds is None:
+            completed_ttl_seconds = float(
+                os.getenv("SESSION_COMPLETED_TTL_SECONDS", str(6 * 3600))
+            )
+        if abandoned_ttl_seconds is None:
+            abandoned_ttl_seconds = float(
+                os.getenv("SESSION_ABANDONED_TTL_SECONDS", str(24 * 3600))
+            )
+        if spill_dir is None:
+            spill_dir = os.getenv("SESSION_SPILL_DIR") or None
+        if wal_dir is None:
+            wal_dir = os.getenv("SESSION_WAL_DIR") or None
+
+        self.sessions: Dict[int, SessionRecord] = {}
+        self.content = content_store
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+
+        # Secondary indexes (kept for spilled sessions too)
+        self._indexes: Dict[str, Dict[object, set]] = {f: {} for f in INDEXED_FIELDS}
+        self._order: List[int] = (
+            []
+        )  # IDs in creation order (deleted IDs skipped lazily)
+        self._order_garbage = 0
+        self._summaries: Dict[int, Dict] = {}
+        self._index_lock = threading.Lock()
+
+        self.memory_budget_bytes = memory_budget_bytes
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.abandoned_ttl_seconds = abandoned_ttl_seconds
+        # Approximate LRU: last access time per session (plain dict writes, no lock on reads)
+        self._last_access: Dict[int, float] = {}
+        self._sizes: Dict[int, int] = {}
+        self._field_sizes: Dict[int, Dict[str, int]] = {}
+        self.total_bytes = 0
+        self._accounting_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        self.spill_dir = spill_dir
+        self._spilled = set()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            # Old spill files are stale (sessions are recovered from the WAL, if any)
+            for path in glob.glob(os.path.join(spill_dir, "session_*.pkl")):
+                os.remove(path)
+
+        self.journal = None
+        if wal_dir:
+            self.journal = SessionJournal(wal_dir)
+            self._recover()
+            self.journal.start(self._snapshot_records)
+
+    def _lock_for(self, session_id: int) -> threading.Lock:
+        return self._locks[session_id % len(self._locks)]
+
+    def _allocate_id(self) -> Tuple[int, datetime]:
+        """Next ID + creation time (taken together: created_at follows ID order)"""
+        with self._id_lock:
+            return next(self._ids), datetime.now()
+
+    def create_session(self, level: Level, **fields) -> Dict:
+        """Create a new test session (with initial fields, see BaseStorage)"""
+        session_id, created_at = self._allocate_id()
+
+        session = SessionRecord(
+            **{"status": SessionStatus.INITIALIZED, **fields},
+            id=session_id,
+            level=level,
+            created_at=created_at,
+            version=1,
+        )
+
+        self.sessions[session_id] = session
+        self._swap_content(None, session)
+        self._index(session)
+        self._log(("create", session_id, session))
+        self._touch(session_id)
+        self._account(session_id, session)
+        self._maybe_sweep()
+        return session
+
+    def get_session(
+        self, session_id: int, fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict]:
+        """Get session by ID (a projection only decodes the requested fields)"""
+        session = self.sessions.get(session_id)
+        if session is None and session_id in self._spilled:
+            session = self._load_spilled(session_id)
+        if session is None:
+            return None
+        self._touch(session_id)
+        return session.project(fields) if fields is not None else session
+
+    def update_session(
+        self, session_id: int, expected_version: Optional[int] = None, **updates
+    ) -> Optional[Dict]:
+        """Update session fields (compare-and-set when expected_version is given)"""
+        if session_id not in self.sessions and session_id in self._spilled:
+            self._load_spilled(session_id)
+
+        with self._lock_for(session_id):
+            session = self.sessions.get(session_id)
+            if not session:
+                return None
+
+            if expected_version is not None and session["version"] != expected_version:
+                raise VersionConflictError(
+                    session_id, expected_version, session["version"]
+                )
+
+            # Copy-on-write: build the new version, then publish it with one assignment
+            changes = {
+                key: value
+                for key, value in updates.items()
+                if key in session and key not in ("id", "version")
+            }
+            changes.update(updated_at=datetime.now(), version=session["version"] + 1)
+            updated = session.replace(**changes)
+
+            self.sessions[session_id] = updated
+            self._swap_content(session, updated)
+            self._index(updated)
+            if self.journal is not None:
+                # Log content as its compressed shared ref, not the decoded dict
+                for name in CONTENT_FIELDS:
+                    if changes.get(name) is not None:
+                        changes[name] = updated.raw(name)
+                self._log(("update", session_id, changes))
+            self._touch(session_id)
+
+        # Outside the stripe lock: accounting may evict, which takes stripe locks
+        self._notify(session_id, updated)
+        self._account(session_id, updated, changed=updates.keys())
+        self._maybe_sweep()
+        return updated
+
+    def merge_answers(
+        self, session_id: int, phase: int, answers: Dict, seq: int
+    ) -> Optional[Dict]:
+        """Merge an answers delta under the stripe lock (the log gets the delta only)"""
+        if session_id not in self.sessions and session_id in self._spilled:
+            self._load_spilled(session_id)
+
+        answers_field, seq_field = ANSWERS_FIELDS[phase]
+        with self._lock_for(session_id):
+            session = self.sessions.get(session_id)
+            if not session:
+                return None
+            last_seq = session[seq_field] or 0
+            if seq <= last_seq:
+                return {
+                    "id": session_id,
+                    "version": session["version"],
+                    "seq": last_seq,
+                    "applied": False,
+                }
+
+            # Shallow copy: the previous version may still be held by readers
+            merged = apply_answers_delta(dict(session[answers_field] or {}), answers)
+            changes = {
+                seq_field: seq,
+                "updated_at": datetime.now(),
+                "version": session["version"] + 1,
+            }
+            updated = session.replace(**changes, **{answers_field: merged})
+            self.sessions[session_id] = updated
+            self._index(updated)
+            if self.journal is not None:
+                self._log(("answers", session_id, phase, answers, changes))
+            self._touch(session_id)
+
+        self._notify(session_id, updated)
+        self._account(session_id, updated, changed=(answers_field,))
+        self._maybe_sweep()
+        return {
+            "id": session_id,
+            "version": updated["version"],
+            "seq": seq,
+            "applied": True,
+        }
+
+    def delete_session(self, session_id: int) -> bool:
+        """Delete a session"""
+        with self._lock_for(session_id):
+            spilled = self._remove_spill_file(session_id)
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self._swap_content(session, None)
+            if session is not None or spilled:
+                self._log(("delete", session_id))
+            self._unindex(session_id)
+            self._forget(session_id)
+        deleted = session is not None or spilled
+        if deleted:
+            self._notify(session_id, None)
+        return deleted
+
+    def get_all_sessions(self) -> list:
+        """Get all sessions (for debugging)"""
+        return [dict(session) for session in list(self.sessions.values())]
+
+    def list_sessions(
+        self,
+        status: Optional[SessionStatus] = None,
+        level: Optional[Level] = None,
+        selected_phase: Optional[Phase] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        cohort_id: Optional[int] = None,
+    ):
+        """One page of session summaries, newest first (served from the indexes)"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = {
+            field: value
+            for field, value in (
+                ("status", status),
+                ("level", level),
+                ("selected_phase", selected_phase),
+                ("cohort_id", cohort_id),
+            )
+            if value is not None
+        }
+
+        if filters:
+            # Start from the smallest matching index set
+            with self._index_lock:
+                candidates = list(
+                    min(
+                        (self._indexes[f].get(v, ()) for f, v in filters.items()),
+                        key=len,
+                    )
+                )
+            if cursor is not None:
+                candidates = [i for i in candidates if i < cursor]
+            candidates = sorted(candidates, reverse=True)
+        else:
+            candidates = self._ids_newest_first(cursor)
+
+        page = []
+        for session_id in candidates:
+            summary = self._summaries.get(session_id)
+            if summary is None:
+                continue
+            if any(summary[f] != v for f, v in filters.items()):
+                continue
+            if created_before is not None and summary["created_at"] >= created_before:
+                continue
+            if created_after is not None and summary["created_at"] < created_after:
+                break  # created_at follows ID order: every remaining one is older
+            page.append(dict(summary))
+            if len(page) > limit:
+                break
+
+        next_cursor = page[limit - 1]["id"] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def stats(self) -> Dict:
+        """Memory accounting (for monitoring)"""
+        return {
+            "sessions_in_memory": len(self.sessions),
+            "sessions_spilled": len(self._spilled),
+            "total_bytes": self.total_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            **self.content.stats(),
+            **(self.journal.stats() if self.journal else {}),
+        }
+
+    def close(self):
+        """Flush the write-ahead log (called on shutdown)"""
+        if self.journal is not None:
+            self.journal.close()
+
+    def _swap_content(self, old: Optional[SessionRecord], new: Optional[SessionRecord]):
+        """Move content references from the old to the new version of a session"""
+        for name in CONTENT_FIELDS:
+            old_ref = old.raw(name) if old is not None else None
+            new_ref = new.raw(name) if new is not None else None
+            if old_ref is new_ref:
+                continue
+            if new_ref is not None:
+                self.content.retain(new_ref)
+            if old_ref is not None:
+                self.content.release(old_ref)
+
+    # --- Secondary indexes ---
+
+    def _index(self, session: SessionRecord):
+        """Add/refresh a session in the indexes (callers hold its stripe lock)"""
+        session_id = session["id"]
+        summary = {field: session[field] for field in SESSION_SUMMARY_FIELDS}
+        with self._index_lock:
+            old = self._summaries.get(session_id)
+            if old is None:
+                bisect.insort(self._order, session_id)
+            for field in INDEXED_FIELDS:
+                if old is not None:
+                    if old[field] == summary[field]:
+                        continue
+                    self._indexes[field].get(old[field], set()).discard(session_id)
+                self._indexes[field].setdefault(summary[field], set()).add(session_id)
+            self._summaries[session_id] = summary
+
+    def _ids_newest_first(self, before: Optional[int]):
+        """IDs below `before` from the creation-order index, copied in small windows"""
+        while True:
+            with self._index_lock:
+                end = (
+                    bisect.bisect_left(self._order, before)
+                    if before is not None
+                    else len(self._order)
+                )
+                window = self._order[max(0, end - self.ORDER_WINDOW) : end]
+            if not window:
+                return
+            yield from reversed(window)
+            before = window[0]
+
+    def _unindex(self, session_id: int):
+        with self._index_lock:
+            summary = self._summaries.pop(session_id, None)
+            if summary is None:
+                return
+            for field in INDEXED_FIELDS:
+                self._indexes[field].get(summary[field], set()).discard(session_id)
+            # _order is cleaned lazily: rebuilt once half of it is deleted IDs
+            self._order_garbage += 1
+            if self._order_garbage > len(self._order) // 2:
+                self._order = [i for i in self._order if i in self._summaries]
+                self._order_garbage = 0
+
+    # --- Memory accounting / eviction ---
+
+    def _touch(self, session_id: int):
+        self._last_access[session_id] = time.monotonic()
+
+    def _account(self, session_id: int, session: SessionRecord, changed=None):
+        """Update byte accounting; only re-measures the changed fields when given"""
+        field_sizes = self._field_sizes.get(session_id)
+        if field_sizes is None or changed is None:
+            field_sizes = {key: session.field_nbytes(key) for key in session}
+        else:
+            field_sizes = dict(field_sizes)
+            for key in changed:
+                if key in session:
+                    field_sizes[key] = session.field_nbytes(key)
+        size = sum(field_sizes.values())
+
+        with self._accounting_lock:
+            self.total_bytes += size - self._sizes.get(session_id, 0)
+            self._sizes[session_id] = size
+            self._field_sizes[session_id] = field_sizes
+        if (
+            self.memory_budget_bytes
+            and self._resident_bytes() > self.memory_budget_bytes
+        ):
+            self._evict_to_budget()
+
+    def _resident_bytes(self) -> int:
+        """Session bytes + shared content bytes (what the budget limits)"""
+        return self.total_bytes + self.content.nbytes
+
+    def _is_cohort_template(self, session_id: int) -> bool:
+        """Cohort templates are never evicted: their students read phase 2 from them"""
+        with self._index_lock:
+            summary = self._summaries.get(session_id)
+        return summary is not None and summary["cohort_id"] == session_id
+
+    def _forget(self, session_id: int):
+        """Drop accounting for a session no longer in memory"""
+        self._last_access.pop(session_id, None)
+        with self._accounting_lock:
+            self.total_bytes -= self._sizes.pop(session_id, 0)
+            self._field_sizes.pop(session_id, None)
+
+    def _evict_to_budget(self):
+        """Evict least recently used sessions until below the low watermark"""
+        if not self._evict_lock.acquire(blocking=False):
+            return  # Another thread is already evicting
+        try:
+            target = self.memory_budget_bytes * self.EVICT_LOW_WATERMARK
+            by_age = sorted(self._last_access.items(), key=lambda item: item[1])
+            for session_id, _ in by_age:
+                if self._resident_bytes() <= target:
+                    break
+                if self._is_cohort_template(session_id):
+                    continue
+                self._evict(session_id, spill=bool(self.spill_dir))
+        finally:
+            self._evict_lock.release()
+
+    def _evict(self, session_id: int, spill: bool):
+        with self._lock_for(session_id):
+            session = self.sessions.get(session_id)
+            if session is None:
+                return
+            if spill:
+                self._write_spill_file(session_id, session)
+            else:
+                self._log(("delete", session_id))
+                self._unindex(session_id)
+            del self.sessions[session_id]
+            self._swap_content(session, None)
+            self._forget(session_id)
+        if not spill:
+            self._notify(session_id, None)
+        print(f"Evicted session {session_id} ({'spilled' if spill else 'dropped'})")
+
+    def _maybe_sweep(self):
+        """Drop sessions past their idle TTL (at most once per SWEEP_INTERVAL_SECONDS)"""
+        now = time.monotonic()
+        if now - self._last_sweep < self.SWEEP_INTERVAL_SECONDS:
+            return
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            for session_id, last_access in list(self._last_access.items()):
+                idle = now - last_access
+                session = self.sessions.get(session_id)
+                if session is None or self._is_cohort_template(session_id):
+                    continue
+                completed = session["status"] == SessionStatus.COMPLETED
+                if (completed and idle > self.completed_ttl_seconds) or (
+                    idle > self.abandoned_ttl_seconds
+                ):
+                    self._evict(session_id, spill=False)
+            self._sweep_spill_files()
+        finally:
+            self._evict_lock.release()
+
+    # --- Disk spill ---
+
+    def _spill_path(self, session_id: int) -> str:
+        return os.path.join(self.spill_dir, f"session_{session_id}.pkl")
+
+    def _write_spill_file(self, session_id: int, session: Dict):
+        path = self._spill_path(session_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(session, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._spilled.add(session_id)
+
+    def _remove_spill_file(self, session_id: int) -> bool:
+        if session_id not in self._spilled:
+            return False
+        self._spilled.discard(session_id)
+        try:
+            os.remove(self._spill_path(session_id))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _read_spill_file(self, session_id: int) -> Optional[SessionRecord]:
+        try:
+            with open(self._spill_path(session_id), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load_spilled(self, session_id: int) -> Optional[Dict]:
+        """Bring a spilled session back into memory"""
+        with self._lock_for(session_id):
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session  # Another thread already reloaded it
+            if session_id not in self._spilled:
+                return None
+            session = self._read_spill_file(session_id)
+            if session is None:
+                self._spilled.discard(session_id)
+                return None
+            self.sessions[session_id] = session
+            self._swap_content(None, session)
+            self._remove_spill_file(session_id)
+            self._touch(session_id)
+        self._account(session_id, session)
+        return session
+
+    def _sweep_spill_files(self):
+        """Spilled sessions expire like abandoned ones (by file modification time)"""
+        cutoff = time.time() - self.abandoned_ttl_seconds
+        for session_id in list(self._spilled):
+            if self._is_cohort_template(session_id):
+                continue
+            try:
+                if os.path.getmtime(self._spill_path(session_id)) < cutoff:
+                    with self._lock_for(session_id):
+                        self._remove_spill_file(session_id)
+                        self._unindex(session_id)
+                    self._notify(session_id, None)
+            except FileNotFoundError:
+                self._spilled.discard(session_id)
+
+    # --- Durability (write-ahead log + snapshots) ---
+
+    def _log(self, entry: tuple):
+        if self.journal is not None:
+            self.journal.append(entry)
+
+    def _snapshot_records(self) -> list:
+        """Every session, in memory or spilled (called from the snapshot thread)"""
+        # Holding the evict lock: no session can move to disk while we collect
+        with self._evict_lock:
+            spilled = [self._read_spill_file(i) for i in list(self._spilled)]
+            in_memory = list(self.sessions.values())
+        return in_memory + [session for session in spilled if session is not None]
+
+    def _recover(self):
+        """Rebuild the sessions from the newest snapshot + the log written after it"""
+        start = time.perf_counter()
+        records, entries = self.journal.recover()
+        sessions = {record["id"]: record for record in records}
+        max_id = max(sessions, default=0)
+        replayed = 0
+
+        for entry in entries:
+            op, session_id = entry[0], entry[1]
+            max_id = max(max_id, session_id)
+            if op == "create":
+                sessions.setdefault(session_id, entry[2])
+            elif op == "update":
+                session, changes = sessions.get(session_id), entry[2]
+                # Skip updates the snapshot already contains
+                if session is not None and changes["version"] > session["version"]:
+                    sessions[session_id] = session.replace(**changes)
+            elif op == "answers":
+                session = sessions.get(session_id)
+                phase, delta, changes = entry[2], entry[3], entry[4]
+                if session is not None and changes["version"] > session["version"]:
+                    answers_field = ANSWERS_FIELDS[phase][0]
+                    merged = apply_answers_delta(
+                        dict(session[answers_field] or {}), delta
+                    )
+                    sessions[session_id] = session.replace(
+                        **changes, **{answers_field: merged}
+                    )
+            elif op == "delete":
+                sessions.pop(session_id, None)
+            replayed += 1
+
+        for session_id, session in sessions.items():
+            self.sessions[session_id] = session
+            self._swap_content(None, session)
+            self._index(session)
+            self._touch(session_id)
+            self._account(session_id, session)
+        self._ids = itertools.count(max_id + 1)
+        if records or replayed:
+            print(
+                f"Recovered {len(sessions)} sessions ({len(records)} from snapshot, "
+                f"{replayed} log entries) in {time.perf_counter() - start:.2f}s"
+            )
@@ -0,0 +1,148 @@
+"""
+Compact in-memory session record
+Large immutable JSON fields are kept as compressed bytes and decoded lazily on access
+"""
+
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, List, Optional
+import json
+
+from app.storage.base import PRESENCE_FLAGS, PROJECTION_BASE_FIELDS, SESSION_FIELDS
+from app.storage.content_store import (
+    ContentRef,
+    content_store,
+    decode_blob,
+    encode_blob,
+)
+
+# Test content fields: held as references into the shared content store
+CONTENT_FIELDS = ("phase1_content", "phase2_content")
+# final_results is small except for its "detailed_analysis" part, which is compressed
+ANALYSIS_KEY = "detailed_analysis"
+
+
+class SessionRecord(Mapping):
+    """Read-only session mapping with the same keys as a session dict
+
+    - Fixed __slots__ instead of a per-session dict
+    - phase1_content / phase2_content are references into the shared content store
+      (identical tests are stored once); final_results["detailed_analysis"] is held
+      as compressed bytes; every access decodes a fresh copy
+    - replace() builds the next version and shares unchanged blobs with this one
+    """
+
+    __slots__ = SESSION_FIELDS + ("_detailed_analysis",)
+
+    def __init__(self, **fields):
+        for name in SESSION_FIELDS:
+            self._set(name, fields.get(name))
+
+    def _set(self, name: str, value: Any):
+        if name in CONTENT_FIELDS and value is not None:
+            if not isinstance(value, ContentRef):
+                value = content_store.intern(value)
+        elif name == "final_results":
+            analysis = None
+            if value is not None and ANALYSIS_KEY in value:
+                value = dict(value)
+                analysis = encode_blob(value.pop(ANALYSIS_KEY))
+            object.__setattr__(self, "_detailed_analysis", analysis)
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SessionRecord is immutable, use replace()")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in SESSION_FIELDS:
+            raise KeyError(key)
+        value = object.__getattribute__(self, key)
+        if value is None:
+            return None
+        if key in CONTENT_FIELDS:
+            return value.load()
+        if key == "final_results":
+            value = dict(value)
+            if self._detailed_analysis is not None:
+                value[ANALYSIS_KEY] = decode_blob(self._detailed_analysis)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(SESSION_FIELDS)
+
+    def __len__(self) -> int:
+        return len(SESSION_FIELDS)
+
+    def __contains__(self, key) -> bool:
+        return key in SESSION_FIELDS
+
+    def __repr__(self) -> str:
+        return (
+            f"SessionRecord(id={self.id}, status={self.status}, version={self.version})"
+        )
+
+    def replace(self, **updates) -> "SessionRecord":
+        """New record with some fields changed (unchanged blobs are shared, not copied)"""
+        record = object.__new__(SessionRecord)
+        for name in self.__slots__:
+            object.__setattr__(record, name, object.__getattribute__(self, name))
+        for name, value in updates.items():
+            if name in SESSION_FIELDS:
+                record._set(name, value)
+        return record
+
+    def field_nbytes(self, name: str) -> int:
+        """Approximate bytes held for one field (exact for compressed blobs)
+
+        Shared content counts as a reference only: its bytes belong to the content store
+        """
+        value = object.__getattribute__(self, name)
+        if value is None or isinstance(value, ContentRef):
+            return 16
+        if isinstance(value, bytes):
+            return len(value)
+        if name == "final_results":
+            size = len(json.dumps(value, default=str))
+            if self._detailed_analysis is not None:
+                size += len(self._detailed_analysis)
+            return size
+        if isinstance(value, (dict, list)):
+            return len(json.dumps(value, default=str))
+        return 64
+
+    def __reduce__(self):
+        # Pickle the stored (compressed) slot values as-is, e.g. for disk spill
+        # (content refs carry their bytes and are re-interned on load)
+        return (
+            _restore_record,
+            (tuple(object.__getattribute__(self, name) for name in self.__slots__),),
+        )
+
+    def project(self, fields: Iterable[str]) -> dict:
+        """Only the requested fields; presence flags never decode anything"""
+        projected = {name: self[name] for name in PROJECTION_BASE_FIELDS}
+        for name in fields:
+            if name in PRESENCE_FLAGS:
+                projected[name] = self.raw(PRESENCE_FLAGS[name]) is not None
+            elif name in SESSION_FIELDS:
+                projected[name] = self[name]
+        return projected
+
+    def raw(self, name: str) -> Optional[Any]:
+        """Stored value without decoding (ContentRef / compressed bytes for blob fields)"""
+        return object.__getattribute__(self, name)
+
+    def content_refs(self) -> List[ContentRef]:
+        """Shared contents referenced by this record"""
+        refs = (object.__getattribute__(self, name) for name in CONTENT_FIELDS)
+        return [ref for ref in refs if ref is not None]
+
+
+def _restore_record(values: tuple) -> SessionRecord:
+    # values: SESSION_FIELDS as of the pickling + _detailed_analysis last;
+    # fields added to SESSION_FIELDS since then are restored as None
+    fields, analysis = values[:-1], values[-1]
+    record = object.__new__(SessionRecord)
+    for index, name in enumerate(SESSION_FIELDS):
+        object.__setattr__(record, name, fields[index] if index < len(fields) else None)
+    object.__setattr__(record, "_detailed_analysis", analysis)
+    return record
@@ -0,0 +1,406 @@
+"""
+Redis storage for test sessions
+Any node behind the load balancer can serve any session (Redis or a protocol-compatible store)
+
+Layout (prefix defaults to "ielts"):
+- {prefix}:session_id          INCR counter for session IDs
+- {prefix}:session:{id}        hash, one field per session field (content / answers /
+                               scores are separate fields, so partial reads stay small)
+- {prefix}:content:{sha256}    compressed test content, shared by sessions with the same test
+- {prefix}:content_refs        hash sha256 -> number of sessions referencing that content
+- {prefix}:sessions            sorted set of session IDs (score = ID = creation order)
+- {prefix}:idx:{field}:{value} sorted set of session IDs per status / level / selected_phase
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+import json
+import os
+import zlib
+
+from app.models.test_session import Level, Phase, SessionStatus
+from app.storage.base import (
+    BaseStorage,
+    INDEXED_FIELDS,
+    MAX_PAGE_SIZE,
+    PRESENCE_FLAGS,
+    PROJECTION_BASE_FIELDS,
+    SESSION_FIELDS,
+    SESSION_SUMMARY_FIELDS,
+    VersionConflictError,
+)
+from app.storage.content_store import (
+    ZLIB_LEVEL,
+    content_digest,
+    decode_blob,
+    dumps_json,
+)
+
+CONTENT_FIELDS = ("phase1_content", "phase2_content")
+ENUM_FIELDS = {"level": Level, "selected_phase": Phase, "status": SessionStatus}
+DATETIME_FIELDS = (
+    "created_at",
+    "updated_at",
+    "phase1_started_at",
+    "phase1_completed_at",
+    "phase2_started_at",
+    "phase2_completed_at",
+)
+INT_FIELDS = (
+    "id",
+    "version",
+    "phase1_answers_seq",
+    "phase2_answers_seq",
+    "cohort_id",
+)
+
+
+class RedisStorage(BaseStorage):
+    """Storage backed by Redis hashes (shared by every worker and node)
+
+    - IDs come from INCR (atomic across nodes)
+    - Updates run in a WATCH/MULTI transaction: the version check, the field
+      writes, the version increment and the read-back are one round trip
+    - client is injectable (e.g. fakeredis.FakeRedis() in tests); otherwise one
+      is created from REDIS_URL
+    """
+
+    def __init__(
+        self, client=None, url: Optional[str] = None, prefix: Optional[str] = None
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "REDIS_URL is set but the redis package is not installed (pip install redis)"
+                ) from e
+            client = redis.Redis.from_url(url or os.getenv("REDIS_URL"))
+        self.client = client
+        self.prefix = prefix or os.getenv("REDIS_KEY_PREFIX", "ielts")
+
+    # --- Keys / encoding ---
+
+    def _session_key(self, session_id: int) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    def _content_key(self, digest: str) -> str:
+        return f"{self.prefix}:content:{digest}"
+
+    @property
+    def _refs_key(self) -> str:
+        return f"{self.prefix}:content_refs"
+
+    @property
+    def _all_key(self) -> str:
+        return f"{self.prefix}:sessions"
+
+    def _index_key(self, field: str, value: Any) -> str:
+        return f"{self.prefix}:idx:{field}:{getattr(value, 'value', value)}"
+
+    def _queue_index(self, pipe, session_id: int, old: Dict, new: Dict):
+        """Queue index moves for indexed fields whose value changed"""
+        for field in INDEXED_FIELDS:
+            if field not in new or new[field] == old.get(field):
+                continue
+            if old.get(field) is not None:
+                pipe.zrem(self._index_key(field, old[field]), session_id)
+            if new[field] is not None:
+                pipe.zadd(self._index_key(field, new[field]), {session_id: session_id})
+
+    def _encode(self, field: str, value: Any) -> bytes:
+        if field in ENUM_FIELDS or field in INT_FIELDS:
+            return str(getattr(value, "value", value)).encode()
+        if field in DATETIME_FIELDS:
+            return value.isoformat().encode()
+        if field in CONTENT_FIELDS:
+            return value.encode()  # Content digest
+        return dumps_json(value)
+
+    def _decode(self, field: str, raw: Optional[bytes]) -> Any:
+        if raw is None:
+            return None
+        if field in ENUM_FIELDS:
+            return ENUM_FIELDS[field](raw.decode())
+        if field in INT_FIELDS:
+            return int(raw)
+        if field in DATETIME_FIELDS:
+            return datetime.fromisoformat(raw.decode())
+        if field in CONTENT_FIELDS:
+            return raw.decode()  # Digest, resolved by _load_contents
+        return json.loads(raw)
+
+    def _to_session(
+        self, raw: Dict[bytes, bytes], fields: Iterable[str] = SESSION_FIELDS
+    ) -> Optional[Dict]:
+        if not raw:
+            return None
+        session = {
+            field: self._decode(field, raw.get(field.encode())) for field in fields
+        }
+        self._load_contents(session)
+        return session
+
+    def _load_contents(self, session: Dict):
+        """Replace content digests with the content (one MGET for both phases)"""
+        fields = [f for f in CONTENT_FIELDS if session.get(f) is not None]
+        if not fields:
+            return
+        blobs = self.client.mget([self._content_key(session[f]) for f in fields])
+        for field, blob in zip(fields, blobs):
+            session[field] = decode_blob(blob) if blob is not None else None
+
+    # --- Shared content (reference counted) ---
+
+    def _queue_retain_content(self, pipe, value: Any) -> str:
+        """Queue the writes storing content once + adding a reference, returns its digest"""
+        digest, raw = content_digest(value)
+        pipe.set(self._content_key(digest), zlib.compress(raw, ZLIB_LEVEL))
+        pipe.hincrby(self._refs_key, digest, 1)
+        return digest
+
+    def _release_content(self, digest: str):
+        """Drop one reference; the content is deleted with its last reference"""
+
+        def release(pipe):
+            refs = int(pipe.hget(self._refs_key, digest) or 0) - 1
+            pipe.multi()
+            if refs > 0:
+                pipe.hincrby(self._refs_key, digest, -1)
+            else:
+                pipe.hdel(self._refs_key, digest)
+                pipe.delete(self._content_key(digest))
+
+        # Retried if another session retains/releases content meanwhile
+        self.client.transaction(release, self._refs_key)
+
+    # --- BaseStorage ---
+
+    def create_session(self, level: Level, **fields) -> Dict:
+        """Create a new test session (with initial fields, see BaseStorage)"""
+        session_id = self.client.incr(f"{self.prefix}:session_id")
+        session = {field: None for field in SESSION_FIELDS}
+        session["status"] = SessionStatus.INITIALIZED
+        session.update(
+            {key: value for key, value in fields.items() if key in SESSION_FIELDS}
+        )
+        session.update(
+            id=session_id,
+            level=level,
+            created_at=datetime.now(),
+            version=1,
+        )
+        pipe = self.client.pipeline()
+        pipe.hset(
+            self._session_key(session_id),
+            mapping={
+                field: (
+                    self._queue_retain_content(pipe, value)
+                    if field in CONTENT_FIELDS
+                    else self._encode(field, value)
+                )
+                for field, value in session.items()
+                if value is not None
+            },
+        )
+        pipe.zadd(self._all_key, {session_id: session_id})
+        self._queue_index(pipe, session_id, {}, session)
+        pipe.execute()
+        return session
+
+    def get_session(
+        self, session_id: int, fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict]:
+        """Get session by ID
+
+        A projection is one pipelined HMGET (+ HSTRLEN per presence flag):
+        other fields are not transferred.
+        """
+        key = self._session_key(session_id)
+        if fields is None:
+            return self._to_session(self.client.hgetall(key))
+
+        names = list(PROJECTION_BASE_FIELDS)
+        flags = []
+        for name in fields:
+            if name in PRESENCE_FLAGS:
+                flags.append(name)
+            elif name in SESSION_FIELDS and name not in names:
+                names.append(name)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(key, names)
+        for flag in flags:
+            pipe.hstrlen(key, PRESENCE_FLAGS[flag])
+        values, *lengths = pipe.execute()
+        if values[0] is None:
+            return None
+
+        projected = self._to_session(
+            {name.encode(): value for name, value in zip(names, values)}, names
+        )
+        projected.update({flag: bool(n) for flag, n in zip(flags, lengths)})
+        return projected
+
+    def update_session(
+        self, session_id: int, expected_version: Optional[int] = None, **updates
+    ) -> Optional[Dict]:
+        """Update session fields (compare-and-set when expected_version is given)"""
+        key = self._session_key(session_id)
+        updates = {
+            k: v
+            for k, v in updates.items()
+            if k in SESSION_FIELDS and k not in ("id", "version")
+        }
+        updates["updated_at"] = datetime.now()
+        result = {}
+
+        def apply(pipe):
+            current_version, *old_values = pipe.hmget(
+                key, ["version", *CONTENT_FIELDS, *INDEXED_FIELDS]
+            )
+            old_digests = old_values[: len(CONTENT_FIELDS)]
+            old_indexed = {
+                field: self._decode(field, raw)
+                for field, raw in zip(INDEXED_FIELDS, old_values[len(CONTENT_FIELDS) :])
+            }
+            if current_version is None:
+                result["missing"] = True
+                return
+            if (
+                expected_version is not None
+                and int(current_version) != expected_version
+            ):
+                raise VersionConflictError(
+                    session_id, expected_version, int(current_version)
+                )
+
+            pipe.multi()
+            values, cleared = {}, []
+            for field, value in updates.items():
+                if value is None:
+                    cleared.append(field)
+                elif field in CONTENT_FIELDS:
+                    values[field] = self._queue_retain_content(pipe, value)
+                else:
+                    values[field] = self._encode(field, value)
+            if values:
+                pipe.hset(key, mapping=values)
+            if cleared:
+                pipe.hdel(key, *cleared)
+            pipe.hincrby(key, "version", 1)
+            self._queue_index(pipe, session_id, old_indexed, updates)
+            pipe.hgetall(key)
+
+            result["released"] = [
+                digest.decode()
+                for field, digest in zip(CONTENT_FIELDS, old_digests)
+                if digest is not None and field in updates
+            ]
+
+        # WATCH the session: a concurrent update makes EXEC fail and apply() re-run
+        replies = self.client.transaction(apply, key)
+        if result.get("missing"):
+            return None
+
+        for digest in result["released"]:
+            self._release_content(digest)
+        session = self._to_session(replies[-1])
+        self._notify(session_id, session)
+        return session
+
+    def delete_session(self, session_id: int) -> bool:
+        """Delete a session"""
+        key = self._session_key(session_id)
+        values = self.client.hmget(key, [*CONTENT_FIELDS, *INDEXED_FIELDS])
+        digests = values[: len(CONTENT_FIELDS)]
+        indexed = {
+            field: self._decode(field, raw)
+            for field, raw in zip(INDEXED_FIELDS, values[len(CONTENT_FIELDS) :])
+        }
+
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.zrem(self._all_key, session_id)
+        self._queue_index(pipe, session_id, indexed, dict.fromkeys(INDEXED_FIELDS))
+        deleted = bool(pipe.execute()[0])
+        if deleted:
+            for digest in digests:
+                if digest is not None:
+                    self._release_content(digest.decode())
+            self._notify(session_id, None)
+        return deleted
+
+    def get_all_sessions(self) -> List[Dict]:
+        """Get all sessions (for debugging)"""
+        session_ids = self.client.zrange(self._all_key, 0, -1)
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self._session_key(int(session_id)))
+        sessions = [self._to_session(raw) for raw in pipe.execute()]
+        return [s for s in sessions if s]
+
+    def list_sessions(
+        self,
+        status: Optional[SessionStatus] = None,
+        level: Optional[Level] = None,
+        selected_phase: Optional[Phase] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        cohort_id: Optional[int] = None,
+    ):
+        """One page of session summaries, newest first
+
+        Walks the most selective index sorted set backwards from the cursor in
+        batches; summaries come from HMGET (no content/answers transferred).
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = {
+            field: value
+            for field, value in (
+                ("cohort_id", cohort_id),
+                ("status", status),
+                ("selected_phase", selected_phase),
+                ("level", level),
+            )
+            if value is not None
+        }
+        index_key = (
+            self._index_key(*next(iter(filters.items()))) if filters else self._all_key
+        )
+
+        page, upper = [], f"({cursor}" if cursor is not None else "+inf"
+        while len(page) <= limit:
+            session_ids = self.client.zrevrangebyscore(
+                index_key, upper, "-inf", start=0, num=limit * 2
+            )
+            if not session_ids:
+                break
+            pipe = self.client.pipeline(transaction=False)
+            for session_id in session_ids:
+                pipe.hmget(self._session_key(int(session_id)), SESSION_SUMMARY_FIELDS)
+            for raw in pipe.execute():
+                if raw[0] is None:
+                    continue
+                summary = {
+                    field: self._decode(field, value)
+                    for field, value in zip(SESSION_SUMMARY_FIELDS, raw)
+                }
+                if any(summary[f] != v for f, v in filters.items()):
+                    continue
+                if (
+                    created_before is not None
+                    and summary["created_at"] >= created_before
+                ):
+                    continue
+                if created_after is not None and summary["created_at"] < created_after:
+                    continue
+                page.append(summary)
+                if len(page) > limit:
+                    break
+            upper = f"({int(session_ids[-1])}"
+
+        next_cursor = page[limit - 1]["id"] if len(page) > limit else None
+        return page[:limit], next_cursor
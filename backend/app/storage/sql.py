@@ -0,0 +1,361 @@
+"""
+SQLAlchemy storage for test sessions
+Shares session state between workers/nodes through the TestSession table
+Generated test content is stored once per distinct test in TestContent
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+import json
+from sqlalchemy import (
+    JSON,
+    String,
+    Text,
+    and_,
+    cast,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
+from app.database import Base, SessionLocal, engine
+from app.models.test_session import (
+    Level,
+    Phase,
+    SessionStatus,
+    TestContent,
+    TestSession,
+)
+from app.storage.base import (
+    ANSWERS_FIELDS,
+    BaseStorage,
+    MAX_PAGE_SIZE,
+    PRESENCE_FLAGS,
+    PROJECTION_BASE_FIELDS,
+    SESSION_FIELDS,
+    SESSION_SUMMARY_FIELDS,
+    VersionConflictError,
+)
+from app.storage.content_store import content_digest
+
+# Session content field -> TestSession column holding its TestContent hash
+CONTENT_HASH_COLUMNS = {
+    "phase1_content": "phase1_content_hash",
+    "phase2_content": "phase2_content_hash",
+}
+
+# Dialects with an atomic INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+class SQLStorage(BaseStorage):
+    """Storage backed by the TestSession ORM model (SQLite WAL or Postgres)"""
+
+    def __init__(self, session_factory=SessionLocal, bind=engine):
+        self._session_factory = session_factory
+        Base.metadata.create_all(bind=bind)
+
+    def _to_dict(self, db, row: TestSession) -> Dict:
+        session = {field: getattr(row, field) for field in SESSION_FIELDS}
+        for field, hash_column in CONTENT_HASH_COLUMNS.items():
+            digest = getattr(row, hash_column)
+            if digest is not None:
+                content = db.get(TestContent, digest)
+                session[field] = content.content if content else None
+        return session
+
+    # --- Shared content (reference counted) ---
+
+    def _retain_content(self, db, value: Any) -> str:
+        """Store content once (or add a reference to the stored copy), returns its hash"""
+        digest, _ = content_digest(value)
+        insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is not None:
+            statement = insert(TestContent).values(
+                hash=digest, content=value, ref_count=1, created_at=datetime.now()
+            )
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[TestContent.hash],
+                    set_={"ref_count": TestContent.ref_count + 1},
+                )
+            )
+            return digest
+
+        content = db.get(TestContent, digest)
+        if content is None:
+            db.add(TestContent(hash=digest, content=value, ref_count=1))
+        else:
+            content.ref_count += 1
+        return digest
+
+    def _release_content(self, db, digest: str):
+        """Drop one reference; the content row is deleted with its last reference"""
+        db.execute(
+            update(TestContent)
+            .where(TestContent.hash == digest)
+            .values(ref_count=TestContent.ref_count - 1)
+        )
+        db.execute(
+            delete(TestContent).where(
+                TestContent.hash == digest, TestContent.ref_count <= 0
+            )
+        )
+
+    def _set_content(self, db, row: TestSession, field: str, value: Any):
+        hash_column = CONTENT_HASH_COLUMNS[field]
+        old_digest = getattr(row, hash_column)
+        new_digest = self._retain_content(db, value) if value is not None else None
+        if old_digest is not None:
+            self._release_content(db, old_digest)
+        setattr(row, hash_column, new_digest)
+        setattr(row, field, None)
+
+    def create_session(self, level: Level, **fields) -> Dict:
+        """Create a new test session (with initial fields, see BaseStorage)"""
+        with self._session_factory() as db:
+            row = TestSession(
+                level=level,
+                status=SessionStatus.INITIALIZED,
+                created_at=datetime.now(),
+            )
+            for key, value in fields.items():
+                if key in CONTENT_HASH_COLUMNS:
+                    self._set_content(db, row, key, value)
+                elif key in SESSION_FIELDS and key not in ("id", "version"):
+                    setattr(row, key, value)
+            db.add(row)
+            db.commit()
+            db.refresh(row)
+            return self._to_dict(db, row)
+
+    def get_session(
+        self, session_id: int, fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict]:
+        """Get session by ID (a projection only selects the requested columns)"""
+        with self._session_factory() as db:
+            if fields is not None:
+                return self._project(db, session_id, fields)
+            row = db.get(TestSession, session_id)
+            return self._to_dict(db, row) if row else None
+
+    # --- Projection ---
+
+    def _present(self, field: str):
+        """SQL expression: is the field set (JSON columns may hold a JSON 'null')"""
+        column = getattr(TestSession, field)
+        present = and_(column.isnot(None), cast(column, String) != "null")
+        if field in CONTENT_HASH_COLUMNS:
+            hash_column = getattr(TestSession, CONTENT_HASH_COLUMNS[field])
+            present = or_(hash_column.isnot(None), present)
+        return present
+
+    def _project(self, db, session_id: int, fields: Iterable[str]) -> Optional[Dict]:
+        columns = {name: getattr(TestSession, name) for name in PROJECTION_BASE_FIELDS}
+        for name in fields:
+            if name in PRESENCE_FLAGS:
+                columns[name] = self._present(PRESENCE_FLAGS[name])
+            elif name in SESSION_FIELDS:
+                columns[name] = getattr(TestSession, name)
+                if name in CONTENT_HASH_COLUMNS:
+                    hash_column = CONTENT_HASH_COLUMNS[name]
+                    columns[hash_column] = getattr(TestSession, hash_column)
+
+        row = db.execute(
+            select(*(column.label(name) for name, column in columns.items())).where(
+                TestSession.id == session_id
+            )
+        ).first()
+        if row is None:
+            return None
+
+        projected = dict(row._mapping)
+        for field, hash_column in CONTENT_HASH_COLUMNS.items():
+            digest = projected.pop(hash_column, None)
+            if digest is not None:
+                content = db.get(TestContent, digest)
+                projected[field] = content.content if content else None
+        for flag in PRESENCE_FLAGS:
+            if flag in projected:
+                projected[flag] = bool(projected[flag])
+        return projected
+
+    def update_session(
+        self, session_id: int, expected_version: Optional[int] = None, **updates
+    ) -> Optional[Dict]:
+        """Update session fields (compare-and-set when expected_version is given)
+
+        The version column is the mapper's version_id_col, so the UPDATE is
+        issued as "... WHERE id = ? AND version = <version read>": a concurrent
+        writer makes it match no row and StaleDataError is raised.
+        """
+        with self._session_factory() as db:
+            row = db.get(TestSession, session_id)
+            if not row:
+                return None
+
+            if expected_version is not None and row.version != expected_version:
+                raise VersionConflictError(session_id, expected_version, row.version)
+
+            for key, value in updates.items():
+                if key in CONTENT_HASH_COLUMNS:
+                    self._set_content(db, row, key, value)
+                elif key in SESSION_FIELDS and key not in ("id", "version"):
+                    setattr(row, key, value)
+
+            row.updated_at = datetime.now()
+            read_version = row.version
+            try:
+                db.commit()
+            except StaleDataError:
+                db.rollback()
+                current = db.get(TestSession, session_id)
+                raise VersionConflictError(
+                    session_id,
+                    read_version,
+                    current.version if current else read_version,
+                )
+            db.refresh(row)
+            session = self._to_dict(db, row)
+        self._notify(session_id, session)
+        return session
+
+    def _merged_answers(self, dialect: str, column, answers: Dict):
+        """SQL expression of the answers column with a delta merged in
+
+        None when the dialect has no JSON operators (the caller falls back to
+        read + compare-and-set write)
+        """
+        answered = {key: value for key, value in answers.items() if value is not None}
+        if dialect == "sqlite":
+            # json_patch is an RFC 7396 merge: clear the touched questions first
+            # so a (dict) answer replaces the previous one instead of merging into it
+            cleared = func.json_patch(
+                func.coalesce(column, literal("{}", String)),
+                json.dumps({key: None for key in answers}),
+            )
+            return func.json_patch(cleared, json.dumps(answered))
+        if dialect == "postgresql":
+            current = func.coalesce(
+                cast(column, JSONB), cast(literal("{}", String), JSONB)
+            )
+            cleared = current.op("-")(cast(literal(list(answers)), ARRAY(Text)))
+            merged = cleared.op("||")(cast(literal(json.dumps(answered)), JSONB))
+            return cast(merged, JSON)
+        return None
+
+    def merge_answers(
+        self, session_id: int, phase: int, answers: Dict, seq: int
+    ) -> Optional[Dict]:
+        """Merge an answers delta with one UPDATE (the stored answers are not read)"""
+        answers_field, seq_field = ANSWERS_FIELDS[phase]
+        answers_column = getattr(TestSession, answers_field)
+        seq_column = getattr(TestSession, seq_field)
+        with self._session_factory() as db:
+            merged = self._merged_answers(
+                db.get_bind().dialect.name, answers_column, answers
+            )
+            if merged is None:
+                return super().merge_answers(session_id, phase, answers, seq)
+
+            result = db.execute(
+                update(TestSession)
+                .where(
+                    TestSession.id == session_id,
+                    func.coalesce(seq_column, 0) < seq,
+                )
+                .values(
+                    {
+                        answers_column: merged,
+                        seq_column: seq,
+                        TestSession.version: TestSession.version + 1,
+                        TestSession.updated_at: datetime.now(),
+                    }
+                )
+                .execution_options(synchronize_session=False)
+            )
+            row = db.execute(
+                select(TestSession.version, seq_column).where(
+                    TestSession.id == session_id
+                )
+            ).first()
+            db.commit()
+        if row is None:
+            return None
+        merge = {
+            "id": session_id,
+            "version": row[0],
+            "seq": row[1] or 0,
+            "applied": result.rowcount > 0,
+        }
+        if merge["applied"]:
+            self._notify(session_id, {"id": session_id, "version": row[0]})
+        return merge
+
+    def delete_session(self, session_id: int) -> bool:
+        """Delete a session"""
+        with self._session_factory() as db:
+            row = db.get(TestSession, session_id)
+            if not row:
+                return False
+            for hash_column in CONTENT_HASH_COLUMNS.values():
+                digest = getattr(row, hash_column)
+                if digest is not None:
+                    self._release_content(db, digest)
+            db.delete(row)
+            db.commit()
+        self._notify(session_id, None)
+        return True
+
+    def get_all_sessions(self) -> List[Dict]:
+        """Get all sessions (for debugging)"""
+        with self._session_factory() as db:
+            rows = db.query(TestSession).order_by(TestSession.id).all()
+            return [self._to_dict(db, row) for row in rows]
+
+    def list_sessions(
+        self,
+        status: Optional[SessionStatus] = None,
+        level: Optional[Level] = None,
+        selected_phase: Optional[Phase] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        cohort_id: Optional[int] = None,
+    ):
+        """One page of session summaries, newest first (only summary columns are loaded)"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._session_factory() as db:
+            query = db.query(TestSession).options(
+                load_only(*(getattr(TestSession, f) for f in SESSION_SUMMARY_FIELDS))
+            )
+            if status is not None:
+                query = query.filter(TestSession.status == status)
+            if level is not None:
+                query = query.filter(TestSession.level == level)
+            if selected_phase is not None:
+                query = query.filter(TestSession.selected_phase == selected_phase)
+            if cohort_id is not None:
+                query = query.filter(TestSession.cohort_id == cohort_id)
+            if created_after is not None:
+                query = query.filter(TestSession.created_at >= created_after)
+            if created_before is not None:
+                query = query.filter(TestSession.created_at < created_before)
+            if cursor is not None:
+                query = query.filter(TestSession.id < cursor)
+            rows = query.order_by(TestSession.id.desc()).limit(limit + 1).all()
+
+            page = [
+                {field: getattr(row, field) for field in SESSION_SUMMARY_FIELDS}
+                for row in rows[:limit]
+            ]
+            next_cursor = page[-1]["id"] if len(rows) > limit else None
+            return page, next_cursor
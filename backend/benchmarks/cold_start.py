@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark: import time and time to the first response
+
+Run from backend/:  python -m benchmarks.cold_start [--runs 5] [--budget-ms 1500]
+
+Each run is a fresh interpreter (nothing cached in sys.modules) that:
+- imports app.main
+- serves GET /health through the app's startup (TestClient)
+- builds the LLM services and loads the Gemini SDK, as the first scoring or
+  generation request does (no API call is made)
+and reports the median of each step. Exits non-zero when the median time to
+the first response is over the budget, or when the Gemini SDK was imported
+before the first LLM request (startup should not pay for it).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, sys, time
+
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+    first_response = time.perf_counter()
+    sdk_at_startup = "google.generativeai" in sys.modules
+
+    from app.routes.test_session import scoring_service, test_generator
+    from app.services.gemini_service import _load_sdk
+
+    services_start = time.perf_counter()
+    test_generator.get()
+    scoring_service.get()
+    services = time.perf_counter()
+    _load_sdk()
+    sdk = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first_response - start) * 1000,
+    "services_ms": (services - services_start) * 1000,
+    "sdk_ms": (sdk - services) * 1000,
+    "sdk_at_startup": sdk_at_startup,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=1500,
+        help="median time from interpreter start of the import to the first response",
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ, PRELOAD_LLM_SERVICES="false")
+    # The services need a key to be built; none is used (no API call is made)
+    if not env.get("GEMINI_API_KEY") and not env.get("GEMINI_API_KEY_BACKUP"):
+        env["GEMINI_API_KEY"] = "cold-start-benchmark"
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    median = lambda key: statistics.median(run[key] for run in runs)
+    print(f"import app.main:   {median('import_ms'):7.0f} ms")
+    print(f"first response:    {median('first_response_ms'):7.0f} ms")
+    print(f"LLM services:      {median('services_ms'):7.0f} ms  (first LLM request)")
+    print(f"Gemini SDK import: {median('sdk_ms'):7.0f} ms  (first Gemini call)")
+
+    failures = []
+    if any(run["sdk_at_startup"] for run in runs):
+        failures.append("google.generativeai was imported at startup")
+    if median("first_response_ms") > args.budget_ms:
+        failures.append(
+            f"first response {median('first_response_ms'):.0f} ms > budget {args.budget_ms:.0f} ms"
+        )
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
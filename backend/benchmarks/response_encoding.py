@@ -0,0 +1,168 @@
+"""
+Response encoding benchmark: default FastAPI path vs the FAST_RESPONSES path
+
+Run from backend/:  python -m benchmarks.response_encoding [--iterations 500]
+
+A completed session with four listening transcripts and two reading passages
+is encoded per response as:
+- default: SessionResponse(**session), re-validated against the response model
+  and dumped with stdlib json (what a response_model route does)
+- fast:    the session fields rendered straight to bytes (FastJSONResponse)
+and then compressed (gzip, br if installed) or served from a cache: the
+compression middleware's body cache, or the per-version response cache
+(version-only read + lookup). Reports bytes on the wire and server CPU per
+response.
+"""
+
+import argparse
+import random
+import time
+
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from app.models.test_session import Level, Phase, SessionStatus
+from app.responses import (
+    CompressedBodyCache,
+    FastJSONResponse,
+    SessionResponseCache,
+    brotli,
+    compress,
+    orjson,
+)
+from app.schemas.test_session import SessionResponse
+from app.storage.memory import InMemoryStorage
+
+WORDS = (
+    "the a of to and in station library lecture museum river ticket market "
+    "research students climate energy population transport urban history "
+    "evidence suggests however therefore significant increase decrease "
+    "approximately century government policy environment technology"
+).split()
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def questions(rng: random.Random, prefix: str, count: int) -> list:
+    return [
+        {
+            "id": f"{prefix}_q{q}",
+            "question": text(rng, 14),
+            "options": [text(rng, 4) for _ in range(4)],
+            "correct_answer": rng.choice("ABCD"),
+        }
+        for q in range(1, count + 1)
+    ]
+
+
+def make_session(storage: InMemoryStorage, rng: random.Random) -> int:
+    listening_speaking = {
+        "listening": {
+            "sections": [
+                {
+                    "section": s,
+                    "audio_transcript": text(rng, 650),
+                    "questions": questions(rng, f"listening_s{s}", 10),
+                }
+                for s in range(1, 5)
+            ]
+        },
+        "speaking": {
+            "part1": [text(rng, 12) for _ in range(4)],
+            "part2": text(rng, 40),
+        },
+    }
+    reading_writing = {
+        "reading": {
+            "passages": [
+                {
+                    "passage": p,
+                    "text": text(rng, 900),
+                    "questions": questions(rng, f"reading_p{p}", 13),
+                }
+                for p in range(1, 3)
+            ]
+        },
+        "writing": {"task1": text(rng, 60), "task2": text(rng, 40)},
+    }
+    session_id = storage.create_session(Level.INTERMEDIATE)["id"]
+    storage.update_session(
+        session_id,
+        selected_phase=Phase.LISTENING_SPEAKING,
+        phase1_content=listening_speaking,
+        phase2_content=reading_writing,
+        phase1_scores={"listening": {"band": 6.5}, "speaking": {"band": 6.0}},
+        phase2_scores={"reading": {"band": 7.0}, "writing": {"band": 6.0}},
+        final_results={
+            "overall": 6.5,
+            "detailed_analysis": {"summary": text(rng, 300)},
+        },
+        status=SessionStatus.COMPLETED,
+    )
+    return session_id
+
+
+def measure(encode, iterations: int) -> tuple:
+    body = encode()
+    start = time.process_time()
+    for _ in range(iterations):
+        encode()
+    return body, (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    storage = InMemoryStorage(memory_budget_bytes=0)
+    session_id = make_session(storage, random.Random(0))
+    adapter = TypeAdapter(SessionResponse)
+    fields = tuple(SessionResponse.model_fields)
+
+    def default():
+        model = adapter.validate_python(
+            SessionResponse(**storage.get_session(session_id))
+        )
+        return JSONResponse(adapter.dump_python(model, mode="json")).body
+
+    def fast():
+        session = storage.get_session(session_id)
+        return FastJSONResponse({name: session[name] for name in fields}).body
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    print(f"orjson: {'yes' if orjson else 'no'}, brotli: {'yes' if brotli else 'no'}")
+    print(f"{'path':<10}{'encoding':<10}{'bytes':>10}{'us/response':>14}")
+    for name, encode in (("default", default), ("fast", fast)):
+        for encoding in encodings:
+            if encoding == "identity":
+                run = encode
+            else:
+                run = lambda: compress(encode(), encoding)
+            body, cpu = measure(run, args.iterations)
+            print(f"{name:<10}{encoding:<10}{len(body):>10}{cpu:>14.0f}")
+
+    # Repeat reads of one version: the compressed body comes from the cache
+    cache = CompressedBodyCache()
+    key = ("GET", f"/api/sessions/{session_id}", b"", f'"{session_id}-2"', "gzip")
+    cache.put(key, compress(fast(), "gzip"))
+    body, cpu = measure(lambda: cache.get(key), args.iterations)
+    print(f"{'cached':<10}{'gzip':<10}{len(body):>10}{cpu:>14.1f}")
+
+    # Repeat GET through the per-version response cache
+    response_cache = SessionResponseCache()
+    version = storage.get_session(session_id, fields=())["version"]
+    response_cache.put(session_id, version, "", fast(), "gzip")
+
+    def cached_get():
+        current = storage.get_session(session_id, fields=())
+        return response_cache.get(session_id, current["version"], "", "gzip")[0]
+
+    body, cpu = measure(cached_get, args.iterations)
+    print(f"{'versioned':<10}{'gzip':<10}{len(body):>10}{cpu:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
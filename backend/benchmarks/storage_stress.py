@@ -0,0 +1,109 @@
+"""
+Multi-threaded stress benchmark for InMemoryStorage
+
+Run from backend/:  python -m benchmarks.storage_stress [--ops 20000]
+
+For each thread count it runs a mix of create / read / compare-and-set update
+(retrying on VersionConflictError) and checks:
+- every created session got a unique ID
+- no increment was lost (sum of per-session counters == successful updates)
+Throughput is printed per thread count so contention collapse is visible.
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from app.models.test_session import Level
+from app.storage.base import VersionConflictError
+from app.storage.memory import InMemoryStorage
+
+HOT_SESSIONS = 32  # Small hot set: maximises contention on the same sessions
+
+
+def worker(storage, hot_ids, ops, created, stats, seed):
+    rng = random.Random(seed)
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.1:
+            created.append(storage.create_session(Level.INTERMEDIATE)["id"])
+        elif roll < 0.6:
+            storage.get_session(rng.choice(hot_ids))
+        else:
+            session_id = rng.choice(hot_ids)
+            while True:
+                session = storage.get_session(session_id)
+                counter = (session["phase1_answers"] or {}).get("counter", 0)
+                try:
+                    storage.update_session(
+                        session_id,
+                        expected_version=session["version"],
+                        phase1_answers={"counter": counter + 1},
+                    )
+                    stats["updates"] += 1
+                    break
+                except VersionConflictError:
+                    stats["conflicts"] += 1
+
+
+def run(threads: int, total_ops: int):
+    storage = InMemoryStorage()
+    hot_ids = [
+        storage.create_session(Level.INTERMEDIATE)["id"] for _ in range(HOT_SESSIONS)
+    ]
+    created = []
+    per_thread = [{"updates": 0, "conflicts": 0} for _ in range(threads)]
+    pool = [
+        threading.Thread(
+            target=worker,
+            args=(storage, hot_ids, total_ops // threads, created, per_thread[i], i),
+        )
+        for i in range(threads)
+    ]
+
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    updates = sum(s["updates"] for s in per_thread)
+    conflicts = sum(s["conflicts"] for s in per_thread)
+    counted = sum(
+        (storage.get_session(i)["phase1_answers"] or {}).get("counter", 0)
+        for i in hot_ids
+    )
+    ids = hot_ids + created
+
+    assert len(ids) == len(set(ids)), "duplicate session IDs"
+    assert counted == updates, f"lost updates: {updates - counted}"
+
+    return {
+        "threads": threads,
+        "ops_per_sec": int((total_ops // threads) * threads / elapsed),
+        "updates": updates,
+        "conflicts": conflicts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'ops/sec':>10} {'updates':>8} {'conflicts':>10}")
+    for threads in args.threads:
+        r = run(threads, args.ops)
+        print(
+            f"{r['threads']:>8} {r['ops_per_sec']:>10} {r['updates']:>8} {r['conflicts']:>10}"
+        )
+    print("OK: unique IDs, no lost updates")
+
+
+if __name__ == "__main__":
+    main()
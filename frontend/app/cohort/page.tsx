@@ -0,0 +1,61 @@
+'use client'
+
+import { useEffect, useRef, useState, Suspense } from 'react'
+import { useRouter, useSearchParams } from 'next/navigation'
+import { apiClient } from '@/lib/api'
+
+// Students open /cohort?id=<cohort id>: a session is created on the class's shared test
+function CohortJoinContent() {
+  const router = useRouter()
+  const searchParams = useSearchParams()
+  const cohortId = searchParams.get('id')
+  const [error, setError] = useState('')
+  const joined = useRef(false)
+
+  useEffect(() => {
+    if (!cohortId) {
+      router.push('/level-selection')
+      return
+    }
+    if (joined.current) return
+    joined.current = true
+
+    apiClient
+      .joinCohort(parseInt(cohortId))
+      .then((sessionId) => router.push(`/test?sessionId=${sessionId}&phase=1`))
+      .catch((err) => {
+        console.error('Error joining cohort:', err)
+        setError('Không tìm thấy lớp hoặc có lỗi xảy ra. Vui lòng kiểm tra lại đường dẫn.')
+      })
+  }, [cohortId, router])
+
+  return (
+    <div className="flex items-center justify-center min-h-screen">
+      <div className="text-center">
+        {error ? (
+          <div className="text-xl text-red-600">{error}</div>
+        ) : (
+          <>
+            <div className="inline-block w-12 h-12 border-4 border-blue-600 border-t-transparent rounded-full animate-spin mb-4"></div>
+            <div className="text-xl text-gray-600">Đang vào lớp...</div>
+          </>
+        )}
+      </div>
+    </div>
+  )
+}
+
+export default function CohortJoinPage() {
+  return (
+    <Suspense fallback={
+      <div className="flex items-center justify-center min-h-screen">
+        <div className="text-center">
+          <div className="inline-block w-12 h-12 border-4 border-blue-600 border-t-transparent rounded-full animate-spin mb-4"></div>
+          <div className="text-xl text-gray-600">Đang tải...</div>
+        </div>
+      </div>
+    }>
+      <CohortJoinContent />
+    </Suspense>
+  )
+}
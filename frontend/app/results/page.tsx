@@ -6,6 +6,13 @@ import { apiClient } from '@/lib/api'
 import { motion, AnimatePresence } from 'framer-motion'
 
 type TabType = 'overview' | 'ielts' | 'beyond'
+type AnalysisKind = 'ielts' | 'beyond'
+
+const ANALYSIS_RESULT_KEYS: Record<AnalysisKind, string> = {
+  ielts: 'ielts_analysis',
+  beyond: 'beyond_ielts',
+}
+const BEYOND_SKILLS = ['listening', 'reading', 'writing', 'speaking', 'overall']
 
 function ResultsContent() {
   const router = useRouter()
@@ -16,6 +23,7 @@ function ResultsContent() {
   const [loading, setLoading] = useState(true)
   const [activeTab, setActiveTab] = useState<TabType>('overview')
   const [expandedSections, setExpandedSections] = useState<Set<string>>(new Set())
+  const [loadingAnalysis, setLoadingAnalysis] = useState<Set<string>>(new Set())
 
   useEffect(() => {
     if (!sessionId) {
@@ -28,7 +36,7 @@ function ResultsContent() {
   const loadSession = async () => {
     if (!sessionId) return
     try {
-      const sessionData = await apiClient.getSession(parseInt(sessionId))
+      const sessionData = await apiClient.getSession(parseInt(sessionId), 'results')
       setSession(sessionData)
       setLoading(false)
     } catch (error) {
@@ -37,7 +45,60 @@ function ResultsContent() {
     }
   }
 
+  // Analysis is generated per skill on demand: fetch parts the first time they are
+  // shown, the missing skills of one kind in a single request
+  const loadAnalysis = async (kind: AnalysisKind, skills: string[]) => {
+    if (!sessionId) return
+    const resultKey = ANALYSIS_RESULT_KEYS[kind]
+    const loaded = session?.final_results?.detailed_analysis?.[resultKey] || {}
+    const missing = skills.filter(
+      skill => !loaded[skill] && !loadingAnalysis.has(`${kind}/${skill}`)
+    )
+    if (missing.length === 0) return
+    const partIds = missing.map(skill => `${kind}/${skill}`)
+
+    setLoadingAnalysis(prev => {
+      const next = new Set(prev)
+      partIds.forEach(partId => next.add(partId))
+      return next
+    })
+    try {
+      const { analyses } = await apiClient.getKindAnalysis(parseInt(sessionId), kind, missing)
+      setSession((prev: any) => {
+        if (!prev?.final_results) return prev
+        const detailed = prev.final_results.detailed_analysis || {}
+        return {
+          ...prev,
+          final_results: {
+            ...prev.final_results,
+            detailed_analysis: {
+              ...detailed,
+              [resultKey]: { ...(detailed[resultKey] || {}), ...analyses },
+            },
+          },
+        }
+      })
+    } catch (error) {
+      console.error(`Error loading ${partIds.join(', ')} analysis:`, error)
+    } finally {
+      setLoadingAnalysis(prev => {
+        const next = new Set(prev)
+        partIds.forEach(partId => next.delete(partId))
+        return next
+      })
+    }
+  }
+
+  useEffect(() => {
+    if (activeTab === 'beyond' && session?.final_results) {
+      loadAnalysis('beyond', BEYOND_SKILLS)
+    }
+  }, [activeTab, session?.final_results ? true : false])
+
   const toggleSection = (sectionId: string) => {
+    if (!expandedSections.has(sectionId)) {
+      loadAnalysis('ielts', [sectionId])
+    }
     setExpandedSections(prev => {
       const newSet = new Set(prev)
       if (newSet.has(sectionId)) {
@@ -191,7 +252,7 @@ function ResultsContent() {
       </motion.div>
 
       {/* Tabs Navigation */}
-      {session.final_results?.detailed_analysis && (
+      {session.final_results && (
         <div className="mb-6">
           <div className="flex space-x-2 bg-white/80 backdrop-blur-sm p-2 rounded-xl shadow-md">
             {tabs.map((tab) => (
@@ -213,7 +274,7 @@ function ResultsContent() {
 
       {/* Tab Content */}
       <AnimatePresence mode="wait">
-        {activeTab === 'overview' && session.final_results?.detailed_analysis && (
+        {activeTab === 'overview' && session.final_results && (
           <motion.div
             key="overview"
             initial={{ opacity: 0, y: 20 }}
@@ -273,7 +334,7 @@ function ResultsContent() {
           </motion.div>
         )}
 
-        {activeTab === 'ielts' && session.final_results?.detailed_analysis?.ielts_analysis && (
+        {activeTab === 'ielts' && session.final_results && (
           <motion.div
             key="ielts"
             initial={{ opacity: 0, y: 20 }}
@@ -282,56 +343,64 @@ function ResultsContent() {
             className="space-y-4"
           >
             {/* Reading */}
-            {session.final_results.detailed_analysis.ielts_analysis.reading && (
-              <CollapsibleSection
-                title="📖 Reading (Đọc hiểu)"
-                id="reading"
-                expanded={expandedSections.has('reading')}
-                onToggle={() => toggleSection('reading')}
-              >
+            <CollapsibleSection
+              title="📖 Reading (Đọc hiểu)"
+              id="reading"
+              expanded={expandedSections.has('reading')}
+              onToggle={() => toggleSection('reading')}
+            >
+              {session.final_results.detailed_analysis?.ielts_analysis?.reading ? (
                 <ReadingAnalysis data={session.final_results.detailed_analysis.ielts_analysis.reading} />
-              </CollapsibleSection>
-            )}
+              ) : (
+                <AnalysisPlaceholder loading={loadingAnalysis.has('ielts/reading')} />
+              )}
+            </CollapsibleSection>
 
             {/* Listening */}
-            {session.final_results.detailed_analysis.ielts_analysis.listening && (
-              <CollapsibleSection
-                title="🎧 Listening (Nghe hiểu)"
-                id="listening"
-                expanded={expandedSections.has('listening')}
-                onToggle={() => toggleSection('listening')}
-              >
+            <CollapsibleSection
+              title="🎧 Listening (Nghe hiểu)"
+              id="listening"
+              expanded={expandedSections.has('listening')}
+              onToggle={() => toggleSection('listening')}
+            >
+              {session.final_results.detailed_analysis?.ielts_analysis?.listening ? (
                 <ListeningAnalysis data={session.final_results.detailed_analysis.ielts_analysis.listening} />
-              </CollapsibleSection>
-            )}
+              ) : (
+                <AnalysisPlaceholder loading={loadingAnalysis.has('ielts/listening')} />
+              )}
+            </CollapsibleSection>
 
             {/* Writing */}
-            {session.final_results.detailed_analysis.ielts_analysis.writing && (
-              <CollapsibleSection
-                title="✍️ Writing (Viết)"
-                id="writing"
-                expanded={expandedSections.has('writing')}
-                onToggle={() => toggleSection('writing')}
-              >
+            <CollapsibleSection
+              title="✍️ Writing (Viết)"
+              id="writing"
+              expanded={expandedSections.has('writing')}
+              onToggle={() => toggleSection('writing')}
+            >
+              {session.final_results.detailed_analysis?.ielts_analysis?.writing ? (
                 <WritingAnalysis data={session.final_results.detailed_analysis.ielts_analysis.writing} />
-              </CollapsibleSection>
-            )}
+              ) : (
+                <AnalysisPlaceholder loading={loadingAnalysis.has('ielts/writing')} />
+              )}
+            </CollapsibleSection>
 
             {/* Speaking */}
-            {session.final_results.detailed_analysis.ielts_analysis.speaking && (
-              <CollapsibleSection
-                title="🎤 Speaking (Nói)"
-                id="speaking"
-                expanded={expandedSections.has('speaking')}
-                onToggle={() => toggleSection('speaking')}
-              >
+            <CollapsibleSection
+              title="🎤 Speaking (Nói)"
+              id="speaking"
+              expanded={expandedSections.has('speaking')}
+              onToggle={() => toggleSection('speaking')}
+            >
+              {session.final_results.detailed_analysis?.ielts_analysis?.speaking ? (
                 <SpeakingAnalysis data={session.final_results.detailed_analysis.ielts_analysis.speaking} />
-              </CollapsibleSection>
-            )}
+              ) : (
+                <AnalysisPlaceholder loading={loadingAnalysis.has('ielts/speaking')} />
+              )}
+            </CollapsibleSection>
           </motion.div>
         )}
 
-        {activeTab === 'beyond' && session.final_results?.detailed_analysis?.beyond_ielts && (
+        {activeTab === 'beyond' && session.final_results && (
           <motion.div
             key="beyond"
             initial={{ opacity: 0, y: 20 }}
@@ -339,7 +408,14 @@ function ResultsContent() {
             exit={{ opacity: 0, y: -20 }}
             className="space-y-4"
           >
-            <BeyondIELTSAnalysis data={session.final_results.detailed_analysis.beyond_ielts} />
+            {session.final_results.detailed_analysis?.beyond_ielts &&
+            Object.keys(session.final_results.detailed_analysis.beyond_ielts).length > 0 ? (
+              <BeyondIELTSAnalysis data={session.final_results.detailed_analysis.beyond_ielts} />
+            ) : (
+              <div className="card">
+                <AnalysisPlaceholder loading={loadingAnalysis.size > 0} />
+              </div>
+            )}
           </motion.div>
         )}
       </AnimatePresence>
@@ -408,6 +484,22 @@ function CollapsibleSection({
   )
 }
 
+// Shown while (or before) a lazily generated analysis part is loaded
+function AnalysisPlaceholder({ loading }: { loading: boolean }) {
+  return (
+    <div className="flex items-center justify-center py-6 text-gray-500">
+      {loading ? (
+        <>
+          <div className="inline-block w-6 h-6 border-2 border-blue-600 border-t-transparent rounded-full animate-spin mr-3"></div>
+          <span>Đang phân tích...</span>
+        </>
+      ) : (
+        <span>Chưa có phân tích</span>
+      )}
+    </div>
+  )
+}
+
 // Reading Analysis Component
 function ReadingAnalysis({ data }: { data: any }) {
   return (
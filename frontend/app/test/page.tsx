@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect, Suspense } from 'react'
+import { useState, useEffect, useRef, Suspense } from 'react'
 import { useRouter, useSearchParams } from 'next/navigation'
 import { motion } from 'framer-motion'
 import { apiClient } from '@/lib/api'
@@ -191,7 +191,18 @@ function TestContent() {
   const [answers, setAnswers] = useState<any>({})
   const [loading, setLoading] = useState(true)
   const [submitting, setSubmitting] = useState(false)
+  const [progress, setProgress] = useState<string | null>(null)
   const [waitingForResults, setWaitingForResults] = useState(false)
+  // Autosave: answers the server has acknowledged, last seq sent, patches in flight
+  const savedAnswers = useRef<Record<string, any>>({})
+  const saveSeq = useRef(0)
+  const saving = useRef<Promise<void>>(Promise.resolve())
+  // Finished sub-parts (speaking parts, writing tasks) not reported yet: sent with
+  // the next patch, the server then scores them in the background
+  const pendingParts = useRef<string[]>([])
+  const reportedParts = useRef<Set<string>>(new Set())
+  const latestAnswers = useRef<Record<string, any>>({})
+  latestAnswers.current = answers
 
   useEffect(() => {
     if (!sessionId) {
@@ -204,14 +215,14 @@ function TestContent() {
       const currentPhase = phaseParam ? parseInt(phaseParam) : 1
       try {
         console.log(`Loading session ${sessionId} for phase ${currentPhase}`)
-        const sessionData = await apiClient.getSession(parseInt(sessionId))
+        const sessionData = await apiClient.getSession(parseInt(sessionId), 'candidate')
         setSession(sessionData)
 
         // Generate content if not exists
         if (currentPhase === 1 && !sessionData.phase1_content) {
           console.log('Generating phase 1 content...')
           await apiClient.generatePhase(parseInt(sessionId))
-          const updated = await apiClient.getSession(parseInt(sessionId))
+          const updated = await apiClient.getSession(parseInt(sessionId), 'candidate')
           setSession(updated)
           setContent(updated.phase1_content)
         } else if (currentPhase === 1 && sessionData.phase1_content) {
@@ -220,7 +231,7 @@ function TestContent() {
         } else if (currentPhase === 2 && !sessionData.phase2_content) {
           console.log('Generating phase 2 content...')
           await apiClient.generatePhase2(parseInt(sessionId))
-          const updated = await apiClient.getSession(parseInt(sessionId))
+          const updated = await apiClient.getSession(parseInt(sessionId), 'candidate')
           setSession(updated)
           setContent(updated.phase2_content)
         } else if (currentPhase === 2 && sessionData.phase2_content) {
@@ -228,6 +239,14 @@ function TestContent() {
           setContent(sessionData.phase2_content)
         }
 
+        // Resume from the autosaved answers (reload / lost connection)
+        const saved = await apiClient.getAnswers(parseInt(sessionId), currentPhase)
+        savedAnswers.current = saved.answers
+        saveSeq.current = saved.seq
+        pendingParts.current = []
+        reportedParts.current = new Set()
+        setAnswers(saved.answers)
+
         setLoading(false)
       } catch (error) {
         console.error('Error loading session:', error)
@@ -245,8 +264,70 @@ function TestContent() {
 
   const handleAnswerChange = (key: string, value: string) => {
     setAnswers({ ...answers, [key]: value })
+    // Speaking goes part by part: the first answer of a part finishes the previous ones
+    if (key.startsWith('speaking_part2')) markPartDone('speaking_part1')
+    if (key.startsWith('speaking_part3')) markPartDone('speaking_part1', 'speaking_part2')
+  }
+
+  const markPartDone = (...parts: string[]) => {
+    const added = parts.filter((part) => !reportedParts.current.has(part))
+    if (added.length === 0) return
+    added.forEach((part) => reportedParts.current.add(part))
+    pendingParts.current.push(...added)
+    // After the answer that finished the part has been rendered into state
+    setTimeout(() => saveAnswers(latestAnswers.current), 0)
+  }
+
+  // Editing a finished writing task reports it again when the candidate leaves it
+  const handleTaskBlur = (task: string) => {
+    if (!(latestAnswers.current[task] || '').trim()) return
+    reportedParts.current.delete(task)
+    markPartDone(task)
   }
 
+  // Send the answers changed since the last acknowledged patch (one patch at a time)
+  const saveAnswers = (current: Record<string, any>) => {
+    saving.current = saving.current.then(async () => {
+      if (!sessionId) return
+      const delta: Record<string, any> = {}
+      for (const key of Object.keys(current)) {
+        if (current[key] !== savedAnswers.current[key]) delta[key] = current[key]
+      }
+      for (const key of Object.keys(savedAnswers.current)) {
+        if (!(key in current)) delta[key] = null
+      }
+      const parts = pendingParts.current
+      if (Object.keys(delta).length === 0 && parts.length === 0) return
+      pendingParts.current = []
+      saveSeq.current += 1
+      try {
+        let result = await apiClient.patchAnswers(parseInt(sessionId), phase, saveSeq.current, delta, parts)
+        if (!result.applied) {
+          // The server is past our seq (another tab, or a reload): continue from its seq
+          saveSeq.current = result.seq + 1
+          result = await apiClient.patchAnswers(parseInt(sessionId), phase, saveSeq.current, delta, parts)
+          if (!result.applied) throw new Error('Answers patch not applied')
+        }
+        savedAnswers.current = { ...savedAnswers.current, ...delta }
+        for (const key of Object.keys(delta)) {
+          if (delta[key] === null) delete savedAnswers.current[key]
+        }
+      } catch (error) {
+        // Unsaved keys (and parts) are sent again with the next patch
+        pendingParts.current.push(...parts)
+        console.error('Autosave failed:', error)
+      }
+    })
+    return saving.current
+  }
+
+  // Autosave a moment after the candidate stops typing
+  useEffect(() => {
+    if (loading) return
+    const timer = setTimeout(() => saveAnswers(answers), 1500)
+    return () => clearTimeout(timer)
+  }, [answers, loading])
+
   // Function to count words
   const countWords = (text: string): number => {
     if (!text || !text.trim()) return 0
@@ -352,11 +433,22 @@ function TestContent() {
   const handleSubmit = async () => {
     if (!sessionId) return
     setSubmitting(true)
+    // Show which skill is being scored while the submit request runs
+    const closeEvents = apiClient.subscribeSessionEvents(parseInt(sessionId), (event) => {
+      if (event.type === 'progress' && event.data.stage === 'scoring') {
+        setProgress(`Scoring ${event.data.skill}...`)
+      }
+    })
 
     try {
+      // Flush the autosave: the server then scores the answers it holds
+      await saveAnswers(answers)
+      const unsaved = Object.keys(answers).some((key) => answers[key] !== savedAnswers.current[key])
+      const submitted = unsaved ? answers : undefined
+
       if (phase === 1) {
         console.log('Submitting phase 1...')
-        const result = await apiClient.submitPhase1(parseInt(sessionId), answers)
+        const result = await apiClient.submitPhase1(parseInt(sessionId), submitted)
         console.log('Phase 1 submitted successfully:', result)
         // Reset submitting before navigation
         setSubmitting(false)
@@ -365,7 +457,7 @@ function TestContent() {
       } else {
         console.log('Submitting phase 2...')
         setSubmitting(true)
-        await apiClient.submitPhase2(parseInt(sessionId), answers)
+        await apiClient.submitPhase2(parseInt(sessionId), submitted)
         console.log('Phase 2 submitted, aggregating results...')
         // Show waiting screen while aggregating
         setSubmitting(false)
@@ -379,6 +471,9 @@ function TestContent() {
       const errorMessage = error?.response?.data?.detail || error?.message || 'Có lỗi xảy ra. Vui lòng thử lại.'
       alert(errorMessage)
       setSubmitting(false)
+    } finally {
+      closeEvents()
+      setProgress(null)
     }
   }
 
@@ -673,6 +768,7 @@ function TestContent() {
               part3={content.speaking.part3}
               onAnswer={(key, answer) => handleAnswerChange(key, answer)}
               answers={answers}
+              onComplete={() => markPartDone('speaking_part1', 'speaking_part2', 'speaking_part3')}
             />
           </div>
         )}
@@ -731,6 +827,7 @@ function TestContent() {
                   placeholder={`Write ${content.writing.task1.min_words || 50}-${content.writing.task1.max_words || 80} words...`}
                   value={answers.writing_task1 || ''}
                   onChange={(e) => handleAnswerChange('writing_task1', e.target.value)}
+                  onBlur={() => handleTaskBlur('writing_task1')}
                 />
                 <div className="flex items-center justify-between mt-2">
                   <div className="flex items-center gap-3">
@@ -784,6 +881,7 @@ function TestContent() {
                   placeholder={`Write a essay ${content.writing.task2.min_words || 100}-${content.writing.task2.max_words || 120} words...`}
                   value={answers.writing_task2 || ''}
                   onChange={(e) => handleAnswerChange('writing_task2', e.target.value)}
+                  onBlur={() => handleTaskBlur('writing_task2')}
                 />
                 <div className="flex items-center justify-between mt-2">
                   <div className="flex items-center gap-3">
@@ -830,7 +928,7 @@ function TestContent() {
               : 'bg-green-600 text-white hover:bg-green-700'
               }`}
           >
-            {submitting ? 'Processing...' : phase === 1 ? 'Submit and continue →' : 'Submit and view results →'}
+            {submitting ? progress || 'Processing...' : phase === 1 ? 'Submit and continue →' : 'Submit and view results →'}
           </button>
         </div>
       </div>
@@ -1,4 +1,4 @@
-import axios, { AxiosError } from 'axios'
+import axios, { AxiosError, InternalAxiosRequestConfig } from 'axios'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
@@ -29,12 +29,24 @@ api.interceptors.request.use(
   }
 )
 
+// Overloaded server (429/503 + Retry-After from LLM admission control): wait, then retry
+const MAX_OVERLOAD_RETRIES = 3
+
 // Response interceptor for error handling
 api.interceptors.response.use(
   (response) => {
     return response
   },
-  (error: AxiosError) => {
+  async (error: AxiosError) => {
+    const config = error.config as (InternalAxiosRequestConfig & { overloadRetries?: number }) | undefined
+    const status = error.response?.status
+    if (config && (status === 429 || status === 503) && (config.overloadRetries ?? 0) < MAX_OVERLOAD_RETRIES) {
+      const retryAfter = Number(error.response?.headers['retry-after']) || 5
+      config.overloadRetries = (config.overloadRetries ?? 0) + 1
+      console.warn(`[API] ${config.url} overloaded, retrying in ${retryAfter}s`)
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000))
+      return api(config)
+    }
     if (error.response) {
       // Server responded with error status
       console.error('[API Error]', {
@@ -79,6 +91,27 @@ export interface SessionResponse {
   updated_at: string | null
 }
 
+const SESSION_EVENT_TYPES = ['status', 'update', 'progress', 'partial_result', 'deleted'] as const
+
+// status/update: new session state; progress: what the server is working on;
+// partial_result: one skill's scores as soon as it is scored
+export interface SessionEvent {
+  type: (typeof SESSION_EVENT_TYPES)[number]
+  data: any
+}
+
+// A class sharing one generated test: id is the cohort's template session
+export interface CohortResponse {
+  id: number
+  level: string
+  selected_phase: string
+  created_at: string
+  session_ids: number[]
+}
+
+// candidate: test content without answer keys (no scores); results: scores and results (no content)
+export type SessionView = 'full' | 'candidate' | 'results'
+
 export const apiClient = {
   // Create session
   createSession: async (data: SessionCreate): Promise<SessionResponse> => {
@@ -114,9 +147,9 @@ export const apiClient = {
   },
 
   // Get session
-  getSession: async (sessionId: number): Promise<SessionResponse> => {
+  getSession: async (sessionId: number, view: SessionView = 'full'): Promise<SessionResponse> => {
     try {
-      const response = await api.get(`/api/sessions/${sessionId}`)
+      const response = await api.get(`/api/sessions/${sessionId}`, { params: { view } })
       return response.data
     } catch (error) {
       console.error(`Error getting session ${sessionId}:`, error)
@@ -136,7 +169,8 @@ export const apiClient = {
   },
 
   // Submit phase 1
-  submitPhase1: async (sessionId: number, answers: any): Promise<SessionResponse> => {
+  // Without answers the server scores the autosaved ones (see patchAnswers)
+  submitPhase1: async (sessionId: number, answers?: any): Promise<SessionResponse> => {
     try {
       const response = await api.post(`/api/sessions/${sessionId}/submit-phase1`, { answers })
       return response.data
@@ -146,6 +180,62 @@ export const apiClient = {
     }
   },
 
+  // Autosave: only the answers changed since the last patch (null removes one);
+  // seq increases with every patch, a retried patch is ignored by the server.
+  // completedParts (speaking_part1..3, writing_task1/2) are scored in the background
+  patchAnswers: async (
+    sessionId: number,
+    phase: number,
+    seq: number,
+    answers: Record<string, any>,
+    completedParts: string[] = []
+  ): Promise<{
+    session_id: number
+    phase: number
+    seq: number
+    applied: boolean
+    version: number
+    scoring_parts: string[]
+  }> => {
+    try {
+      const response = await api.patch(`/api/sessions/${sessionId}/answers`, {
+        phase,
+        seq,
+        answers,
+        completed_parts: completedParts,
+      })
+      return response.data
+    } catch (error) {
+      console.error(`Error saving answers for session ${sessionId}:`, error)
+      throw error
+    }
+  },
+
+  // Autosaved answers of a phase (to resume after a reload)
+  getAnswers: async (
+    sessionId: number,
+    phase: number
+  ): Promise<{ session_id: number; phase: number; seq: number; answers: Record<string, any> }> => {
+    try {
+      const response = await api.get(`/api/sessions/${sessionId}/answers`, { params: { phase } })
+      return response.data
+    } catch (error) {
+      console.error(`Error getting answers for session ${sessionId}:`, error)
+      throw error
+    }
+  },
+
+  // Provisional (heuristic) scores for the phase in progress - instant, no AI call
+  provisionalScores: async (sessionId: number, answers: any) => {
+    try {
+      const response = await api.post(`/api/sessions/${sessionId}/provisional-scores`, { answers })
+      return response.data
+    } catch (error) {
+      console.error(`Error getting provisional scores for session ${sessionId}:`, error)
+      throw error
+    }
+  },
+
   // Generate phase 2
   generatePhase2: async (sessionId: number): Promise<SessionResponse> => {
     try {
@@ -169,7 +259,8 @@ export const apiClient = {
   },
 
   // Submit phase 2
-  submitPhase2: async (sessionId: number, answers: any): Promise<SessionResponse> => {
+  // Without answers the server scores the autosaved ones (see patchAnswers)
+  submitPhase2: async (sessionId: number, answers?: any): Promise<SessionResponse> => {
     try {
       const response = await api.post(`/api/sessions/${sessionId}/submit-phase2`, { answers })
       return response.data
@@ -200,6 +291,95 @@ export const apiClient = {
       throw error
     }
   },
+
+  // Get one part of the detailed analysis (generated on first request, then cached)
+  getSkillAnalysis: async (
+    sessionId: number,
+    kind: 'ielts' | 'beyond',
+    skill: string
+  ): Promise<{ kind: string; skill: string; analysis: any; cached: boolean }> => {
+    try {
+      const response = await api.get(`/api/sessions/${sessionId}/analysis/${kind}/${skill}`)
+      return response.data
+    } catch (error) {
+      console.error(`Error getting ${kind}/${skill} analysis for session ${sessionId}:`, error)
+      throw error
+    }
+  },
+
+  // Get several skills of one analysis kind: the missing ones are generated in one call
+  getKindAnalysis: async (
+    sessionId: number,
+    kind: 'ielts' | 'beyond',
+    skills: string[]
+  ): Promise<{ kind: string; analyses: Record<string, any>; generated: string[] }> => {
+    try {
+      const response = await api.get(`/api/sessions/${sessionId}/analysis/${kind}`, {
+        params: { skills: skills.join(',') },
+      })
+      return response.data
+    } catch (error) {
+      console.error(`Error getting ${kind} analysis for session ${sessionId}:`, error)
+      throw error
+    }
+  },
+
+  // Create a cohort: the tests are generated once for the whole class
+  createCohort: async (data: {
+    level: SessionCreate['level']
+    phase: PhaseSelection['phase']
+    source_session_id?: number
+    students?: number
+  }): Promise<CohortResponse> => {
+    try {
+      const response = await api.post('/api/cohorts', data)
+      return response.data
+    } catch (error) {
+      console.error('Error creating cohort:', error)
+      throw error
+    }
+  },
+
+  // Join a cohort: returns a new session on the cohort's test, ready for phase 1
+  joinCohort: async (cohortId: number): Promise<number> => {
+    try {
+      const response = await api.post(`/api/cohorts/${cohortId}/join`)
+      return response.data.session_ids[0]
+    } catch (error) {
+      console.error(`Error joining cohort ${cohortId}:`, error)
+      throw error
+    }
+  },
+
+  // Results of a cohort's sessions, one page at a time (pass next_cursor back as cursor)
+  getCohortResults: async (
+    cohortId: number,
+    cursor?: number
+  ): Promise<{ cohort_id: number; sessions: SessionResponse[]; next_cursor: number | null }> => {
+    try {
+      const response = await api.get(`/api/cohorts/${cohortId}/results`, { params: { cursor } })
+      return response.data
+    } catch (error) {
+      console.error(`Error getting results of cohort ${cohortId}:`, error)
+      throw error
+    }
+  },
+
+  // Live session events (SSE) instead of polling: returns a function that closes the stream
+  subscribeSessionEvents: (
+    sessionId: number,
+    onEvent: (event: SessionEvent) => void
+  ): (() => void) => {
+    const source = new EventSource(`${API_URL}/api/sessions/${sessionId}/events`)
+    for (const type of SESSION_EVENT_TYPES) {
+      source.addEventListener(type, (message) => {
+        onEvent({ type, data: JSON.parse((message as MessageEvent).data) })
+        if (type === 'deleted') source.close()
+      })
+    }
+    source.onerror = (error) => console.error(`[Events] session ${sessionId}:`, error)
+    return () => source.close()
+  },
 }
 
 export default apiClient